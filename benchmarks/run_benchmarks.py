@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Offline engine benchmarks against in-process Twitter, Weaviate, Giphy and LLM stand-ins.
+
+Each (scenario, agents, stored tweets) case runs in a fresh process so peak RSS
+is attributable to that case. Results are written as JSON so two versions can
+be diffed directly:
+
+    python benchmarks/run_benchmarks.py --agents 1 10 100 --stored 100 10000 -o bench.json
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+import click
+
+SCENARIOS = ("collector", "strategy", "executor", "ingest", "cycle")
+
+
+class _PauseShim:
+    """Replaces a module's `time` so in-engine rate-limit pauses are tallied, not slept."""
+
+    def __init__(self):
+        self.paused = 0.0
+
+    def sleep(self, seconds):
+        self.paused += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _make_actions(agent, n_actions):
+    from collector.batch import TweetAction
+
+    kinds = ("like_timeline_tweets", "retweet_timeline_tweets", "reply_to_timeline", "quote_tweet", "post_tweet")
+    actions = []
+    for i in range(n_actions):
+        tweet = agent.client.factory.make()
+        action = kinds[i % len(kinds)]
+        tweet_id = tweet["id"] if action != "post_tweet" else None
+        actions.append(TweetAction(action, tweet_id, tweet["text"]))
+    return actions
+
+
+async def _timed(latencies, failures, coro_or_fn, *args):
+    start = time.perf_counter()
+    try:
+        result = coro_or_fn(*args)
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception:
+        failures.append(1)
+    latencies.append(time.perf_counter() - start)
+
+
+async def _run_scenario(scenario, fleet, cycles, list_size, n_actions):
+    import main as engine
+
+    latencies, failures = [], []
+    states = {}
+    actions = {}
+    if scenario == "strategy":
+        for agent in fleet.agents:
+            states[agent.agent_id] = await agent.collector.run()
+    if scenario == "executor":
+        for agent in fleet.agents:
+            actions[agent.agent_id] = _make_actions(agent, n_actions)
+    fleet.reset_stats()
+
+    start = time.perf_counter()
+    for _ in range(cycles):
+        for agent in fleet.agents:
+            if scenario == "collector":
+                await _timed(latencies, failures, agent.collector.run)
+            elif scenario == "strategy":
+                await _timed(latencies, failures, agent.strategy.run, states[agent.agent_id])
+            elif scenario == "executor":
+                await _timed(latencies, failures, agent.executor.execute_actions, actions[agent.agent_id])
+            elif scenario == "ingest":
+                await _timed(latencies, failures, agent.collector.ingest_weighted_lists, list_size)
+            elif scenario == "cycle":
+                await _timed(latencies, failures, engine.run_cycle, *agent.cycle_args(fleet.weaviate))
+    wall = time.perf_counter() - start
+    return latencies, failures, wall
+
+
+def _run_case(case: dict) -> dict:
+    """Run one benchmark case; executed in a child process."""
+    sys.path.insert(0, SRC_DIR)
+    from collector import collector as collector_module
+    from sim.backends import LatencyModel
+    from sim.fleet import Fleet
+
+    def model(prefix):
+        return LatencyModel(case[f"{prefix}_latency_ms"], error_rate=case[f"{prefix}_error_rate"], seed=case["seed"])
+
+    latency = {
+        "twitter": model("twitter"),
+        "v1": model("twitter"),
+        "weaviate": model("weaviate"),
+        "giphy": model("giphy"),
+        "llm": model("llm"),
+    }
+
+    pauses = _PauseShim()
+    if not case["real_pauses"]:
+        collector_module.time = pauses
+
+    with tempfile.TemporaryDirectory() as workdir, contextlib.ExitStack() as stack:
+        # gif_reply downloads into the working directory
+        os.chdir(workdir)
+        if not case["show_output"]:
+            logging.getLogger().setLevel(logging.WARNING)
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+        fleet = Fleet(case["agents"], stored_tweets=case["stored"], seed=case["seed"], latency=latency)
+        latencies, failures, wall = asyncio.run(
+            _run_scenario(case["scenario"], fleet, case["cycles"], case["list_size"], case["actions"])
+        )
+
+    stats = fleet.stats()
+    ops = len(latencies)
+    return {
+        "scenario": case["scenario"],
+        "agents": case["agents"],
+        "stored_tweets": case["stored"],
+        "cycles": case["cycles"],
+        "ops": ops,
+        "failures": len(failures),
+        "wall_seconds": wall,
+        "throughput_ops_per_s": ops / wall if wall else None,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50) * 1000 if latencies else None,
+            "p99": _percentile(latencies, 99) * 1000 if latencies else None,
+            "mean": sum(latencies) / ops * 1000 if ops else None,
+        },
+        "api_calls_per_cycle": {
+            backend: {endpoint: n / case["cycles"] for endpoint, n in snapshot["calls"].items()}
+            for backend, snapshot in stats.items()
+        },
+        "api_errors": {backend: snapshot["errors"] for backend, snapshot in stats.items()},
+        "pause_seconds": pauses.paused,
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(SRC_DIR), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+@click.command()
+@click.option("--scenario", "scenarios", multiple=True, type=click.Choice(SCENARIOS + ("all",)), default=["all"])
+@click.option("--agents", "agent_counts", multiple=True, type=int, default=[1, 10, 100])
+@click.option("--stored", "stored_counts", multiple=True, type=int, default=[100, 10_000])
+@click.option("--cycles", default=3, help="Cycles per case.")
+@click.option("--list-size", default=10, help="max_results per list for the ingest scenario.")
+@click.option("--actions", default=10, help="Actions per agent for the executor scenario.")
+@click.option("--seed", default=0)
+@click.option("--twitter-latency-ms", default=0.0)
+@click.option("--twitter-error-rate", default=0.0)
+@click.option("--weaviate-latency-ms", default=0.0)
+@click.option("--weaviate-error-rate", default=0.0)
+@click.option("--giphy-latency-ms", default=0.0)
+@click.option("--giphy-error-rate", default=0.0)
+@click.option("--llm-latency-ms", default=0.0)
+@click.option("--llm-error-rate", default=0.0)
+@click.option("--real-pauses", is_flag=True, help="Actually sleep through the engine's rate-limit pauses.")
+@click.option("--show-output", is_flag=True, help="Do not silence the engine's console output.")
+@click.option("-o", "--output", type=click.Path(), default=None, help="Write JSON here instead of stdout.")
+def main(scenarios, agent_counts, stored_counts, cycles, output, **options):
+    if "all" in scenarios:
+        scenarios = SCENARIOS
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for scenario in scenarios:
+        for agents in agent_counts:
+            for stored in stored_counts:
+                case = dict(options, scenario=scenario, agents=agents, stored=stored, cycles=cycles)
+                with ctx.Pool(1) as pool:
+                    result = pool.apply(_run_case, (case,))
+                print(
+                    f"{scenario:>9} agents={agents:<5} stored={stored:<8} "
+                    f"{result['throughput_ops_per_s'] or 0:10.1f} ops/s  "
+                    f"p50={result['latency_ms']['p50'] or 0:8.2f}ms  p99={result['latency_ms']['p99'] or 0:8.2f}ms  "
+                    f"rss={result['peak_rss_mb']:.0f}MB",
+                    file=sys.stderr,
+                )
+                results.append(result)
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": options,
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
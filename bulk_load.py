@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Bulk load tweet archives (JSONL, CSV, Parquet) into Weaviate"""
+
+import os
+import sys
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from store.bulk_load import FORMATS, BulkLoader, BulkReport, read_records
+from utils.params import load_params
+from utils.transport import WEAVIATE_URL, get_transport
+
+
+def show_progress(report: BulkReport):
+    print(f"\r📥 {report.loaded:,} loaded / {report.read:,} read, {report.invalid:,} invalid, "
+          f"{report.failed:,} failed, {report.rows_per_second:,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+
+@click.command()
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", default=None, type=click.Choice(FORMATS), help="Defaults to the file extension.")
+@click.option("--class", "class_name", default="Tweets", show_default=True)
+@click.option("--url", default=WEAVIATE_URL, show_default=True, help="Weaviate root URL.")
+@click.option("--batch-size", default=None, type=int, help="Objects per batch; defaults to `bulk_load.batch_size`.")
+@click.option("--workers", default=None, type=int, help="Parallel batch writers; defaults to `bulk_load.workers`.")
+@click.option("--embed/--no-embed", default=None, help="Embed texts client-side; defaults to `bulk_load.embed`.")
+@click.option("--agent-id", default="bulk", show_default=True, help="agent_id for records that carry none.")
+@click.option("--rejects", default=None, type=click.Path(dir_okay=False), help="Write invalid records here (JSONL).")
+def main(paths, fmt: str, class_name: str, url: str, batch_size: int, workers: int, embed: bool, agent_id: str,
+         rejects: str):
+    params = load_params()
+    config = params.get("bulk_load") or {}
+    overrides = {k: v for k, v in (("batch_size", batch_size), ("workers", workers)) if v is not None}
+    embed_fn = None
+    if config.get("embed", False) if embed is None else embed:
+        from langchain.embeddings.openai import OpenAIEmbeddings
+
+        get_transport().install_openai()
+        embed_fn = OpenAIEmbeddings().embed_documents
+
+    rejects_file = open(rejects, "w") if rejects else None
+    try:
+        loader = BulkLoader.from_params(params, url=url, class_name=class_name, embed=embed_fn, agent_id=agent_id,
+                                        on_progress=show_progress, rejects=rejects_file, **overrides)
+        for path in paths:
+            print(f"🚀 Loading {path}", file=sys.stderr)
+            report = loader.load(read_records(path, fmt))
+            print(file=sys.stderr)
+            status = "✅" if report.failed == 0 else "⚠️ "
+            print(f"{status} {path}: {report.loaded:,} loaded, {report.invalid:,} invalid, {report.failed:,} failed "
+                  f"in {report.seconds:.1f}s ({report.rows_per_second:,.0f} rows/s)")
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+
+
+if __name__ == "__main__":
+    main()
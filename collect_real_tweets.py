@@ -3,14 +3,20 @@
 
 import os
 import asyncio
-import weaviate
+import logging
+import sys
 from dotenv import load_dotenv
 
-from src.twitter_client import fetch_clients
-from src.collector.trending_collector import TrendingCollector
+# src/ 下的模块按顶层包导入 (与 src/main.py 一致)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from twitter_client import fetch_clients
+from collector.trending_collector import TrendingCollector
+from utils.transport import get_transport
 
 # 加载环境变量
 load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(message)s")
 
 
 async def collect_from_timeline():
@@ -26,7 +32,7 @@ async def collect_from_timeline():
         return
     
     # 连接 Weaviate
-    weaviate_client = weaviate.Client("http://localhost:8080")
+    weaviate_client = get_transport().weaviate()
     
     twitter_client = twitter_clients[0]
     client = twitter_client["client"]
@@ -154,7 +160,7 @@ async def collect_from_search():
         return
     
     # 连接 Weaviate
-    weaviate_client = weaviate.Client("http://localhost:8080")
+    weaviate_client = get_transport().weaviate()
     
     twitter_client = twitter_clients[0]
     client = twitter_client["client"]
@@ -3,14 +3,34 @@
 
 import os
 import asyncio
-import weaviate
+import logging
+import sys
+from datetime import datetime
 from dotenv import load_dotenv
 
-from src.twitter_client import fetch_clients
-from src.collector.trending_collector import TrendingCollector
+# src/ 下的模块按顶层包导入 (与 src/main.py 一致)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from twitter_client import fetch_clients
+from collector.trending_collector import TrendingCollector
+from collector.topics import TopicDetector, search_query
+from utils.params import load_params
+from utils.transport import get_transport
 
 # 加载环境变量
 load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+
+def detect_emerging(weaviate_client, params: dict, limit: int = 2000):
+    """用数据库里已有的推文回放检测器, 返回当前的新兴话题"""
+    detector = TopicDetector.from_params(params)
+    response = weaviate_client.query.get("Tweets", ["tweet", "date"]).with_limit(limit).do()
+    for row in response["data"]["Get"]["Tweets"] or []:
+        timestamp = datetime.fromisoformat(row["date"].replace("Z", "+00:00")).timestamp() if row.get("date") else None
+        detector.observe(row["tweet"] or "", timestamp)
+    max_topics = (params.get("topic_detection") or {}).get("max_topics", 3)
+    return [term for term, _ in detector.emerging(max_topics)]
 
 
 async def main():
@@ -22,7 +42,7 @@ async def main():
     twitter_clients = fetch_clients()
     
     # 连接 Weaviate
-    weaviate_client = weaviate.Client("http://localhost:8080")
+    weaviate_client = get_transport().weaviate()
     
     # 使用第一个客户端
     if not twitter_clients:
@@ -50,7 +70,12 @@ async def main():
     # 方式 2: 按主题收集多个热门推文
     print("\n" + "=" * 60)
     print("\n【方式 2】按主题收集多个热门推文")
-    topics = ["AI", "crypto", "web3", "blockchain", "NFT"]
+    params = load_params()
+    topics = params.get("trending_topics") or ["AI", "crypto", "web3", "blockchain", "NFT"]
+    emerging = detect_emerging(weaviate_client, params)
+    if emerging:
+        print(f"📈 新兴话题: {', '.join(emerging)}")
+    topics = topics + [search_query(term) for term in emerging]
     await trending_collector.collect_top_tweets_by_topic(
         topics=topics,
         tweets_per_topic=1  # 每个主题收集 1 条
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Export the tweet store to partitioned Parquet for analytics"""
+
+import os
+import sys
+
+import click
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from store.export import ParquetExporter
+from utils.params import load_params
+from utils.transport import get_transport
+
+
+@click.command()
+@click.option("--class", "classes", multiple=True,
+              help="Weaviate class to export (repeatable); defaults to `export.classes` in params.yaml.")
+@click.option("--out", default=None, help="Dataset root; defaults to `export.directory`.")
+@click.option("--chunk-size", default=None, type=int, help="Objects per read and per row group.")
+@click.option("--compression", default=None, type=click.Choice(["zstd", "snappy", "gzip", "none"]))
+@click.option("--full", default=False, is_flag=True, help="Export everything, not only what is new since the last run.")
+def main(classes, out: str, chunk_size: int, compression: str, full: bool):
+    params = load_params()
+    overrides = {k: v for k, v in (("directory", out), ("chunk_size", chunk_size), ("compression", compression))
+                 if v is not None}
+    client = get_transport().weaviate()
+    exporter = ParquetExporter.from_params(client, params, **overrides)
+    classes = classes or (params.get("export") or {}).get("classes") or ["Tweets"]
+    existing = {c["class"] for c in client.schema.get().get("classes") or []}
+
+    for class_name in classes:
+        if class_name not in existing:
+            print(f"ℹ️  {class_name}: no such class, skipped")
+            continue
+        try:
+            report = exporter.export(class_name, full=full)
+        except Exception as e:
+            print(f"❌ {class_name}: export failed: {e}")
+            sys.exit(1)
+        kind = "full" if report.full else "incremental"
+        print(f"✅ {class_name}: {report.rows} rows ({kind}) in {report.files} files, "
+              f"{report.bytes / 1e6:.1f} MB -> {os.path.join(exporter.directory, class_name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 """插入示例推文数据到 Weaviate 数据库"""
 
-import weaviate
+import os
+import sys
 from datetime import datetime, timezone
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from utils.transport import get_transport
+
 # 连接到 Weaviate
-client = weaviate.Client("http://localhost:8080")
+client = get_transport().weaviate()
 
 # 示例热门推文数据
 sample_tweets = [
@@ -1,95 +1,44 @@
 #!/usr/bin/env python3
 """Setup Weaviate Schema for Twitter Agent"""
 
-import weaviate
 import json
+import os
+import sys
 
-# Connect to Weaviate
-client = weaviate.Client("http://localhost:8080")
+import click
 
-# Define the Tweets class schema
-class_obj = {
-    "class": "Tweets",
-    "description": "Recent tweet from the timeline",
-    "properties": [
-        {
-            "dataType": ["text"],
-            "description": "tweet text",
-            "name": "tweet",
-        },
-        {
-            "dataType": ["text"],
-            "description": "tweet id",
-            "name": "tweet_id",
-        },
-        {
-            "dataType": ["text"],
-            "description": "agent id",
-            "name": "agent_id",
-        },
-        {
-            "dataType": ["text"],
-            "description": "author id",
-            "name": "author_id",
-        },
-        {
-            "dataType": ["date"],
-            "description": "date",
-            "name": "date",
-        },
-        {
-            "dataType": ["int"],
-            "description": "follower count",
-            "name": "follower_count",
-        },
-        {
-            "dataType": ["int"],
-            "description": "like count",
-            "name": "like_count",
-        },
-    ],
-    "vectorizer": "text2vec-openai",
-}
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
 
-# Define the Remilio class schema (used in main.py)
-remilio_class_obj = {
-    "class": "Remilio",
-    "description": "Remilio content for vector store",
-    "properties": [
-        {
-            "dataType": ["text"],
-            "description": "content",
-            "name": "content",
-        },
-    ],
-    "vectorizer": "text2vec-openai",
-}
+from store.schema import PROFILES, SchemaManager
+from utils.params import load_params
+from utils.transport import get_transport
 
-try:
-    # Check if schema already exists
-    existing_schema = client.schema.get()
-    existing_classes = [cls['class'] for cls in existing_schema.get('classes', [])]
-    
-    # Create Tweets class if it doesn't exist
-    if "Tweets" not in existing_classes:
-        client.schema.create_class(class_obj)
-        print("✅ Created 'Tweets' schema successfully!")
-    else:
-        print("ℹ️  'Tweets' schema already exists")
-    
-    # Create Remilio class if it doesn't exist
-    if "Remilio" not in existing_classes:
-        client.schema.create_class(remilio_class_obj)
-        print("✅ Created 'Remilio' schema successfully!")
-    else:
-        print("ℹ️  'Remilio' schema already exists")
-    
-    # Get and print the final schema
-    schema = client.schema.get()
-    print("\n📋 Current Weaviate Schema:")
-    print(json.dumps(schema, indent=2))
-    
-except Exception as e:
-    print(f"❌ Error setting up schema: {e}")
-    exit(1)
 
+@click.command()
+@click.option("--profile", type=click.Choice(sorted(PROFILES)), default=None,
+              help="Performance profile; defaults to `schema.profile` in params.yaml.")
+@click.option("--dry-run", default=False, is_flag=True, help="Only print the changes a migration would make.")
+def main(profile: str, dry_run: bool):
+    params = load_params()
+    if profile is not None:
+        params = dict(params, schema=dict(params.get("schema") or {}, profile=profile))
+    manager = SchemaManager.from_params(get_transport().weaviate(), params)
+
+    try:
+        changes = manager.plan() if dry_run else manager.migrate()
+    except Exception as e:
+        print(f"❌ Error setting up schema: {e}")
+        sys.exit(1)
+
+    if not changes:
+        print(f"ℹ️  Schema already matches profile '{manager.profile_name}'")
+    for class_name, steps in changes.items():
+        print(f"{'📝' if dry_run else '✅'} {class_name}: {', '.join(steps)}")
+
+    if not dry_run:
+        print("\n📋 Current Weaviate Schema:")
+        print(json.dumps(manager.client.schema.get(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Compact tweet containers passed between the collector, strategy and executor.
+
+A cycle's tweets travel as one `TweetBatch`: int64 id and count columns plus a
+list of interned strings, instead of a dict and a `Document` per tweet. Only
+the few tweets that an action is drawn for become `Tweet` records, and the
+strategy hands the executor slotted `TweetAction`s. Convert to langchain
+`Document`s with `to_documents()` / `to_document()` where langchain needs them.
+"""
+
+import sys
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from langchain.docstore.document import Document
+
+_NO_DATE = np.iinfo(np.int64).min
+
+
+def _timestamp(value: Optional[str]) -> int:
+    if not value:
+        return _NO_DATE
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def _column(values, dtype=np.int64) -> np.ndarray:
+    return np.fromiter(values, dtype=dtype)
+
+
+class Tweet:
+    """One tweet of a batch, materialised on access."""
+
+    __slots__ = ("tweet_id", "text", "author_id")
+
+    def __init__(self, tweet_id: int, text: str, author_id: int = 0):
+        self.tweet_id = tweet_id
+        self.text = text
+        self.author_id = author_id
+
+    @property
+    def page_content(self) -> str:
+        return self.text
+
+    def to_document(self) -> Document:
+        return Document(page_content=self.text, metadata={"tweet_id": self.tweet_id, "action": "none"})
+
+    def __repr__(self):
+        return f"Tweet({self.tweet_id}, {self.text!r})"
+
+
+class TweetBatch:
+    """
+    Columnar batch of tweets.
+
+    Columns:
+        ids, author_ids, like_counts, follower_counts: int64 arrays
+        dates: int64 unix seconds (int64 min where unknown)
+        texts: interned strings, so repeated texts (retweets, reposts) share storage
+    """
+
+    __slots__ = ("ids", "texts", "author_ids", "like_counts", "follower_counts", "dates")
+
+    def __init__(self, ids: np.ndarray, texts: List[str], author_ids: np.ndarray = None,
+                 like_counts: np.ndarray = None, follower_counts: np.ndarray = None, dates: np.ndarray = None):
+        n = len(texts)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.texts = texts
+        self.author_ids = np.zeros(n, np.int64) if author_ids is None else np.asarray(author_ids, np.int64)
+        self.like_counts = np.zeros(n, np.int64) if like_counts is None else np.asarray(like_counts, np.int64)
+        self.follower_counts = (
+            np.zeros(n, np.int64) if follower_counts is None else np.asarray(follower_counts, np.int64)
+        )
+        self.dates = np.full(n, _NO_DATE, np.int64) if dates is None else np.asarray(dates, np.int64)
+
+    @classmethod
+    def empty(cls) -> "TweetBatch":
+        return cls(np.empty(0, np.int64), [])
+
+    @classmethod
+    def from_weaviate(cls, rows: Sequence[dict]) -> "TweetBatch":
+        """Build a batch from `Tweets` objects as returned by a Weaviate GraphQL Get."""
+        return cls(
+            _column(int(row["tweet_id"]) for row in rows),
+            [sys.intern(row["tweet"] or "") for row in rows],
+            author_ids=_column(int(row.get("author_id") or 0) for row in rows),
+            like_counts=_column(row.get("like_count") or 0 for row in rows),
+            follower_counts=_column(row.get("follower_count") or 0 for row in rows),
+            dates=_column(_timestamp(row.get("date")) for row in rows),
+        )
+
+    @classmethod
+    def from_tweets(cls, tweets: Optional[Iterable]) -> "TweetBatch":
+        """Build a batch from tweepy `Tweet` objects (a Response's `data`)."""
+        tweets = list(tweets or ())
+        return cls(
+            _column(int(tweet.id) for tweet in tweets),
+            [sys.intern(tweet.text) for tweet in tweets],
+            author_ids=_column(int(tweet.author_id or 0) for tweet in tweets),
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> Tweet:
+        return Tweet(int(self.ids[index]), self.texts[index], int(self.author_ids[index]))
+
+    def __iter__(self) -> Iterator[Tweet]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, indices) -> "TweetBatch":
+        indices = np.asarray(indices, dtype=np.intp)
+        return TweetBatch(
+            self.ids[indices],
+            [self.texts[i] for i in indices.tolist()],
+            self.author_ids[indices],
+            self.like_counts[indices],
+            self.follower_counts[indices],
+            self.dates[indices],
+        )
+
+    def newest(self, k: int) -> "TweetBatch":
+        """The `k` most recent dated tweets, newest first."""
+        dated = np.flatnonzero(self.dates != _NO_DATE)
+        order = dated[np.argsort(-self.dates[dated], kind="stable")]
+        return self.take(order[:k])
+
+    def concat(self, other: "TweetBatch") -> "TweetBatch":
+        return TweetBatch(
+            np.concatenate([self.ids, other.ids]),
+            self.texts + other.texts,
+            np.concatenate([self.author_ids, other.author_ids]),
+            np.concatenate([self.like_counts, other.like_counts]),
+            np.concatenate([self.follower_counts, other.follower_counts]),
+            np.concatenate([self.dates, other.dates]),
+        )
+
+    def to_documents(self) -> Iterator[Document]:
+        for tweet in self:
+            yield tweet.to_document()
+
+
+class TweetAction:
+    """An action for the executor: what to do, to which tweet, with which text."""
+
+    __slots__ = ("action", "tweet_id", "text", "media_id")
+
+    def __init__(self, action: str, tweet_id: Optional[int] = None, text: str = "", media_id=None):
+        self.action = action
+        self.tweet_id = tweet_id
+        self.text = text
+        self.media_id = media_id
+
+    @property
+    def page_content(self) -> str:
+        return self.text
+
+    def to_document(self) -> Document:
+        metadata = {"action": self.action}
+        if self.tweet_id is not None:
+            metadata["tweet_id"] = self.tweet_id
+        if self.media_id is not None:
+            metadata["media_id"] = self.media_id
+        return Document(page_content=self.text, metadata=metadata)
+
+    def __repr__(self):
+        return f"TweetAction({self.action!r}, {self.tweet_id}, {self.text!r})"
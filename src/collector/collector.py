@@ -1,73 +1,107 @@
 import time
+import logging
 import tweepy
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List
-from langchain.docstore.document import Document
-import operator
+from typing import Any, List
 
+import numpy as np
 
-class TwitterState:
-    def __init__(
-        self,
-        list_tweets: List[Document],
-    ):
-        self.list_tweets = list_tweets
+from utils.metrics import stage_timer
+from .batch import TweetBatch
+from .followers import FollowerSync
+from .mentions import Mention, MentionsPoller
+from .topics import TopicDetector
+from .watermarks import WatermarkStore, fetch_new
 
+logger = logging.getLogger(__name__)
 
 class TwitterCollector:
-    def __init__(self, AGENT_ID, client, vectorstore, weaviate_client):
+    def __init__(self, AGENT_ID, client, vectorstore, weaviate_client, follower_sync: FollowerSync = None,
+                 mentions: MentionsPoller = None, watermarks: WatermarkStore = None, tweets_per_cycle: int = 10,
+                 topic_detector: TopicDetector = None):
         self.agent_id = AGENT_ID
         self.client = client
         self.vectorstore = vectorstore
         self.weaviate_client = weaviate_client
+        self.follower_sync = follower_sync
+        self.mentions = mentions
+        # With watermarks, timeline and list reads fetch only what is new, up to tweets_per_cycle per source
+        self.watermarks = watermarks
+        self.tweets_per_cycle = tweets_per_cycle
+        # Every tweet read from the timeline or lists is also counted for emerging-topic detection
+        self.topic_detector = topic_detector
 
     async def ingest(self):
         return await self.ingest_weighted_lists(50)
 
-    async def run(self) -> TwitterState:
-        response = (
-            self.weaviate_client.query.get(
-                "Tweets", ["tweet", "tweet_id", "agent_id", "date", "author_id", "like_count", "follower_count"]
+    async def run(self) -> TweetBatch:
+        with stage_timer("weaviate", self.agent_id):
+            response = (
+                self.weaviate_client.query.get(
+                    "Tweets", ["tweet", "tweet_id", "agent_id", "date", "author_id", "like_count", "follower_count"]
+                )
+                .with_limit(100)
+                .do()
             )
-            .with_limit(100)
-            .do()
-        )
 
         x = 100  # number of tweets to return
-        sorted_tweets = self.sort_tweets(response, x)
-        results: List[Document] = []
-        for tweet in sorted_tweets:
-            print("")
-            print("Date", tweet["date"])
-            print("Tweet: ", tweet["tweet"])
-            print("Like Count", tweet["like_count"])
-            print("Follower Count", tweet["follower_count"])
-            docs = self._format_tweet(tweet)
-            results.extend(docs)
-
-        return results
-
-    # convert to vector storable document
-    async def retrieve_timeline(self, count) -> List[Document]:
-        results: List[Document] = []
-        tweets = self.client.get_home_timeline(max_results=count)
-        docs = self._format_tweets(tweets)
-        results.extend(docs)
-        return results
-
-    async def retrieve_list(self, max_results: int, list_id: int) -> List[Document]:
-        results: List[Document] = []
-        tweets = self.client.get_list_tweets(id=list_id, max_results=max_results)
-        docs = self._format_tweets(tweets)
-        results.extend(docs)
+        results = self.sort_tweets(response, x)
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, text in enumerate(results.texts):
+                logger.debug(
+                    "Tweet: %s", text,
+                    extra={"agent": self.agent_id, "date": int(results.dates[i]),
+                           "like_count": int(results.like_counts[i]),
+                           "follower_count": int(results.follower_counts[i])},
+                )
+
+        logger.info("Collected %d tweets", len(results), extra={"agent": self.agent_id})
         return results
 
-    def retrieve_followers(self) -> List[Document]:
-        results: List[Document] = []
-        followers = self.client.get_users_followers(id=self.agent_id)
-        docs = self._format_followers(followers)
-        results.extend(docs)
-        return results
+    async def retrieve_timeline(self, count) -> TweetBatch:
+        if self.watermarks is not None:
+            tweets = fetch_new(self.client.get_home_timeline, self.watermarks, self.agent_id, "home_timeline", count)
+        else:
+            tweets = self.client.get_home_timeline(max_results=count).data or []
+        self.observe(tweets)
+        return TweetBatch.from_tweets(tweets)
+
+    async def retrieve_list(self, max_results: int, list_id: int) -> TweetBatch:
+        return TweetBatch.from_tweets(self._list_tweets(list_id, max_results))
+
+    def _list_tweets(self, list_id, max_results: int, **kwargs) -> list:
+        if self.watermarks is not None:
+            # The list endpoint has no since_id, so the watermark is applied client-side
+            tweets = fetch_new(self.client.get_list_tweets, self.watermarks, self.agent_id, f"list:{list_id}",
+                               max_results, supports_since_id=False, id=list_id, **kwargs)
+        else:
+            tweets = self.client.get_list_tweets(id=list_id, max_results=max_results, **kwargs).data or []
+        self.observe(tweets)
+        return tweets
+
+    def observe(self, tweets: list):
+        """Feed freshly read tweets to the topic detector, if there is one."""
+        if self.topic_detector is not None:
+            for tweet in tweets:
+                self.topic_detector.observe(tweet.text)
+
+    def retrieve_followers(self) -> np.ndarray:
+        """Sync the follower graph, following back new followers, and return the sorted follower ids."""
+        if self.follower_sync is None:
+            self.follower_sync = FollowerSync(self.agent_id, self.client)
+        self.follower_sync.sync()
+        return self.follower_sync.followers()
+
+    def retrieve_mentions(self) -> List[Mention]:
+        """New mentions since the last call, replies to the agent's own tweets first."""
+        if self.mentions is None:
+            return []
+        try:
+            return self.mentions.poll()
+        except tweepy.TweepyException as e:
+            # Mentions are retried from the same since_id next cycle
+            logger.warning("Mentions poll failed: %s", e, extra={"agent": self.agent_id})
+            return []
 
     async def ingest_weighted_lists(self, max_results: int):
         lists_response = self.client.get_owned_lists(id=self.agent_id)
@@ -75,14 +109,14 @@ class TwitterCollector:
 
         for list_data in lists:
             list_id = list_data["id"]
-            tweets = self.client.get_list_tweets(
-                id=list_id, max_results=max_results, expansions=["author_id", "attachments.media_keys"])
+            tweets = self._list_tweets(list_id, max_results, expansions=["author_id", "attachments.media_keys"])
             now = datetime.now(timezone.utc).isoformat(timespec="seconds")
 
             with self.weaviate_client.batch(batch_size=20) as batch:
                 # Batch import all Questions
-                print(f"Importing {len(tweets.data)} tweets from list {list_id}")
-                for tweet in tweets.data:
+                logger.info("Importing %d tweets from list %s", len(tweets), list_id,
+                            extra={"agent": self.agent_id})
+                for tweet in tweets:
                     like_count = self.client.get_liking_users(id=tweet.id).meta[
                         "result_count"
                     ]
@@ -114,45 +148,6 @@ class TwitterCollector:
                         "Tweets",
                     )
 
-    def _format_tweet(self, tweet) -> Iterable[Document]:
-        """Format tweets into a string."""
-        metadata = {
-            "tweet_id": tweet["tweet_id"],
-            "action": "none",
-        }
-        yield Document(
-            page_content=tweet["tweet"],
-            metadata=metadata,
-        )
-
-    def _format_tweets(self, tweets: List[Dict[str, Any]]) -> Iterable[Document]:
-        """Format tweets into a string."""
-        for tweet in tweets:
-            metadata = {
-                "tweet_id": tweet.id,
-                "action": "none",
-            }
-            yield Document(
-                page_content=tweet.text,
-                metadata=metadata,
-            )
-
-    def _format_followers(self, followers: List[Dict[str, Any]]) -> Iterable[Document]:
-        """Format tweets into a string."""
-        for follower in followers.data:
-            metadata = {
-                "id": follower.id,
-                "action": "none",
-            }
-            yield Document(
-                page_content=follower.name,
-                metadata=metadata,
-            )
-
-    def sort_tweets(self, data: Any, x: int) -> List[dict]:
+    def sort_tweets(self, data: Any, x: int) -> TweetBatch:
         tweets = data["data"]["Get"]["Tweets"]
-        valid_tweets = [t for t in tweets if t["date"] is not None]
-        sorted_tweets = sorted(
-            valid_tweets, key=operator.itemgetter("date"), reverse=True
-        )
-        return sorted_tweets[:x]
+        return TweetBatch.from_weaviate(tweets).newest(x)
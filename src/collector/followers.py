@@ -0,0 +1,294 @@
+"""Incremental follower-graph sync and follow-back.
+
+Each agent's follower and following sets live on disk as sorted int64 `.npy`
+arrays under `FOLLOWERS_DIR/<agent_id>/`. Twitter returns followers newest
+first, so a routine sync pages only until it reaches a follower it already
+knows. A full reconciliation, which also finds the followers that were lost,
+runs every `full_sync_every` seconds. The follow-back policy from params.yaml
+only ever sees the new followers; the very first sync just records a baseline.
+A full pass cut short (usually by a rate limit) keeps the ids it has read
+and its pagination token, and the next sync resumes it from there.
+With the webhook receiver, new followers are pushed through `add_followers`
+and only the full reconciliation still pages.
+"""
+
+import json
+import logging
+import os
+import time
+import zlib
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FOLLOWERS_DIR = "./data/followers"
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def load_ids(path: str) -> np.ndarray:
+    if not os.path.exists(path):
+        return _EMPTY
+    return np.load(path)
+
+
+def save_ids(path: str, ids: np.ndarray):
+    # Write then rename, so a crash mid-write never leaves a truncated set behind
+    tmp = path + ".tmp.npy"
+    np.save(tmp, np.asarray(ids, dtype=np.int64))
+    os.replace(tmp, path)
+
+
+class FollowerDelta(NamedTuple):
+    new: np.ndarray
+    lost: np.ndarray
+    followed: np.ndarray
+    full: bool
+
+
+class FollowBackPolicy:
+    """Follows back new followers whose own follower count is in range, with some probability."""
+
+    def __init__(self, min_follower_count: int = 0, max_follower_count: Optional[int] = None,
+                 probability: float = 1.0, seed=None):
+        self.min_follower_count = min_follower_count
+        self.max_follower_count = max_follower_count
+        self.probability = probability
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_params(cls, params: dict, agent_id=None):
+        seed = params.get("sampler_seed")
+        if seed is not None and agent_id is not None:
+            seed = np.random.SeedSequence([seed, zlib.crc32(str(agent_id).encode())])
+        return cls(
+            params.get("min_follower_count", 0),
+            params.get("max_follower_count"),
+            params.get("follow_back_probability", 1.0),
+            seed=seed,
+        )
+
+    def select(self, ids: np.ndarray, follower_counts: np.ndarray) -> np.ndarray:
+        eligible = follower_counts >= self.min_follower_count
+        if self.max_follower_count is not None:
+            eligible &= follower_counts <= self.max_follower_count
+        eligible &= self.rng.random(len(ids)) < self.probability
+        return ids[eligible]
+
+
+class FollowerSync:
+    """
+    Keeps an agent's follower/following sets current and follows back new followers.
+
+    Args:
+        agent_id: the agent's Twitter user id
+        client: tweepy.Client (or anything with the same paged user endpoints)
+        policy: who to follow back; None to only track the graph
+        directory: where the per-agent arrays are stored
+        full_sync_every: seconds between full reconciliations
+        max_follows: follow-backs per sync, to stay inside the follow rate limit; the rest
+            are kept pending for later syncs
+        pushed: new followers arrive through `add_followers` (webhook), so `sync()` only
+            runs the full reconciliation when it is due
+    """
+
+    def __init__(self, agent_id, client, policy: FollowBackPolicy = None, directory: str = FOLLOWERS_DIR,
+                 full_sync_every: float = 24 * 3600, max_follows: int = 50, page_size: int = 1000,
+                 pushed: bool = False, clock: Callable[[], float] = time.time):
+        self.agent_id = agent_id
+        self.client = client
+        self.policy = policy
+        self.directory = os.path.join(directory, str(agent_id))
+        self.full_sync_every = full_sync_every
+        self.max_follows = max_follows
+        self.page_size = page_size
+        self.pushed = pushed
+        self.clock = clock
+        self._log = {"agent": agent_id}
+
+    @classmethod
+    def from_params(cls, params: dict, agent_id, client, **kwargs):
+        return cls(agent_id, client, FollowBackPolicy.from_params(params, agent_id), **kwargs)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def followers(self) -> np.ndarray:
+        return load_ids(self._path("followers.npy"))
+
+    def following(self) -> np.ndarray:
+        return load_ids(self._path("following.npy"))
+
+    def _load_meta(self) -> dict:
+        try:
+            with open(self._path("meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_meta(self, meta: dict):
+        with open(self._path("meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def _page_ids(self, method, known: np.ndarray, full: bool, token: str = None, pages: list = None,
+                  counts: Dict[int, int] = None, position: dict = None) -> Tuple[np.ndarray, Dict[int, int]]:
+        """
+        Page through a user endpoint, newest first, from `token`.
+
+        Returns every id seen (sorted, unique) and the follower counts of the
+        ids not in `known`. Unless `full`, stops after the first page that
+        reaches a known id. `pages`, `counts` and `position["token"]` are
+        filled as it goes, so a caller can keep what was read when it fails.
+        """
+        pages = [] if pages is None else pages
+        counts = {} if counts is None else counts
+        while True:
+            if position is not None:
+                position["token"] = token
+            response = method(
+                self.agent_id, max_results=self.page_size, pagination_token=token, user_fields=["public_metrics"]
+            )
+            users = response.data or []
+            ids = np.fromiter((int(user.id) for user in users), dtype=np.int64, count=len(users))
+            pages.append(ids)
+
+            unseen = ~np.isin(ids, known, assume_unique=True)
+            for user, is_new in zip(users, unseen.tolist()):
+                if is_new:
+                    metrics = getattr(user, "public_metrics", None) or {}
+                    counts[int(user.id)] = metrics.get("followers_count", 0)
+
+            token = (response.meta or {}).get("next_token")
+            if token is None or (not full and not unseen.all()):
+                break
+        return np.unique(np.concatenate(pages)) if pages else _EMPTY, counts
+
+    def _page_all(self, name: str, method, known: np.ndarray, meta: dict) -> Tuple[np.ndarray, Dict[int, int]]:
+        """
+        `_page_ids(full=True)` that survives interruptions: when paging fails, the ids read so far
+        and the token reached are saved, and the next call continues from there.
+        """
+        partial = self._path(f"{name}.partial.npy")
+        resume = meta.setdefault("resume", {}).get(name)
+        if resume and resume.get("done"):
+            # Finished by an earlier attempt that failed on a later list
+            return load_ids(partial), {int(k): v for k, v in resume["counts"].items()}
+        pages, counts, position = [], {}, {"token": None}
+        if resume:
+            pages.append(load_ids(partial))
+            counts = {int(k): v for k, v in resume["counts"].items()}
+        try:
+            ids, counts = self._page_ids(method, known, True, resume and resume["token"], pages, counts, position)
+        except Exception:
+            ids = np.unique(np.concatenate(pages)) if pages else _EMPTY
+            self._save_progress(meta, name, ids, {"token": position["token"], "counts": counts})
+            logger.warning("Full %s sync interrupted after %d ids; the next sync resumes it", name, ids.size,
+                           extra=self._log)
+            raise
+        self._save_progress(meta, name, ids, {"done": True, "counts": counts})
+        return ids, counts
+
+    def _save_progress(self, meta: dict, name: str, ids: np.ndarray, resume: dict):
+        save_ids(self._path(f"{name}.partial.npy"), ids)
+        # Only new followers' counts are kept; the first sync's baseline has no use for them
+        if "last_full_sync" not in meta:
+            resume["counts"] = {}
+        meta["resume"][name] = dict(resume, counts={str(k): v for k, v in resume["counts"].items()})
+        self._save_meta(meta)
+
+    def sync(self) -> FollowerDelta:
+        os.makedirs(self.directory, exist_ok=True)
+        meta = self._load_meta()
+        previous = self.followers()
+        following = self.following()
+        # The first sync records the existing graph as a baseline rather than following everyone back
+        first = "last_full_sync" not in meta
+        full = first or self.clock() - meta.get("last_full_sync", 0) >= self.full_sync_every
+        if self.pushed and not full:
+            return FollowerDelta(_EMPTY, _EMPTY, _EMPTY, False)
+
+        if full:
+            followers, counts = self._page_all("followers", self.client.get_users_followers, previous, meta)
+            lost = np.setdiff1d(previous, followers, assume_unique=True)
+            # The following set can drift too (unfollows made outside the agent)
+            following, _ = self._page_all("following", self.client.get_users_following, _EMPTY, meta)
+            meta["last_full_sync"] = self.clock()
+            meta.pop("resume", None)
+            for name in ("followers", "following"):
+                if os.path.exists(self._path(f"{name}.partial.npy")):
+                    os.remove(self._path(f"{name}.partial.npy"))
+        else:
+            seen, counts = self._page_ids(self.client.get_users_followers, previous, full)
+            followers = np.union1d(previous, seen)
+            lost = _EMPTY
+        new = np.setdiff1d(followers, previous, assume_unique=True)
+
+        # Follow-backs already chosen but not yet made (over max_follows, or rate limited)
+        pending = np.setdiff1d(load_ids(self._path("pending.npy")), lost, assume_unique=True)
+        followed = _EMPTY
+        if self.policy is not None and not first:
+            pending, following, followed = self._follow_back(new, following, counts, pending)
+
+        save_ids(self._path("followers.npy"), followers)
+        save_ids(self._path("following.npy"), following)
+        save_ids(self._path("pending.npy"), pending)
+        self._save_meta(meta)
+
+        logger.info("Follower sync (%s): %d followers, %d new, %d lost, %d followed back",
+                    "full" if full else "incremental", followers.size, new.size, lost.size, followed.size,
+                    extra=self._log)
+        return FollowerDelta(new, lost, followed, full)
+
+    def add_followers(self, follows: Sequence[Tuple[int, int]]) -> FollowerDelta:
+        """
+        Record followers pushed by the webhook, (id, follower count) each, and follow back as `sync()` would.
+
+        Nothing is paged; the next full reconciliation still catches any follow the webhook missed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        meta = self._load_meta()
+        previous = self.followers()
+        following = self.following()
+        counts = dict(follows)
+        followers = np.union1d(previous, np.fromiter(counts, dtype=np.int64, count=len(counts)))
+        new = np.setdiff1d(followers, previous, assume_unique=True)
+
+        pending = load_ids(self._path("pending.npy"))
+        followed = _EMPTY
+        # Before the first sync there is no baseline to tell new followers from old ones
+        if self.policy is not None and "last_full_sync" in meta:
+            pending, following, followed = self._follow_back(new, following, counts, pending)
+
+        save_ids(self._path("followers.npy"), followers)
+        save_ids(self._path("following.npy"), following)
+        save_ids(self._path("pending.npy"), pending)
+
+        logger.info("Pushed follows: %d new followers, %d followed back", new.size, followed.size, extra=self._log)
+        return FollowerDelta(new, _EMPTY, followed, False)
+
+    def _follow_back(self, new: np.ndarray, following: np.ndarray, counts: Dict[int, int],
+                     pending: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Add the policy's picks among `new` to `pending` and follow up to `max_follows` of them."""
+        candidates = np.setdiff1d(new, following, assume_unique=True)
+        candidate_counts = np.fromiter((counts.get(int(i), 0) for i in candidates), dtype=np.int64,
+                                       count=candidates.size)
+        pending = np.union1d(pending, self.policy.select(candidates, candidate_counts))
+        pending = np.setdiff1d(pending, following, assume_unique=True)
+        followed = self._follow(pending[:self.max_follows])
+        following = np.union1d(following, followed)
+        pending = np.setdiff1d(pending, followed, assume_unique=True)
+        return pending, following, followed
+
+    def _follow(self, ids: np.ndarray) -> np.ndarray:
+        followed = []
+        for user_id in ids.tolist():
+            try:
+                self.client.follow_user(user_id)
+            except Exception as e:
+                # Usually the follow rate limit; the rest stay pending for the next sync
+                logger.warning("Follow-back of %s failed: %s", user_id, e, extra=self._log)
+                break
+            followed.append(user_id)
+        return np.asarray(followed, dtype=np.int64)
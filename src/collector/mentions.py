@@ -0,0 +1,191 @@
+"""Mentions and replies to the agent's own tweets, with their thread context.
+
+`MentionsPoller.poll()` reads only the mentions newer than the agent's stored
+`since_id`. Replies to the agent's own tweets are found with a set lookup
+against `OwnTweetIndex`. Thread context is fetched with one
+`conversation_id:` search per conversation, not one per tweet, and cached for
+`context_ttl` seconds. Replies to the agent come first in the result, so the
+strategy answers them before other mentions. A poll reads no more mentions
+than the strategy answers per cycle (`max_per_poll`); the rest stay behind
+the stored pagination token for the next poll rather than being skipped.
+"""
+
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from .watermarks import WatermarkStore, fetch_new
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "mentions"
+
+_TWEET_FIELDS = ["conversation_id", "author_id", "referenced_tweets", "created_at"]
+
+
+class OwnTweetIndex:
+    """Ids of tweets the agent posted, most recent `max_size` kept, for O(1) reply matching."""
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._ids: "OrderedDict[int, None]" = OrderedDict()
+
+    def add(self, tweet_id):
+        tweet_id = int(tweet_id)
+        self._ids[tweet_id] = None
+        self._ids.move_to_end(tweet_id)
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+    def update(self, tweet_ids: Iterable):
+        for tweet_id in tweet_ids:
+            self.add(tweet_id)
+
+    def __contains__(self, tweet_id) -> bool:
+        return int(tweet_id) in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class Mention:
+    """A mention to answer, with the earlier tweets of its conversation."""
+
+    __slots__ = ("tweet_id", "text", "author_id", "conversation_id", "reply_to_own", "context")
+
+    def __init__(self, tweet_id: int, text: str, author_id: int, conversation_id: int,
+                 reply_to_own: bool, context: Tuple[str, ...] = ()):
+        self.tweet_id = tweet_id
+        self.text = text
+        self.author_id = author_id
+        self.conversation_id = conversation_id
+        self.reply_to_own = reply_to_own
+        self.context = context
+
+    @property
+    def prompt_text(self) -> str:
+        """The mention with its thread, as input for the reply prompt."""
+        if not self.context:
+            return self.text
+        thread = "\n".join(f"- {text}" for text in self.context)
+        return f"Earlier in the thread:\n{thread}\n\nReply to: {self.text}"
+
+    def __repr__(self):
+        return f"Mention({self.tweet_id}, {self.text!r}, reply_to_own={self.reply_to_own})"
+
+
+class MentionsPoller:
+    """
+    Polls one agent's mentions.
+
+    Args:
+        agent_id: the agent's Twitter user id
+        client: tweepy.Client
+        watermarks: where the mentions since_id is kept
+        own_tweets: the agent's posted tweet ids (the executor adds to it)
+        max_pages: pages of 100 mentions read per poll; any more are read next poll
+        max_per_poll: mentions read per poll, at most `max_pages` pages; set it to the replies
+            the strategy makes per cycle, so none are read and then left unanswered (the
+            endpoint reads at least 5)
+        context_ttl: seconds a conversation's thread context stays cached
+        context_size: earlier tweets of a thread kept as context
+    """
+
+    def __init__(self, agent_id, client, watermarks: WatermarkStore, own_tweets: OwnTweetIndex = None,
+                 max_pages: int = 5, context_ttl: float = 3600, context_size: int = 5,
+                 max_per_poll: int = None, clock: Callable[[], float] = time.monotonic):
+        self.agent_id = agent_id
+        self.client = client
+        self.watermarks = watermarks
+        self.own_tweets = own_tweets if own_tweets is not None else OwnTweetIndex()
+        self.max_pages = max_pages
+        self.max_per_poll = max_per_poll
+        self.context_ttl = context_ttl
+        self.context_size = context_size
+        self.clock = clock
+        self._context: Dict[int, Tuple[float, Tuple[Tuple[int, str], ...]]] = {}
+        self._seeded = False
+        self._log = {"agent": agent_id}
+
+    @classmethod
+    def from_params(cls, params: dict, agent_id, client, watermarks: WatermarkStore,
+                    own_tweets: OwnTweetIndex = None, **kwargs):
+        config = params.get("mentions") or {}
+        return cls(
+            agent_id, client, watermarks, own_tweets,
+            max_pages=config.get("max_pages", 5),
+            context_ttl=config.get("context_ttl_seconds", 3600),
+            context_size=config.get("context_size", 5),
+            max_per_poll=config.get("max_replies_per_cycle", 10),
+            **kwargs,
+        )
+
+    def _seed_own_tweets(self):
+        # Tweets posted before this process started; later ones come from the executor
+        response = self.client.get_users_tweets(self.agent_id, max_results=100)
+        self.own_tweets.update(tweet.id for tweet in response.data or [])
+        self._seeded = True
+
+    def _fetch(self) -> list:
+        max_tweets = self.max_pages * 100
+        if self.max_per_poll is not None:
+            max_tweets = min(max_tweets, self.max_per_poll)
+        return fetch_new(
+            self.client.get_users_mentions, self.watermarks, self.agent_id, SOURCE, max_tweets,
+            id=self.agent_id, tweet_fields=_TWEET_FIELDS,
+        )
+
+    def _is_reply_to_own(self, tweet) -> bool:
+        for reference in tweet.referenced_tweets or ():
+            if reference.type == "replied_to" and reference.id in self.own_tweets:
+                return True
+        return False
+
+    def thread_context(self, conversation_ids: Iterable[int]) -> Dict[int, Tuple[Tuple[int, str], ...]]:
+        """(tweet id, text) pairs per conversation, oldest first; one search per uncached conversation."""
+        now = self.clock()
+        result = {}
+        for conversation_id in set(conversation_ids):
+            cached = self._context.get(conversation_id)
+            if cached is not None and cached[0] > now:
+                result[conversation_id] = cached[1]
+                continue
+            response = self.client.search_recent_tweets(
+                query=f"conversation_id:{conversation_id}", max_results=100, tweet_fields=_TWEET_FIELDS,
+            )
+            thread = tuple(sorted((int(t.id), t.text) for t in response.data or []))
+            self._context[conversation_id] = (now + self.context_ttl, thread)
+            result[conversation_id] = thread
+
+        # Drop expired conversations so the cache stays bounded by recent activity
+        for conversation_id in [c for c, (expires, _) in self._context.items() if expires <= now]:
+            del self._context[conversation_id]
+        return result
+
+    def poll(self) -> List[Mention]:
+        """New mentions, replies to the agent's own tweets first, each oldest first."""
+        if not self._seeded:
+            self._seed_own_tweets()
+        tweets = [t for t in self._fetch() if str(t.author_id) != str(self.agent_id)]
+        if not tweets:
+            return []
+
+        by_conversation = defaultdict(list)
+        for tweet in tweets:
+            by_conversation[int(tweet.conversation_id or tweet.id)].append(tweet)
+        threads = self.thread_context(by_conversation)
+
+        mentions = []
+        for conversation_id, conversation in by_conversation.items():
+            thread = threads.get(conversation_id, ())
+            for tweet in conversation:
+                tweet_id = int(tweet.id)
+                context = tuple(text for tid, text in thread if tid < tweet_id)[-self.context_size:]
+                mentions.append(Mention(tweet_id, tweet.text, int(tweet.author_id or 0), conversation_id,
+                                        self._is_reply_to_own(tweet), context))
+        mentions.sort(key=lambda m: (not m.reply_to_own, m.tweet_id))
+
+        logger.info("%d new mentions (%d replies to own tweets) in %d conversations", len(mentions),
+                    sum(m.reply_to_own for m in mentions), len(by_conversation), extra=self._log)
+        return mentions
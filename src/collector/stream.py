@@ -0,0 +1,242 @@
+"""Filtered-stream ingestion: matching tweets arrive within seconds instead of the next search poll.
+
+`FilteredStream` speaks the v2 filtered-stream API directly (rules plus the
+long-lived stream connection), so the base URL can point at the stand-in in
+`sim/stream_server.py`. It reconnects with the backoff Twitter asks for:
+linear from 250 ms up to 16 s after network errors, exponential from 5 s up to
+320 s after HTTP errors, and exponential from 60 s after a 429. Rule syncs are
+retried on the same schedule, and a line that is not valid JSON is skipped.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Sequence
+
+import requests
+
+from store.writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.twitter.com"
+RULE_TAG_PREFIX = "topic:"
+
+TWEET_FIELDS = "created_at,public_metrics,author_id,conversation_id,lang"
+EXPANSIONS = "author_id"
+USER_FIELDS = "public_metrics"
+
+
+def rules_for_topics(topics: Sequence[str]) -> List[dict]:
+    """One stream rule per topic, tagged so rules added by hand are left alone."""
+    return [{"value": f"{topic} -is:retweet lang:en", "tag": f"{RULE_TAG_PREFIX}{topic}"} for topic in topics]
+
+
+class StreamError(Exception):
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(f"HTTP {status}: {message}" if message else f"HTTP {status}")
+        self.status = status
+
+
+class Backoff:
+    """Reconnect delays per failure kind; any successfully received line resets them."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._network = 0.0
+        self._http = 0.0
+        self._rate_limited = 0.0
+
+    def network(self) -> float:
+        self._network = min(self._network + 0.25, 16.0)
+        return self._network
+
+    def http(self) -> float:
+        self._http = min(self._http * 2 if self._http else 5.0, 320.0)
+        return self._http
+
+    def rate_limited(self) -> float:
+        self._rate_limited = min(self._rate_limited * 2 if self._rate_limited else 60.0, 960.0)
+        return self._rate_limited
+
+
+class FilteredStream:
+    """
+    Client for the v2 filtered stream.
+
+    Args:
+        bearer_token: app-only token (the filtered stream has no user context)
+        base_url: API root; point at a local stand-in for offline runs
+        stall_timeout: seconds without data or keep-alive before reconnecting
+            (Twitter sends a keep-alive every 20 s)
+    """
+
+    def __init__(self, bearer_token: str, base_url: str = API_URL, session: requests.Session = None,
+                 stall_timeout: float = 30.0, connect_timeout: float = 10.0, backoff: Backoff = None):
+        self.base_url = base_url.rstrip("/")
+        self.session = session or requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {bearer_token}"
+        self.stall_timeout = stall_timeout
+        self.connect_timeout = connect_timeout
+        self.backoff = backoff or Backoff()
+        self.connections = 0
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}/2/tweets/search/stream{path}"
+
+    @staticmethod
+    def _check(response: requests.Response):
+        if response.status_code >= 400:
+            raise StreamError(response.status_code, response.text[:200])
+
+    # Rules -----------------------------------------------------------------
+
+    def get_rules(self) -> List[dict]:
+        response = self.session.get(self._url("/rules"), timeout=self.connect_timeout)
+        self._check(response)
+        return response.json().get("data") or []
+
+    def add_rules(self, rules: List[dict]):
+        if rules:
+            response = self.session.post(self._url("/rules"), json={"add": rules}, timeout=self.connect_timeout)
+            self._check(response)
+
+    def delete_rules(self, rule_ids: List[str]):
+        if rule_ids:
+            response = self.session.post(self._url("/rules"), json={"delete": {"ids": rule_ids}},
+                                         timeout=self.connect_timeout)
+            self._check(response)
+
+    def sync_rules(self, topics: Sequence[str]) -> Dict[str, int]:
+        """Make the stream's topic rules match `topics`, touching only rules this module tagged."""
+        desired = {rule["value"]: rule for rule in rules_for_topics(topics)}
+        current = [rule for rule in self.get_rules() if (rule.get("tag") or "").startswith(RULE_TAG_PREFIX)]
+        stale = [rule["id"] for rule in current if rule["value"] not in desired]
+        present = {rule["value"] for rule in current}
+        missing = [rule for value, rule in desired.items() if value not in present]
+        self.delete_rules(stale)
+        self.add_rules(missing)
+        logger.info("Stream rules: %d kept, %d added, %d removed", len(present) - len(stale), len(missing), len(stale))
+        return {"added": len(missing), "removed": len(stale)}
+
+    def sync_rules_retrying(self, topics: Sequence[str], stop: threading.Event) -> bool:
+        """`sync_rules`, retried with the connection's backoff; False if `stop` was set first."""
+        while not stop.is_set():
+            try:
+                self.sync_rules(topics)
+                self.backoff.reset()
+                return True
+            except StreamError as e:
+                delay = self.backoff.rate_limited() if e.status == 429 else self.backoff.http()
+                logger.warning("Stream rule sync failed (%s), retrying in %.0fs", e, delay)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = self.backoff.network()
+                logger.warning("Stream rule sync failed (%s), retrying in %.2fs", e, delay)
+            stop.wait(delay)
+        return False
+
+    # Stream ----------------------------------------------------------------
+
+    def _connect(self) -> requests.Response:
+        params = {"tweet.fields": TWEET_FIELDS, "expansions": EXPANSIONS, "user.fields": USER_FIELDS}
+        response = self.session.get(self._url(""), params=params, stream=True,
+                                    timeout=(self.connect_timeout, self.stall_timeout))
+        self.connections += 1
+        if response.status_code >= 400:
+            body = response.text[:200]
+            response.close()
+            raise StreamError(response.status_code, body)
+        return response
+
+    def payloads(self, stop: threading.Event) -> Iterator[dict]:
+        """Yield stream payloads ({"data", "includes", "matching_rules"}) until `stop` is set."""
+        while not stop.is_set():
+            try:
+                response = self._connect()
+                try:
+                    for line in response.iter_lines():
+                        if stop.is_set():
+                            return
+                        self.backoff.reset()
+                        if not line:
+                            continue  # keep-alive
+                        try:
+                            payload = json.loads(line)
+                        except ValueError:
+                            logger.warning("Skipping a malformed stream line: %.200r", line)
+                            continue
+                        if "data" in payload:
+                            yield payload
+                        elif "errors" in payload:
+                            # Operational disconnects are announced in-band before the server closes
+                            logger.warning("Stream error: %s", payload["errors"])
+                finally:
+                    response.close()
+                delay = self.backoff.network()
+                logger.info("Stream closed by server, reconnecting in %.2fs", delay)
+            except StreamError as e:
+                delay = self.backoff.rate_limited() if e.status == 429 else self.backoff.http()
+                logger.warning("Stream connect failed (%s), reconnecting in %.0fs", e, delay)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                delay = self.backoff.network()
+                logger.warning("Stream connection lost (%s), reconnecting in %.2fs", e, delay)
+            stop.wait(delay)
+
+
+class StreamCollector:
+    """
+    Writes filtered-stream matches into the tweet store through a `BatchWriter`.
+
+    `listeners` get every payload as well, so trend detectors can read the
+    same stream without another connection.
+    """
+
+    def __init__(self, stream: FilteredStream, writer: BatchWriter, topics: Sequence[str],
+                 agent_id: str = "stream", listeners: Sequence[Callable[[dict], None]] = ()):
+        self.stream = stream
+        self.writer = writer
+        self.topics = list(topics)
+        self.agent_id = agent_id
+        self.listeners = list(listeners)
+        self.received = 0
+
+    def to_properties(self, payload: dict) -> dict:
+        tweet = payload["data"]
+        users = {user["id"]: user for user in (payload.get("includes") or {}).get("users", [])}
+        author = users.get(tweet.get("author_id")) or {}
+        metrics = tweet.get("public_metrics") or {}
+        created_at = tweet.get("created_at")
+        date = (
+            datetime.fromisoformat(created_at.replace("Z", "+00:00")) if created_at else datetime.now(timezone.utc)
+        )
+        return {
+            "tweet": tweet["text"],
+            "tweet_id": str(tweet["id"]),
+            "agent_id": str(self.agent_id),
+            "author_id": str(tweet.get("author_id", "")),
+            "like_count": metrics.get("like_count", 0),
+            "follower_count": (author.get("public_metrics") or {}).get("followers_count", 0),
+            "date": date.isoformat(timespec="seconds"),
+        }
+
+    def run(self, stop: threading.Event):
+        """Sync the topic rules, then ingest until `stop` is set."""
+        if not self.stream.sync_rules_retrying(self.topics, stop):
+            return
+        self.writer.start()
+        try:
+            for payload in self.stream.payloads(stop):
+                self.received += 1
+                self.writer.add(self.to_properties(payload))
+                for listener in self.listeners:
+                    try:
+                        listener(payload)
+                    except Exception:
+                        logger.exception("Stream listener %r failed", listener)
+        finally:
+            self.writer.close()
+            logger.info("Stream ingestion stopped: %d received, %d written, %d failed",
+                        self.received, self.writer.written, self.writer.failed)
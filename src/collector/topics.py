@@ -0,0 +1,242 @@
+"""Emerging-topic detection over everything the agents ingest.
+
+Every tweet is tokenised into words, hashtags and bigrams. Each term is counted
+in a ring of time-bucketed count-min sketches, and candidate terms are tracked
+with a Misra-Gries heavy-hitters summary. A term is emerging when its count in
+the current bucket bursts above its average over the earlier buckets (a
+Poisson z-score). Memory is fixed by the sketch size, bucket count and
+candidate capacity, however many tweets flow through.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"#?\w[\w'-]*", re.UNICODE)
+_SKIP = re.compile(r"https?://\S+|@\w+")
+
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be been but by can could did do does for from get got had has
+have he her his how i if in into is it its just like me more my new no not now of on one or our out over rt
+she so some than that the their them then there these they this to too up us was we were what when which who
+why will with would you your yours amp via just really very still here only even much many most been being
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Hashtags, words and adjacent-word bigrams of a tweet, lower-cased, stopwords dropped."""
+    words = []
+    for token in _TOKEN.findall(_SKIP.sub(" ", text.lower())):
+        token = token.strip("'-")
+        if len(token) < 3 or token.isdigit() or token in STOPWORDS:
+            words.append(None)
+            continue
+        words.append(token)
+
+    terms = [word for word in words if word is not None]
+    for first, second in zip(words, words[1:]):
+        if first is not None and second is not None and not first.startswith("#") and not second.startswith("#"):
+            terms.append(f"{first} {second}")
+    return terms
+
+
+def _hashes(term: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(term.encode(), digest_size=8).digest()
+    return int.from_bytes(digest[:4], "little"), int.from_bytes(digest[4:], "little") | 1
+
+
+class CountMinSketch:
+    """`depth` rows of `width` int32 counters; estimates never undercount."""
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int32)
+        self._rows = np.arange(depth)
+
+    def _columns(self, term: str) -> np.ndarray:
+        # Kirsch-Mitzenmacher double hashing: row i uses h1 + i * h2
+        h1, h2 = _hashes(term)
+        return (h1 + self._rows * h2) % self.width
+
+    def add(self, terms: Iterable[str]):
+        columns = [self._columns(term) for term in terms]
+        if columns:
+            np.add.at(self.table, (np.tile(self._rows, len(columns)), np.concatenate(columns)), 1)
+
+    def estimate(self, term: str) -> int:
+        return int(self.table[self._rows, self._columns(term)].min())
+
+    def clear(self):
+        self.table.fill(0)
+
+
+class HeavyHitters:
+    """
+    Misra-Gries summary: at most `capacity` candidates, and every term over n/capacity is among them.
+
+    The decrement-everyone step is amortised: counts are stored relative to a
+    global offset, with the terms grouped by stored count, so a decrement is
+    one offset bump plus dropping the group that reaches zero.
+    """
+
+    def __init__(self, capacity: int = 512):
+        self.capacity = capacity
+        self._stored: Dict[str, int] = {}
+        self._by_count: Dict[int, Set[str]] = defaultdict(set)
+        self._offset = 0
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return {term: stored - self._offset for term, stored in self._stored.items()}
+
+    def add(self, term: str):
+        stored = self._stored.get(term)
+        if stored is not None:
+            group = self._by_count[stored]
+            group.discard(term)
+            if not group:
+                del self._by_count[stored]
+            self._stored[term] = stored + 1
+            self._by_count[stored + 1].add(term)
+        elif len(self._stored) < self.capacity:
+            self._stored[term] = self._offset + 1
+            self._by_count[self._offset + 1].add(term)
+        else:
+            # Decrement everyone; drop the terms that reach zero
+            self._offset += 1
+            for dropped in self._by_count.pop(self._offset, ()):
+                del self._stored[dropped]
+
+    def clear(self):
+        self._stored.clear()
+        self._by_count.clear()
+        self._offset = 0
+
+
+class TopicDetector:
+    """
+    Flags terms whose rate in the current time bucket bursts above their baseline.
+
+    Args:
+        bucket_seconds: length of one time bucket
+        n_buckets: buckets kept; all but the current one form the baseline
+        min_count: ignore terms seen fewer times than this in the current bucket
+        threshold: z-score above the baseline that counts as a burst
+        cooldown: seconds before `take` hands out the same term again
+    """
+
+    def __init__(self, bucket_seconds: float = 600, n_buckets: int = 36, width: int = 4096, depth: int = 4,
+                 capacity: int = 512, min_count: int = 5, threshold: float = 4.0, cooldown: float = 3600,
+                 clock: Callable[[], float] = time.time):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = n_buckets
+        self.min_count = min_count
+        self.threshold = threshold
+        self.clock = clock
+        self.sketches = [CountMinSketch(width, depth) for _ in range(n_buckets)]
+        # Candidates from the current and the previous bucket, so a rotation does not forget a burst
+        self.candidates = [HeavyHitters(capacity), HeavyHitters(capacity)]
+        self.cooldown = cooldown
+        self._bucket = int(clock() // bucket_seconds)
+        self._filled = 1
+        self._handed_out: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_params(cls, params: dict, **kwargs):
+        config = params.get("topic_detection") or {}
+        return cls(**{key: value for key, value in config.items() if key != "max_topics"}, **kwargs)
+
+    def _rotate(self, bucket: int = None):
+        if bucket is None:
+            bucket = int(self.clock() // self.bucket_seconds)
+        steps = bucket - self._bucket
+        if steps <= 0:
+            return
+        for i in range(1, min(steps, self.n_buckets) + 1):
+            self.sketches[(self._bucket + i) % self.n_buckets].clear()
+        self.candidates = [HeavyHitters(self.candidates[0].capacity), self.candidates[0] if steps == 1 else
+                           HeavyHitters(self.candidates[0].capacity)]
+        self._bucket = bucket
+        self._filled = min(self._filled + steps, self.n_buckets)
+
+    def observe(self, text: str, timestamp: float = None):
+        """Count a tweet's terms, in the bucket of `timestamp` (default now) if it is still in the ring."""
+        terms = tokenize(text)
+        if not terms:
+            return
+        with self._lock:
+            self._rotate()
+            bucket = self._bucket if timestamp is None else int(timestamp // self.bucket_seconds)
+            if bucket > self._bucket:
+                self._rotate(bucket)
+            age = self._bucket - bucket
+            if age >= self.n_buckets:
+                return
+            self._filled = max(self._filled, age + 1)
+            self.sketches[bucket % self.n_buckets].add(terms)
+            if age < len(self.candidates):
+                for term in terms:
+                    self.candidates[age].add(term)
+
+    def observe_payload(self, payload: dict):
+        """Filtered-stream listener."""
+        self.observe(payload["data"].get("text") or "")
+
+    def emerging(self, k: int = 5) -> List[Tuple[str, float]]:
+        """Up to `k` (term, z-score) pairs, strongest burst first."""
+        with self._lock:
+            self._rotate()
+            current = self.sketches[self._bucket % self.n_buckets]
+            history = self._filled - 1
+            terms = set(self.candidates[0].counts) | set(self.candidates[1].counts)
+            scored = []
+            for term in terms:
+                count = current.estimate(term)
+                if count < self.min_count:
+                    continue
+                past = sum(
+                    self.sketches[(self._bucket - i) % self.n_buckets].estimate(term) for i in range(1, history + 1)
+                )
+                baseline = past / history if history else 0.0
+                score = (count - baseline) / np.sqrt(baseline + 1.0)
+                if score >= self.threshold:
+                    scored.append((term, float(score)))
+        scored.sort(key=lambda item: (item[1], item[0].count(" ")), reverse=True)
+        # A bigram and its own words usually burst together; keep the most specific
+        chosen: List[Tuple[str, float]] = []
+        for term, score in scored:
+            words = set(term.replace("#", "").split())
+            if any(words <= set(other.replace("#", "").split()) or set(other.replace("#", "").split()) <= words
+                   for other, _ in chosen):
+                continue
+            chosen.append((term, score))
+            if len(chosen) >= k:
+                break
+        return chosen
+
+    def take(self, k: int = 3) -> List[str]:
+        """
+        Emerging terms not handed out within the last `cooldown` seconds.
+
+        Agents sharing one detector each call this, so a burst is searched by
+        whichever agent gets to it first rather than by all of them.
+        """
+        now = self.clock()
+        with self._lock:
+            self._handed_out = {term: at for term, at in self._handed_out.items() if now - at < self.cooldown}
+        terms = [term for term, _ in self.emerging(k + len(self._handed_out)) if term not in self._handed_out][:k]
+        with self._lock:
+            self._handed_out.update((term, now) for term in terms)
+        return terms
+
+
+def search_query(term: str) -> str:
+    """A search/stream query fragment for a detected term; bigrams are matched as phrases."""
+    return f'"{term}"' if " " in term else term
@@ -1,18 +1,88 @@
+import logging
 import numpy as np
 import openai
 import operator
 from typing import Any, Dict, Iterable, List, Optional
 import json
 
+from strategy.engagement import ENGAGEMENT_MODEL_PATH, EngagementModel
+from .batch import TweetBatch
+
+logger = logging.getLogger(__name__)
+
 
 class AgentTrainer:
-   def __init__(self, client, weaviate_client, OPENAI_API_KEY):
+   """
+   Trains the local engagement model (strategy/engagement.py) on the stored Tweets.
+
+   Args:
+       model: the model to fit; its settings come from `engagement_model` in params.yaml
+       model_path: where the fitted weights are saved
+       max_rows: most rows read from Weaviate, page_size per request
+       holdout: share of rows kept out of training to report the model's error on
+   """
+
+   def __init__(self, client, weaviate_client, OPENAI_API_KEY, model: EngagementModel = None,
+                model_path: str = ENGAGEMENT_MODEL_PATH, max_rows: int = 100000, page_size: int = 500,
+                holdout: float = 0.1):
        self.weaviate_client = weaviate_client
        self.client = client
        self.OPENAI_API_KEY = OPENAI_API_KEY
        self.prompt = "Score this tweet between between 1 and 10."
-
-   async def run(self):
+       self.model = model or EngagementModel()
+       self.model_path = model_path
+       self.max_rows = max_rows
+       self.page_size = page_size
+       self.holdout = holdout
+
+   def load_rows(self) -> TweetBatch:
+      """Every stored tweet (up to max_rows) through the object cursor, one row per tweet_id."""
+      rows, created, cursor = [], [], None
+      while len(rows) < self.max_rows:
+         page = self.weaviate_client.data_object.get(class_name="Tweets", limit=self.page_size, after=cursor)
+         objects = page.get("objects") or []
+         for obj in objects:
+            if obj["properties"].get("tweet_id"):
+               rows.append(obj["properties"])
+               created.append(int(obj.get("creationTimeUnix") or 0))
+         if len(objects) < self.page_size:
+            break
+         cursor = objects[-1]["id"]
+      batch = TweetBatch.from_weaviate(rows[:self.max_rows])
+      # Timeline rows are written again every cycle; keep the latest copy of each tweet. The cursor
+      # walks objects in uuid order, which says nothing about age, so order by write date first
+      # (creation time breaking ties)
+      order = np.lexsort((np.asarray(created[:self.max_rows], dtype=np.int64), batch.dates))
+      _, last = np.unique(batch.ids[order][::-1], return_index=True)
+      return batch.take(np.sort(order[len(batch) - 1 - last]))
+
+   async def run(self) -> Optional[float]:
+      batch = self.load_rows()
+      if len(batch) < 10:
+         logger.warning("Only %d stored tweets; not training the engagement model", len(batch))
+         return None
+
+      # Hold out a random slice to report how the model does on tweets it has not seen
+      order = np.random.default_rng(0).permutation(len(batch))
+      n_test = int(len(batch) * self.holdout)
+      train, test = batch.take(order[n_test:]), batch.take(order[:n_test])
+      train_rmse = self.model.fit_batch(train)
+      if n_test:
+         y = np.log1p(test.like_counts)
+         rmse = float(np.sqrt(np.mean((self.model.score(test) - y) ** 2)))
+         baseline = float(np.sqrt(np.mean((np.log1p(train.like_counts).mean() - y) ** 2)))
+         logger.info("Engagement model: train RMSE %.3f, holdout RMSE %.3f (predicting the mean: %.3f), %d rows",
+                     train_rmse, rmse, baseline, len(batch))
+      else:
+         rmse = train_rmse
+         logger.info("Engagement model: train RMSE %.3f, %d rows", train_rmse, len(batch))
+
+      self.model.save(self.model_path)
+      logger.info("Saved engagement model to %s", self.model_path)
+      return rmse
+
+   def write_finetuning_data(self, file_path="test.jsonl"):
+      """The earlier OpenAI fine-tune path: 0-10 labels from likes and followers, appended as JSONL."""
       response = (
          self.weaviate_client.query.get(
                "Tweets", ["tweet", "tweet_id", "agent_id", "date", "author_id", "like_count", "follower_count"]
@@ -23,25 +93,10 @@ class AgentTrainer:
 
       x = 100  # number of tweets to return
       sorted_tweets = self.sort_tweets(response, x)
-      likes = []
-      followers = []
-      for tweet in sorted_tweets:
-         like_count = tweet["like_count"]
-         if like_count is None:
-               like_count = 0
-
-         print("Likes:", like_count)
-         likes.append(like_count)
-
-         follower_count = tweet["follower_count"]
-         if follower_count is None:
-               follower_count = 0
-         followers.append(follower_count)
-         print("Followers:", follower_count)
-
+      likes = [tweet["like_count"] or 0 for tweet in sorted_tweets]
+      followers = [tweet["follower_count"] or 0 for tweet in sorted_tweets]
       tweet_ranks = self.rank_tweets(likes, followers)
 
-      file_path = "test.jsonl"
       # Append separator to each tweet
       new_data = [{"prompt": t["tweet"] + "\n\n###\n\n", "completion": str(r)} for t, r in zip(sorted_tweets, tweet_ranks)]
 
@@ -49,8 +104,7 @@ class AgentTrainer:
          for item in new_data:
                json.dump(item, f)  # Write the item as JSON
                f.write("\n")  # Write a newline character after each item
-
-      await self.fine_tune_model(self.prompt)
+      return file_path
 
    def upload_finetuning_data(self, file_path):
       with open(file_path, "rb") as f:
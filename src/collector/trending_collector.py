@@ -1,90 +1,88 @@
 """热门推文收集器 - 查找热门推文并存入数据库"""
 
-import time
+import logging
 import tweepy
 from datetime import datetime, timezone
 from typing import List, Optional
 
+from .topics import TopicDetector, search_query
+from .velocity import Ranked, VelocityTopK
+
+logger = logging.getLogger(__name__)
+
 
 class TrendingCollector:
     """收集热门推文的 Agent"""
     
-    def __init__(self, agent_id: str, client: tweepy.Client, weaviate_client):
+    def __init__(self, agent_id: str, client: tweepy.Client, weaviate_client, window: float = 24 * 3600,
+                 topic_detector: TopicDetector = None):
         self.agent_id = agent_id
         self.client = client
         self.weaviate_client = weaviate_client
+        # 只考虑这段时间内发布的推文 (秒)
+        self.window = window
+        # 新兴话题检测器 (可选), 由 collect_emerging 使用
+        self.topic_detector = topic_detector
+        self._log = {"agent": agent_id}
     
-    async def collect_trending_tweets(self, query: str = "crypto OR bitcoin OR ethereum", max_results: int = 10, use_simple_search: bool = False):
+    async def collect_trending_tweets(self, query: str = "crypto OR bitcoin OR ethereum", max_results: int = 10,
+                                      use_simple_search: bool = False, max_pages: int = 5, top_k: int = 1):
         """
-        搜索热门推文并存入数据库
+        搜索热门推文并存入数据库 (按互动速度排序, 而不是总点赞数)
         
         Args:
             query: 搜索关键词
-            max_results: 最多返回多少条推文
-            use_simple_search: 是否使用简化搜索(避免速率限制)
+            max_results: 每页返回多少条推文
+            use_simple_search: 是否使用简化搜索(不展开作者, 不按粉丝数归一化)
+            max_pages: 最多翻多少页
+            top_k: 保存速度最快的前 k 条
         """
-        print(f"\n🔥 开始搜索热门推文: '{query}'")
+        logger.info("🔥 开始搜索热门推文: '%s'", query, extra=self._log)
         
         try:
-            if use_simple_search:
-                # 使用更简单的搜索,减少 API 调用
-                tweets = self.client.search_recent_tweets(
-                    query=query,
-                    max_results=max_results,
-                    tweet_fields=['public_metrics', 'author_id', 'text']
-                )
-            else:
-                # 搜索最近的热门推文
-                # tweet_fields 包含我们需要的所有字段
-                tweets = self.client.search_recent_tweets(
-                    query=query,
-                    max_results=max_results,
-                    tweet_fields=['created_at', 'public_metrics', 'author_id', 'text'],
-                    expansions=['author_id'],
-                    user_fields=['public_metrics']
-                )
-            
-            if not tweets.data:
-                print("❌ 没有找到推文")
+            ranked = self.rank(query, max_results, max_pages, top_k, use_simple_search)
+            if not ranked:
+                logger.info("❌ 没有找到推文", extra=self._log)
                 return
             
-            # 按点赞数排序
-            sorted_tweets = sorted(
-                tweets.data,
-                key=lambda t: t.public_metrics['like_count'],
-                reverse=True
-            )
-            
-            # 获取第一条(最热门的)推文
-            top_tweet = sorted_tweets[0]
-            
-            print(f"\n✅ 找到最热门的推文!")
-            print(f"📝 内容: {top_tweet.text[:100]}...")
-            print(f"❤️  点赞数: {top_tweet.public_metrics['like_count']}")
-            print(f"🔄 转发数: {top_tweet.public_metrics['retweet_count']}")
-            print(f"💬 回复数: {top_tweet.public_metrics['reply_count']}")
-            
-            # 获取作者信息
-            author_id = top_tweet.author_id
-            follower_count = 0
-            
-            # 从 includes 中获取用户信息
-            if not use_simple_search and tweets.includes and 'users' in tweets.includes:
-                for user in tweets.includes['users']:
-                    if user.id == author_id:
-                        follower_count = user.public_metrics['followers_count']
-                        print(f"👥 作者粉丝数: {follower_count}")
-                        break
-            
-            # 存入 Weaviate 数据库
-            await self._save_to_database(top_tweet, follower_count)
+            for entry in ranked:
+                tweet = entry.tweet
+                logger.info(
+                    "✅ 找到上升最快的推文! 📝 %s... ❤️ %d 🔄 %d 💬 %d ⚡ %.1f",
+                    tweet.text[:100],
+                    tweet.public_metrics['like_count'],
+                    tweet.public_metrics['retweet_count'],
+                    tweet.public_metrics['reply_count'],
+                    entry.score,
+                    extra=self._log,
+                )
+                if not use_simple_search:
+                    logger.info("👥 作者粉丝数: %d", entry.followers_count, extra=self._log)
+                
+                # 存入 Weaviate 数据库
+                await self._save_to_database(tweet, entry.followers_count)
             
-            return top_tweet
+            return ranked[0].tweet
             
         except tweepy.TweepyException as e:
-            print(f"❌ Twitter API 错误: {e}")
+            logger.warning("❌ Twitter API 错误: %s", e, extra=self._log)
         except Exception as e:
-            print(f"❌ 发生错误: {e}")
+            logger.exception("❌ 发生错误: %s", e, extra=self._log)
+    
+    def rank(self, query: str, max_results: int = 100, max_pages: int = 5, top_k: int = 1,
+             use_simple_search: bool = False) -> List[Ranked]:
+        """翻页搜索, 只保留滑动窗口内速度最快的 top_k 条 (内存占用与结果总数无关)"""
+        selector = VelocityTopK(k=top_k, window=self.window)
+        kwargs = {
+            "query": query,
+            "max_results": max(10, min(max_results, 100)),
+            "tweet_fields": ['created_at', 'public_metrics', 'author_id', 'text'],
+        }
+        if not use_simple_search:
+            kwargs.update(expansions=['author_id'], user_fields=['public_metrics'])
+        for response in tweepy.Paginator(self.client.search_recent_tweets, limit=max_pages, **kwargs):
+            selector.push_response(response)
+        return selector.top()
     
     async def _save_to_database(self, tweet, follower_count: int):
         """将推文保存到 Weaviate 数据库"""
@@ -105,70 +103,61 @@ class TrendingCollector:
                 properties,
                 "Tweets",
             )
-            print(f"✅ 推文已成功存入数据库!")
+            logger.info("✅ 推文已成功存入数据库!", extra=self._log)
         except Exception as e:
-            print(f"❌ 存入数据库失败: {e}")
+            logger.warning("❌ 存入数据库失败: %s", e, extra=self._log)
     
-    async def collect_top_tweets_by_topic(self, topics: List[str], tweets_per_topic: int = 1):
+    async def collect_top_tweets_by_topic(self, topics: List[str], tweets_per_topic: int = 1, max_pages: int = 3):
         """
         按主题收集多个热门推文
         
         Args:
             topics: 主题列表，例如 ["crypto", "AI", "web3"]
             tweets_per_topic: 每个主题收集多少条推文
+            max_pages: 每个主题最多翻多少页 (每页 100 条)
         """
-        print(f"\n🔥 开始收集多个主题的热门推文")
+        logger.info("🔥 开始收集多个主题的热门推文", extra=self._log)
         
         all_tweets = []
         for topic in topics:
-            print(f"\n--- 主题: {topic} ---")
+            logger.info("--- 主题: %s ---", topic, extra=self._log)
             query = f"{topic} -is:retweet lang:en"  # 排除转推，只要英文推文
             
             try:
-                tweets = self.client.search_recent_tweets(
-                    query=query,
-                    max_results=10,
-                    tweet_fields=['created_at', 'public_metrics', 'author_id', 'text'],
-                    expansions=['author_id'],
-                    user_fields=['public_metrics']
-                )
+                top_tweets = self.rank(query, max_results=100, max_pages=max_pages, top_k=tweets_per_topic)
                 
-                if tweets.data:
-                    # 按点赞数排序
-                    sorted_tweets = sorted(
-                        tweets.data,
-                        key=lambda t: t.public_metrics['like_count'],
-                        reverse=True
-                    )
-                    
-                    # 取前 N 条
-                    top_tweets = sorted_tweets[:tweets_per_topic]
-                    
-                    for tweet in top_tweets:
-                        print(f"  📝 {tweet.text[:80]}...")
-                        print(f"  ❤️  {tweet.public_metrics['like_count']} 点赞")
-                        
-                        # 获取粉丝数
-                        follower_count = 0
-                        if tweets.includes and 'users' in tweets.includes:
-                            for user in tweets.includes['users']:
-                                if user.id == tweet.author_id:
-                                    follower_count = user.public_metrics['followers_count']
-                                    break
+                if top_tweets:
+                    for entry in top_tweets:
+                        tweet = entry.tweet
+                        logger.info("📝 %s... ❤️ %d 点赞 ⚡ %.1f", tweet.text[:80], tweet.public_metrics['like_count'],
+                                    entry.score, extra=self._log)
                         
                         # 保存到数据库
-                        await self._save_to_database(tweet, follower_count)
+                        await self._save_to_database(tweet, entry.followers_count)
                         all_tweets.append(tweet)
-                        
-                        # 避免速率限制
-                        time.sleep(0.5)
                 else:
-                    print(f"  ❌ 主题 '{topic}' 没有找到推文")
+                    logger.info("❌ 主题 '%s' 没有找到推文", topic, extra=self._log)
                     
             except tweepy.TweepyException as e:
-                print(f"  ❌ Twitter API 错误: {e}")
+                logger.warning("❌ Twitter API 错误: %s", e, extra=self._log)
             except Exception as e:
-                print(f"  ❌ 发生错误: {e}")
+                logger.exception("❌ 发生错误: %s", e, extra=self._log)
         
-        print(f"\n✅ 总共收集了 {len(all_tweets)} 条热门推文!")
+        logger.info("✅ 总共收集了 %d 条热门推文!", len(all_tweets), extra=self._log)
         return all_tweets
+    
+    async def collect_emerging(self, max_topics: int = 3, tweets_per_topic: int = 1, max_pages: int = 3):
+        """
+        收集检测器发现的新兴话题的热门推文
+        
+        共享同一个检测器的多个 Agent 不会重复搜索同一个话题 (见 TopicDetector.take)
+        """
+        if self.topic_detector is None:
+            return []
+        terms = self.topic_detector.take(max_topics)
+        if not terms:
+            logger.info("ℹ️  暂时没有新兴话题", extra=self._log)
+            return []
+        logger.info("📈 新兴话题: %s", ", ".join(terms), extra=self._log)
+        return await self.collect_top_tweets_by_topic([search_query(term) for term in terms], tweets_per_topic,
+                                                      max_pages)
@@ -0,0 +1,159 @@
+"""Streaming top-k of tweets by engagement velocity.
+
+Velocity is (likes + retweets) per hour since `created_at`, per thousand
+author followers, so a fast-rising tweet from a small account can outrank a
+day-old post from a large one. `VelocityTopK` keeps only the best `k` tweets
+inside a sliding time window in a min-heap, so any number of search pages or
+stream payloads can be fed through it in constant memory.
+"""
+
+import heapq
+import itertools
+import math
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union
+
+# Tweets younger than this are scored as if this old, so a two-minute-old tweet with one like does not win
+MIN_AGE_HOURS = 0.25
+# Accounts smaller than this are scored as if this large
+MIN_FOLLOWERS = 100
+
+
+def _timestamp(created_at: Union[datetime, str, None]) -> Optional[float]:
+    if created_at is None:
+        return None
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    return created_at.timestamp()
+
+
+def velocity(like_count: int, retweet_count: int, created_ts: float, followers_count: int, now: float) -> float:
+    hours = max((now - created_ts) / 3600, MIN_AGE_HOURS)
+    return (like_count + retweet_count) / hours / (max(followers_count, MIN_FOLLOWERS) / 1000)
+
+
+class Ranked(NamedTuple):
+    score: float
+    tweet_id: int
+    created_ts: float
+    tweet: Any
+    followers_count: int
+
+
+class VelocityTopK:
+    """
+    The `k` highest-velocity tweets created within the last `window` seconds.
+
+    A tweet seen again (a later page, or a stream update with fresh metrics)
+    keeps the higher of its scores; only ever raising scores is what lets a
+    bounded heap give the exact top-k. `new_entries()` returns what entered
+    the top-k since the previous call, so callers can act on risers as they
+    appear.
+    """
+
+    def __init__(self, k: int = 10, window: float = 24 * 3600, clock: Callable[[], float] = time.time):
+        self.k = k
+        self.window = window
+        self.clock = clock
+        self._heap: List[tuple] = []  # (score, seq, Ranked); min at the root
+        self._live: Dict[int, Ranked] = {}
+        self._emitted: set = set()
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def _compact(self):
+        # Stale heap entries (replaced or evicted tweets) are dropped lazily
+        self._heap = [entry for entry in self._heap if self._live.get(entry[2].tweet_id) is entry[2]]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Optional[Ranked]:
+        while self._heap:
+            _, _, ranked = heapq.heappop(self._heap)
+            if self._live.get(ranked.tweet_id) is ranked:
+                del self._live[ranked.tweet_id]
+                return ranked
+        return None
+
+    def _min(self) -> Optional[Ranked]:
+        while self._heap:
+            ranked = self._heap[0][2]
+            if self._live.get(ranked.tweet_id) is ranked:
+                return ranked
+            heapq.heappop(self._heap)
+        return None
+
+    def evict(self, now: float = None):
+        cutoff = (self.clock() if now is None else now) - self.window
+        expired = [tweet_id for tweet_id, ranked in self._live.items() if ranked.created_ts < cutoff]
+        for tweet_id in expired:
+            del self._live[tweet_id]
+            self._emitted.discard(tweet_id)
+        if expired:
+            self._compact()
+
+    def push(self, tweet_id, like_count: int, retweet_count: int, created_at, followers_count: int = 0,
+             tweet: Any = None) -> bool:
+        """Offer a tweet; True if it is in the top-k afterwards."""
+        now = self.clock()
+        created_ts = _timestamp(created_at)
+        if created_ts is None or created_ts < now - self.window:
+            return False
+        tweet_id = int(tweet_id)
+        score = velocity(like_count, retweet_count, created_ts, followers_count, now)
+        if math.isnan(score):
+            return False
+
+        current = self._live.get(tweet_id)
+        if current is not None and score <= current.score:
+            return True
+        if current is None and len(self._live) >= self.k:
+            lowest = self._min()
+            if lowest is not None and score <= lowest.score:
+                return False
+            self._pop_min()
+            if lowest is not None:
+                self._emitted.discard(lowest.tweet_id)
+
+        ranked = Ranked(score, tweet_id, created_ts, tweet, followers_count)
+        self._live[tweet_id] = ranked
+        heapq.heappush(self._heap, (score, next(self._seq), ranked))
+        if len(self._heap) > 4 * max(self.k, 1):
+            self._compact()
+        return True
+
+    def push_tweet(self, tweet, followers_count: int = 0) -> bool:
+        """Offer a tweepy `Tweet` (or stream `data` dict) with created_at and public_metrics."""
+        get = tweet.get if isinstance(tweet, dict) else lambda name: getattr(tweet, name, None)
+        metrics = get("public_metrics") or {}
+        return self.push(get("id"), metrics.get("like_count", 0), metrics.get("retweet_count", 0),
+                         get("created_at"), followers_count, tweet)
+
+    def push_response(self, response) -> int:
+        """Offer every tweet of a tweepy Response, with author follower counts from its includes."""
+        followers = {}
+        for user in (response.includes or {}).get("users", []):
+            followers[user.id] = (user.public_metrics or {}).get("followers_count", 0)
+        return sum(self.push_tweet(tweet, followers.get(tweet.author_id, 0)) for tweet in response.data or [])
+
+    def push_payload(self, payload: dict) -> bool:
+        """Offer a filtered-stream payload ({"data", "includes"})."""
+        tweet = payload["data"]
+        followers = 0
+        for user in (payload.get("includes") or {}).get("users", []):
+            if user.get("id") == tweet.get("author_id"):
+                followers = (user.get("public_metrics") or {}).get("followers_count", 0)
+        return self.push_tweet(tweet, followers)
+
+    def top(self) -> List[Ranked]:
+        """Current top-k, best first."""
+        self.evict()
+        return sorted(self._live.values(), key=lambda ranked: ranked.score, reverse=True)
+
+    def new_entries(self) -> List[Ranked]:
+        """Tweets that entered the top-k since the last call, best first."""
+        fresh = [ranked for ranked in self.top() if ranked.tweet_id not in self._emitted]
+        self._emitted.update(ranked.tweet_id for ranked in fresh)
+        return fresh
@@ -0,0 +1,144 @@
+"""Persistent per-agent, per-source read positions (Twitter `since_id`s and pagination tokens)."""
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WATERMARKS_PATH = "./data/watermarks.json"
+
+
+class WatermarkStore:
+    """
+    A small JSON file mapping agent -> source -> position.
+
+    One store is shared by every agent in the process; each update is written
+    through (write then rename), so a restart resumes where the last cycle
+    stopped.
+    """
+
+    def __init__(self, path: str = WATERMARKS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self._data = json.load(f)
+        except FileNotFoundError:
+            self._data = {}
+
+    def _entry(self, agent_id, source: str) -> dict:
+        return self._data.get(str(agent_id), {}).get(source, {})
+
+    def since_id(self, agent_id, source: str) -> Optional[str]:
+        with self._lock:
+            return self._entry(agent_id, source).get("since_id")
+
+    def advance(self, agent_id, source: str, newest_id):
+        """Move `source`'s since_id forward to `newest_id`; never backwards."""
+        if newest_id is None:
+            return
+        with self._lock:
+            entry = self._data.setdefault(str(agent_id), {}).setdefault(source, {})
+            current = entry.get("since_id")
+            if current is None or int(newest_id) > int(current):
+                entry["since_id"] = str(newest_id)
+                self._save()
+
+    def backlog(self, agent_id, source: str) -> Optional[dict]:
+        """The unfinished read a budget cut short: {"pagination_token", "newest_id"}, or None."""
+        with self._lock:
+            backlog = self._entry(agent_id, source).get("backlog")
+            return dict(backlog) if backlog else None
+
+    def set_backlog(self, agent_id, source: str, pagination_token: Optional[str], newest_id=None):
+        with self._lock:
+            entry = self._data.setdefault(str(agent_id), {}).setdefault(source, {})
+            if pagination_token is None:
+                entry.pop("backlog", None)
+            else:
+                backlog = entry.get("backlog") or {}
+                backlog["pagination_token"] = pagination_token
+                if newest_id is not None:
+                    backlog["newest_id"] = str(newest_id)
+                entry["backlog"] = backlog
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._data, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def fetch_new(method: Callable, watermarks: WatermarkStore, agent_id, source: str, max_tweets: int,
+              page_size: int = 100, supports_since_id: bool = True, **kwargs) -> List:
+    """
+    Read the tweets `source` gained since the last call, newest first, up to `max_tweets`.
+
+    `method` is a paginated tweepy.Client read (get_home_timeline,
+    get_list_tweets, ...) and `kwargs` its other arguments. When the budget
+    runs out mid-way, the pagination token is stored and the next call first
+    finishes that backlog (the older tweets), then reads the head again. The
+    very first read of a source only takes the newest `max_tweets`.
+    Endpoints without a `since_id` parameter (list tweets) are cut off
+    client-side at the watermark.
+    """
+    since_id = watermarks.since_id(agent_id, source)
+    floor = int(since_id) if since_id is not None else None
+    tweets = []
+
+    def pages(token):
+        # Yields (response, new tweets, next_token); stops at the watermark or the budget
+        while len(tweets) < max_tweets:
+            request = dict(kwargs, max_results=max(5, min(page_size, max_tweets - len(tweets))))
+            if token is not None:
+                request["pagination_token"] = token
+            if supports_since_id and since_id is not None:
+                request["since_id"] = since_id
+            response = method(**request)
+            data = response.data or []
+            token = (response.meta or {}).get("next_token")
+            if floor is not None and not supports_since_id:
+                fresh = [t for t in data if int(t.id) > floor]
+                if len(fresh) < len(data):
+                    token = None
+                data = fresh
+            yield response, data, token
+            if token is None:
+                return
+
+    backlog = watermarks.backlog(agent_id, source)
+    if backlog is not None:
+        token = backlog["pagination_token"]
+        for _, data, token in pages(token):
+            tweets.extend(data)
+        if token is None:
+            # Backlog done: everything up to the newest id of that read is in
+            watermarks.set_backlog(agent_id, source, None)
+            watermarks.advance(agent_id, source, backlog.get("newest_id"))
+            since_id = watermarks.since_id(agent_id, source)
+            floor = int(since_id) if since_id is not None else None
+        else:
+            watermarks.set_backlog(agent_id, source, token)
+            return tweets
+
+    newest_id = None
+    token = None
+    for response, data, token in pages(None):
+        if newest_id is None and data:
+            newest_id = (response.meta or {}).get("newest_id") or data[0].id
+        tweets.extend(data)
+    if token is None or since_id is None:
+        # A first read only starts the watermark; history older than the budget is not backfilled
+        watermarks.advance(agent_id, source, newest_id)
+    else:
+        logger.info("%s: read budget of %d tweets spent, resuming next cycle", source, max_tweets,
+                    extra={"agent": agent_id})
+        watermarks.set_backlog(agent_id, source, token, newest_id)
+    return tweets
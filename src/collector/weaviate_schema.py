@@ -1,60 +1,15 @@
-import weaviate
-import json
-
-client = weaviate.Client("http://localhost:8080")
-
-class_obj = {
-    "class": "Tweets",
-    "description": "Recent tweet from the timeline",  # description of the class
-    "properties": [
-        {
-            "dataType": ["text"],
-            "description": "tweet text",
-            "name": "tweet",
-        },
-        {
-            "dataType": ["text"],
-            "description": "tweet id",
-            "name": "tweet_id",
-        },
-        {
-            "dataType": ["text"],
-            "description": "agent id",
-            "name": "agent_id",
-        },
-        {
-            "dataType": ["date"],
-            "description": "date",
-            "name": "date",
-        },
-        {
-            "dataType": ["int"],
-            "description": "follower count",
-            "name": "follower_count",
-        },
-        {
-            "dataType": ["int"],
-            "description": "like count",
-            "name": "like_count",
-        },
-            ],
-    "vectorizer": "text2vec-openai",
-}
-
-# add the schema
-# client.schema.create_class(class_obj)
-
-add_prop = {
-            "dataType": ["int"],
-            "description": "like count",
-            "name": "like_count",
-        }
+"""Create or migrate the Tweets/Remilio schema; see store/schema.py (same as setup_schema.py)."""
 
+import json
+import os
+import sys
 
-client.schema.property.create("Tweets", add_prop)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# get the schema
-schema = client.schema.get()
+from store.schema import SchemaManager
+from utils.params import load_params
+from utils.transport import get_transport
 
-# print the schema
-print(json.dumps(schema, indent=4))
+if __name__ == "__main__":
+    manager = SchemaManager.from_params(get_transport().weaviate(), load_params())
+    print(json.dumps(manager.migrate(), indent=4))
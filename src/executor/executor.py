@@ -1,62 +1,87 @@
-from typing import List
-from langchain.docstore.document import Document
+import logging
+from typing import Iterable, List
+
+import requests
+import tweepy
+
+from collector.batch import TweetAction
+from collector.mentions import OwnTweetIndex
+
+logger = logging.getLogger(__name__)
 
 
 class TwitterExecutor:
-    def __init__(self, agent_id, client):
+    def __init__(self, agent_id, client, own_tweets: OwnTweetIndex = None):
         self.agent_id = agent_id
         self.client = client
+        # Everything the agent posts is recorded, so replies to it can be recognised
+        self.own_tweets = own_tweets
 
-    def execute_actions(self, tweet_actions: List[Document]):
+    def execute_actions(self, tweet_actions: Iterable[TweetAction]) -> List[TweetAction]:
+        """Carry out every action; one that fails (a 429 included) is logged and skipped. Returns the failed ones."""
+        failed = []
         for tweet_action in tweet_actions:
-            if tweet_action.metadata["action"] == "like_timeline_tweets":
-                print("Tweet Liked:", tweet_action.metadata["tweet_id"])
-                self.client.like(tweet_action.metadata["tweet_id"])
-            elif tweet_action.metadata["action"] == "retweet_timeline_tweets":
-                print("Tweet Retweeted:", tweet_action.metadata["tweet_id"])
-                self.client.retweet(tweet_action.metadata["tweet_id"])
-            elif tweet_action.metadata["action"] == "reply_to_timeline":
-                self.handle_tweet_action(
-                    self.reply_to_timeline,
-                    tweet_action.page_content,
-                    tweet_action.metadata["tweet_id"],
-                )
-            # TODO: Add GIF reply to timeline
-            elif tweet_action.metadata["action"] == "gif_reply_to_timeline":
-                self.handle_tweet_action(
-                    self.gif_reply_to_timeline,
-                    tweet_action.page_content,
-                    tweet_action.metadata["tweet_id"],
-                    tweet_action.metadata["media_id"],
-                )
-            elif tweet_action.metadata["action"] == "quote_tweet":
-                self.handle_tweet_action(
-                    self.quote_tweet,
-                    tweet_action.page_content,
-                    tweet_action.metadata["tweet_id"],
-                )
-            elif tweet_action.metadata["action"] == "post_tweet":
-                self.handle_tweet_action(self.post_tweet, tweet_action.page_content)
-            elif tweet_action.metadata["action"] == "none":
-                pass
+            try:
+                self.execute_action(tweet_action)
+            except (tweepy.TweepyException, requests.RequestException) as e:
+                logger.warning("%s on %s failed: %s", tweet_action.action, tweet_action.tweet_id, e,
+                               extra={"agent": self.agent_id})
+                failed.append(tweet_action)
+        return failed
+
+    def execute_action(self, tweet_action: TweetAction):
+        action = tweet_action.action
+        if action == "like_timeline_tweets":
+            logger.info("Tweet liked: %s", tweet_action.tweet_id, extra={"agent": self.agent_id})
+            self.client.like(tweet_action.tweet_id)
+        elif action == "retweet_timeline_tweets":
+            logger.info("Tweet retweeted: %s", tweet_action.tweet_id, extra={"agent": self.agent_id})
+            self.client.retweet(tweet_action.tweet_id)
+        elif action == "reply_to_timeline":
+            self.handle_tweet_action(
+                self.reply_to_timeline,
+                tweet_action.text,
+                tweet_action.tweet_id,
+            )
+        # TODO: Add GIF reply to timeline
+        elif action == "gif_reply_to_timeline":
+            self.handle_tweet_action(
+                self.gif_reply_to_timeline,
+                tweet_action.text,
+                tweet_action.tweet_id,
+                tweet_action.media_id,
+            )
+        elif action == "quote_tweet":
+            self.handle_tweet_action(
+                self.quote_tweet,
+                tweet_action.text,
+                tweet_action.tweet_id,
+            )
+        elif action == "post_tweet":
+            self.handle_tweet_action(self.post_tweet, tweet_action.text)
+        elif action == "none":
+            pass
 
     def handle_tweet_action(self, action_function, *args):
-        action_function(*args)
+        response = action_function(*args)
+        if self.own_tweets is not None and response is not None and response.data:
+            self.own_tweets.add(response.data["id"])
 
     def reply_to_timeline(self, tweet_text, tweet_id):
-        print("Tweet Replied:", tweet_text)
+        logger.info("Tweet replied: %s", tweet_text, extra={"agent": self.agent_id, "tweet_id": tweet_id})
         return self.client.create_tweet(text=tweet_text, in_reply_to_tweet_id=tweet_id)
 
     def gif_reply_to_timeline(self, tweet_text, tweet_id, media_id):
-        print("Tweet Replied with GIF:", tweet_text, media_id)
+        logger.info("Tweet replied with GIF: %s", tweet_text,
+                    extra={"agent": self.agent_id, "tweet_id": tweet_id, "media_id": media_id})
         return self.client.create_tweet(
             text=tweet_text, in_reply_to_tweet_id=tweet_id, media_ids=media_id
         )
 
     def quote_tweet(self, tweet_text, tweet_id):
-        print("Tweet Quoted:", tweet_text)
+        logger.info("Tweet quoted: %s", tweet_text, extra={"agent": self.agent_id, "tweet_id": tweet_id})
         return self.client.create_tweet(text=tweet_text, quote_tweet_id=tweet_id)
 
     def post_tweet(self, tweet_text):
-        print("Tweet Posted:", tweet_text)
+        logger.info("Tweet posted: %s", tweet_text, extra={"agent": self.agent_id})
         return self.client.create_tweet(text=tweet_text)
@@ -3,10 +3,11 @@
 import os
 import json
 import time
-import weaviate
 import yaml
 import pdb
 import asyncio
+import logging
+import threading
 from functools import wraps
 
 import click
@@ -16,16 +17,40 @@ from langchain.vectorstores import Weaviate
 from langchain.embeddings.openai import OpenAIEmbeddings
 
 
-from twitter_client import fetch_clients
+from twitter_client import API_KEY, API_SECRET_KEY, BEARER_TOKEN, BEARER_TOKENS, TOKENS_PATH, fetch_clients, load_tokens
+from supervisor import AgentSupervisor, ConfigWatcher, apply_policy
+from scheduler import REDIS_URL, RedisQuota, RedisScheduler, Worker, connect
+from utils.params import PARAMS_PATH, load_params
+from utils.log import setup_logging
+from utils.metrics import REACTION_SECONDS, InstrumentedClient, stage_timer, start_metrics_server
+from utils.router import CredentialRouter, ReadCache
+from utils.transport import WEAVIATE_URL, configure_transport
 from executor.executor import TwitterExecutor
+from collector.batch import TweetBatch
 from collector.collector import TwitterCollector
+from collector.followers import FollowerSync
+from collector.mentions import MentionsPoller, OwnTweetIndex
+from collector.watermarks import WatermarkStore, fetch_new
 from collector.trainer import AgentTrainer
 from collector.trending_collector import TrendingCollector
+from collector.stream import API_URL, FilteredStream, StreamCollector
+from collector.topics import TopicDetector
 from strategy.strategy import TwitterStrategy
+from strategy.sampler import ActionSampler
+from strategy.budget import HourlyBudget, TokenCounter, TokenGovernor
+from strategy.engagement import ENGAGEMENT_MODEL_PATH, EngagementModel
+from store.retention import RetentionJob
+from store.schema import SchemaManager
+from store.writer import BatchWriter
+from webhook.app import WebhookServer, create_app
+from webhook.events import WebhookDispatcher
 
 # load environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 USER_ID = os.getenv("USER_ID", "")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+logger = logging.getLogger(__name__)
 
 
 def async_command(f):
@@ -55,75 +80,251 @@ def cli():
     "--train", default=False, is_flag=True, help="Train Model"
 )
 @click.option(
-    "--collect-trending", default=False, is_flag=True, help="Collect trending tweets"
+    "--collect-trending", default=False, is_flag=True,
+    help="Collect trending tweets for the configured topics, then for emerging topics every cycle."
+)
+@click.option(
+    "--stream", default=False, is_flag=True, help="Ingest topic matches from the filtered stream."
+)
+@click.option("--stream-url", default=API_URL, help="Filtered-stream API root (e.g. a sim.stream_server).")
+@click.option(
+    "--simulate", default=False, is_flag=True, help="Run the engine on a virtual clock against stub backends."
+)
+@click.option("--sim-agents", default=3, help="Number of simulated agents.")
+@click.option("--sim-hours", default=24.0, help="Virtual hours to simulate.")
+@click.option("--sim-trace", default=None, type=click.Path(), help="Write per-cycle JSON traces to this file.")
+@click.option(
+    "--log-level", default="INFO", type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR"], case_sensitive=False)
+)
+@click.option("--log-format", default="text", type=click.Choice(["text", "json"]))
+@click.option(
+    "--metrics-port", default=METRICS_PORT, help="Serve Prometheus/OpenMetrics on this port (0 = disabled)."
+)
+@click.option(
+    "--reload-interval", default=5.0,
+    help="Seconds between checks of tokens.yml and params.yaml for changes (0 = no hot reload)."
+)
+@click.option(
+    "--worker", default=False, is_flag=True,
+    help="Run agent cycles as jobs leased from Redis, alongside any number of other workers."
+)
+@click.option("--redis-url", default=REDIS_URL, help="Redis for --worker (or REDIS_URL).")
+@click.option(
+    "--webhook", default=False, is_flag=True,
+    help="Receive mentions and follows from Account Activity webhooks and react at once instead of polling."
 )
 @async_command
-async def main(run_engine: bool, test: bool, ingest: bool, train: bool, collect_trending: bool):
-    twitter_clients = fetch_clients()
-    weaviate_client = weaviate.Client("http://localhost:8080")
+async def main(run_engine: bool, test: bool, ingest: bool, train: bool, collect_trending: bool,
+               stream: bool, stream_url: str, simulate: bool, sim_agents: int, sim_hours: float, sim_trace: str,
+               log_level: str, log_format: str, metrics_port: int, reload_interval: float, worker: bool,
+               redis_url: str, webhook: bool):
+    if webhook and worker:
+        # inboxes are per process, and Redis hands an agent's cycles to any worker
+        raise click.UsageError("--webhook cannot be combined with --worker")
+    setup_logging(log_level, log_format)
+    if metrics_port:
+        start_metrics_server(metrics_port)
+        logger.info("Serving metrics on :%d/metrics", metrics_port)
+
+    if simulate:
+        await run_simulation(sim_agents, sim_hours, sim_trace)
+        return
+
+    # started before the first read, so an edit made while agents are being built is not missed
+    watcher = ConfigWatcher({"tokens": TOKENS_PATH, "params": PARAMS_PATH}) if reload_interval else None
+    params = load_params()
+    tokens = load_tokens()
+    # every HTTP client below (Twitter, Weaviate, OpenAI, Giphy) shares one set of keep-alive pools
+    transport = configure_transport(params)
+    transport.install_openai()
+    # reads any agent could make are coalesced and cached across agents for a short TTL
+    # workers share each credential's rate-limit quota through Redis, so a 429 on one node steers them all
+    redis = connect(redis_url) if worker else None
+    router = CredentialRouter(BEARER_TOKENS, API_KEY, API_SECRET_KEY, cache=ReadCache.from_params(params),
+                              quota=(lambda name: RedisQuota(redis, name)) if redis is not None else None)
+    weaviate_client = transport.weaviate(WEAVIATE_URL)
+    # additive changes only; a needed class rebuild is logged and left to setup_schema.py
+    SchemaManager.from_params(weaviate_client, params).migrate(rebuild=False)
 
     llm = OpenAI(temperature=0.9)
     embeddings = OpenAIEmbeddings()
 
-    # spawn collector, strategy, and executor for each client
-    agents = []
-    for twitter_client in twitter_clients:
-        client = twitter_client["client"]
+    topics = params.get("trending_topics") or ["AI", "crypto", "web3", "blockchain", "technology"]
+    # one emerging-topic detector, fed by the stream and every agent's timeline and lists
+    topic_detector = TopicDetector.from_params(params)
+    max_emerging = (params.get("topic_detection") or {}).get("max_topics", 3)
+
+    # one filtered stream per app, shared by every agent
+    stop_stream = threading.Event()
+    stream_thread = None
+    if stream:
+        stream_config = params.get("stream") or {}
+        writer = BatchWriter(weaviate_client, batch_size=stream_config.get("batch_size", 100),
+                             max_delay=stream_config.get("max_delay_seconds", 2.0))
+        stream_collector = StreamCollector(FilteredStream(BEARER_TOKEN, stream_url, transport.session()), writer,
+                                           topics, listeners=[topic_detector.observe_payload])
+        stream_thread = threading.Thread(target=stream_collector.run, args=(stop_stream,), name="stream",
+                                         daemon=True)
+        stream_thread.start()
+
+    # TTL deletes and duplicate collapsing on Tweets, a bounded slice per hour
+    # deletes for good, so only when opted in and only for the long-running engine, never --test
+    retention = None
+    if (params.get("retention") or {}).get("enabled") and (run_engine or worker) and not test:
+        retention = RetentionJob.from_params(weaviate_client, params).start()
+
+    # one fleet-wide LLM token budget, shared by every agent's governor
+    global_budget = HourlyBudget((params.get("llm_budget") or {}).get("global_tokens_per_hour"))
+    token_counter = TokenCounter(llm.model_name)
+    watermarks = WatermarkStore()
+    # pushed mentions and follows go to per-agent inboxes that wake the agent's engine loop
+    dispatcher = WebhookDispatcher.from_params(params, watermarks) if webhook else None
+
+    # one engagement model for every agent, trained on the shared Tweets class
+    engagement_config = params.get("engagement_model") or {}
+    model_path = engagement_config.get("path", ENGAGEMENT_MODEL_PATH)
+    if train:
+        trainer = AgentTrainer(None, weaviate_client, OPENAI_API_KEY, EngagementModel.from_params(params), model_path,
+                               max_rows=engagement_config.get("max_rows", 100000))
+        await trainer.run()
+    ranker = None
+    if engagement_config.get("enabled", True) and os.path.exists(model_path):
+        ranker = EngagementModel.load(model_path)
+        logger.info("Ranking candidates with the engagement model in %s", model_path)
+
+    # spawn collector, strategy, and executor for each client; also used for accounts added to tokens.yml later
+    async def build_agent(token: dict, params: dict) -> tuple:
+        twitter_client = fetch_clients([token], router=router)[0]
         agent_id = twitter_client["agent_id"]
+        client = InstrumentedClient(twitter_client["client"], agent_id)
         agent_name = twitter_client["user_name"]
 
         vectorstore = Weaviate(weaviate_client, "Remilio", "content", embeddings)
 
-        collector = TwitterCollector(agent_id, client, vectorstore, weaviate_client)
-        strategy = TwitterStrategy(llm, twitter_client, vectorstore)
-        executor = TwitterExecutor(agent_id, client)
+        # with the webhook, follows are pushed and mentions come from the inbox rather than polling
+        follower_sync = FollowerSync.from_params(params, agent_id, client, pushed=dispatcher is not None)
+        own_tweets = OwnTweetIndex()
+        if dispatcher is not None:
+            mentions = dispatcher.inbox(agent_id)
+        else:
+            mentions = MentionsPoller.from_params(params, agent_id, client, watermarks, own_tweets)
+        collector = TwitterCollector(agent_id, client, vectorstore, weaviate_client, follower_sync, mentions,
+                                     watermarks, (params.get("ingest") or {}).get("tweets_per_cycle", 100),
+                                     topic_detector)
+        sampler = ActionSampler.from_params(params, twitter_client["strategy"], agent_id)
+        budget = TokenGovernor.from_params(
+            params, global_budget, twitter_client.get("token_budget"),
+            max_completion_tokens=llm.max_tokens if llm.max_tokens > 0 else 256, counter=token_counter,
+        )
+        strategy = TwitterStrategy(llm, twitter_client, vectorstore, sampler, budget,
+                                   pack_size=params.get("reply_pack_size", 1),
+                                   max_mention_replies=(params.get("mentions") or {}).get("max_replies_per_cycle", 10),
+                                   ranker=ranker)
+        executor = TwitterExecutor(agent_id, client, own_tweets)
 
         if ingest:
             await collector.ingest()
 
-        if train:
-            trainer = AgentTrainer(client, weaviate_client, OPENAI_API_KEY)
-            await trainer.run()
-        
+        trending_collector = None
         if collect_trending:
-            trending_collector = TrendingCollector(agent_id, client, weaviate_client)
-            print(f"\n🔥 收集 {agent_name} 的热门推文")
+            trending_collector = TrendingCollector(agent_id, client, weaviate_client, topic_detector=topic_detector)
+            logger.info("🔥 收集 %s 的热门推文", agent_name, extra={"agent": agent_name})
             # 收集多个主题的热门推文
-            topics = ["AI", "crypto", "web3", "blockchain", "technology"]
             await trending_collector.collect_top_tweets_by_topic(topics, tweets_per_topic=1)
 
-        agents.append((collector, strategy, executor, agent_name, agent_id, client, weaviate_client))
+        return (collector, strategy, executor, agent_name, agent_id, client, weaviate_client, trending_collector)
+
+    async def run_agent(handle):
+        collector, strategy, executor, agent_name, agent_id, client, agent_weaviate, trending = handle.parts
+        await run(collector, strategy, executor, agent_name, agent_id, test, client, agent_weaviate,
+                  trending=trending, max_emerging=max_emerging, stop=handle.stop, before_cycle=handle.apply_pending,
+                  inbox=dispatcher.inbox(agent_id) if dispatcher is not None else None)
+
+    def apply_agent_policy(handle, params: dict):
+        collector, strategy = handle.parts[:2]
+        apply_policy(params, handle.token, strategy, collector)
+
+    def retire_agent(handle):
+        router.remove_user(handle.agent_id)
+        if dispatcher is not None:
+            dispatcher.remove(handle.agent_id)
+
+    agents = [(token, await build_agent(token, params)) for token in tokens]
+
+    webhook_server = None
+    if dispatcher is not None:
+        webhook_server = WebhookServer.from_params(create_app(API_SECRET_KEY, dispatcher), params).start()
 
     # run
-    if run_engine:
-        await asyncio.gather(
-            *(
-                run(collector, strategy, executor, agent_name, agent_id, test, client, weaviate_client)
-                for collector, strategy, executor, agent_name, agent_id, client, weaviate_client in agents
-            )
-        )
+    try:
+        if worker:
+            # every worker holds the same tokens.yml; Redis decides which one runs which agent's next cycle
+            by_id = {str(parts[4]): parts for _, parts in agents}
+
+            async def cycle(agent_id: str):
+                collector, strategy, executor, agent_name, _, client, agent_weaviate, trending = by_id[agent_id]
+                await run_cycle(collector, strategy, executor, agent_name, agent_id, test, client, agent_weaviate,
+                                trending, max_emerging)
+
+            scheduler = RedisScheduler.from_params(redis, params)
+            scheduler.register(by_id)
+            logger.info("Worker %s serving %d agents from %s", scheduler.worker_id, len(by_id), redis_url)
+            await Worker.from_params(scheduler, cycle, params, agents=by_id).run()
+        elif run_engine:
+            # tokens.yml and params.yaml edits start, stop or retune only the agents they touch
+            supervisor = AgentSupervisor(build_agent, run_agent, apply_agent_policy, params,
+                                         retire=retire_agent,
+                                         watcher=watcher, interval=reload_interval)
+            await supervisor.serve(agents)
+        elif stream_thread is not None:
+            while stream_thread.is_alive():
+                await asyncio.sleep(1)
+    finally:
+        stop_stream.set()
+        if retention is not None:
+            retention.close()
+        if webhook_server is not None:
+            webhook_server.close()
+
 
+async def run_simulation(n_agents: int, hours: float, trace_path: str = None):
+    """Compress `hours` of multi-agent operation into seconds (see sim/simulate.py)."""
+    from sim.simulate import simulate
 
-async def collect_tweets_from_timeline(client, agent_id, agent_name, weaviate_client):
+    trace = open(trace_path, "w") if trace_path else None
+    try:
+        summary = await simulate(n_agents, hours, params=load_params(), trace=trace)
+    finally:
+        if trace:
+            trace.close()
+    logger.info("Simulation summary: %s", json.dumps(summary))
+
+
+async def collect_tweets_from_timeline(client, agent_id, agent_name, weaviate_client, watermarks=None,
+                                       max_tweets=10, topic_detector=None):
     """从 Twitter 时间线收集推文的辅助函数"""
-    print(f"\033[96m\033[1m\n*****{agent_name} 推文收集 Agent 🌟 *****\n\033[0m\033[0m")
-    print(f"📡 正在从时间线获取最新推文...")
-    
+    log = {"agent": agent_name}
+    logger.info("📡 正在从时间线获取最新推文...", extra=log)
+
     try:
         from datetime import datetime, timezone
         
-        # 获取时间线推文
-        timeline = client.get_home_timeline(
-            max_results=10,
-            tweet_fields=['created_at', 'public_metrics', 'author_id', 'text']
-        )
+        # 获取时间线推文 (只取上次之后的新推文)
+        tweet_fields = ['created_at', 'public_metrics', 'author_id', 'text']
+        if watermarks is not None:
+            tweets = fetch_new(client.get_home_timeline, watermarks, agent_id, "home_timeline", max_tweets,
+                               tweet_fields=tweet_fields)
+        else:
+            tweets = client.get_home_timeline(max_results=max_tweets, tweet_fields=tweet_fields).data
         
-        if timeline.data:
-            print(f"✅ 找到 {len(timeline.data)} 条新推文")
+        if tweets:
+            logger.info("✅ 找到 %d 条新推文", len(tweets), extra=log)
             now = datetime.now(timezone.utc).isoformat(timespec="seconds")
             
             saved_count = 0
-            for tweet in timeline.data:
+            for tweet in tweets:
+                if topic_detector is not None:
+                    topic_detector.observe(tweet.text)
                 properties = {
                     "tweet": tweet.text,
                     "tweet_id": str(tweet.id),
@@ -135,56 +336,144 @@ async def collect_tweets_from_timeline(client, agent_id, agent_name, weaviate_cl
                 }
                 
                 try:
-                    weaviate_client.data_object.create(properties, "Tweets")
+                    with stage_timer("weaviate", agent_id):
+                        weaviate_client.data_object.create(properties, "Tweets")
                     saved_count += 1
                 except Exception as e:
                     # 可能是重复推文,静默忽略
                     pass
             
-            print(f"✅ 成功存入 {saved_count} 条推文到数据库")
+            logger.info("✅ 成功存入 %d 条推文到数据库", saved_count, extra=log)
         else:
-            print("ℹ️  时间线暂时没有新推文")
+            logger.info("ℹ️  时间线暂时没有新推文", extra=log)
             
     except Exception as e:
-        print(f"⚠️  收集推文时出错: {e}")
-        print("ℹ️  将继续使用数据库中的现有推文")
+        logger.warning("⚠️  收集推文时出错: %s", e, extra=log)
+        logger.info("ℹ️  将继续使用数据库中的现有推文", extra=log)
+
+
+async def run_cycle(collector, strategy, executor, agent_name, agent_id, test, client=None, weaviate_client=None,
+                    trending=None, max_emerging=3):
+    """Run a single collect -> strategy -> execute iteration for one agent."""
+    log = {"agent": agent_name}
 
+    # Step 0: 先收集最新推文 (新增!)
+    if client and weaviate_client:
+        await collect_tweets_from_timeline(client, agent_id, agent_name, weaviate_client,
+                                           collector.watermarks, collector.tweets_per_cycle, collector.topic_detector)
 
-async def run(collector, strategy, executor, agent_name, agent_id, test, client=None, weaviate_client=None):
-    print(f"\033[92m\033[1m\n*****Running {agent_name} Engine 🚒 *****\n\033[0m\033[0m")
+    # Pull the best tweets for topics that just started bursting into the store before reading it
+    if trending is not None:
+        with stage_timer("trending", agent_id):
+            await trending.collect_emerging(max_emerging)
 
-    while True:
+    # Sync followers and follow back the new ones; a failure here should not cost the cycle
+    if collector.follower_sync is not None and not test:
         try:
-            # Step 0: 先收集最新推文 (新增!)
-            if client and weaviate_client:
-                await collect_tweets_from_timeline(client, agent_id, agent_name, weaviate_client)
-            
-            # Step 1: Run Collector (从数据库读取推文)
-            print(
-                f"\033[92m\033[1m\n*****Running {agent_name} Collector 🔎 *****\n\033[0m\033[0m"
-            )
-            twitterstate = await collector.run()
-
-            # Step 2: Pass timeline tweets to Strategy
-            print(
-                f"\033[92m\033[1m\n*****Running {agent_name} Strategy 🐲*****\n\033[0m\033[0m"
-            )
-            actions = strategy.run(twitterstate)
-
-            # Step 4: Pass actions to Executor
-            print(
-                f"\033[92m\033[1m\n*****Running {agent_name} Executor🌠 *****\n\033[0m\033[0m"
-            )
-            if test:
-                pass
-            else:
+            with stage_timer("followers", agent_id):
+                collector.retrieve_followers()
+        except Exception as e:
+            logger.warning("Follower sync failed: %s", e, extra=log)
+
+    # Step 1: Run Collector (从数据库读取推文)
+    logger.info("Running collector 🔎", extra=log)
+    with stage_timer("collector", agent_id):
+        twitterstate = await collector.run()
+        mentions = collector.retrieve_mentions()
+
+    # Step 2: Pass timeline tweets and mentions to Strategy
+    logger.info("Running strategy 🐲", extra=log)
+    with stage_timer("strategy", agent_id):
+        actions = strategy.run(twitterstate, mentions)
+
+    # Step 4: Pass actions to Executor
+    logger.info("Running executor 🌠", extra=log)
+    if test:
+        pass
+    else:
+        with stage_timer("executor", agent_id):
+            executor.execute_actions(tweet_actions=actions)
+
+    return actions
+
+
+async def react(collector, strategy, executor, agent_name, agent_id, test, inbox):
+    """Act on webhook work as soon as it arrives: follow back pushed followers, answer pushed mentions."""
+    log = {"agent": agent_name}
+    received = inbox.oldest()
+    follows = inbox.follows()
+    if follows and collector.follower_sync is not None and not test:
+        try:
+            with stage_timer("followers", agent_id):
+                collector.follower_sync.add_followers(follows)
+        except Exception as e:
+            logger.warning("Follow-back of pushed followers failed: %s", e, extra=log)
+
+    mentions = collector.retrieve_mentions()
+    if mentions:
+        logger.info("Reacting to %d pushed mentions ⚡", len(mentions), extra=log)
+        with stage_timer("strategy", agent_id):
+            actions = strategy.run(TweetBatch.empty(), mentions)
+        if not test:
+            with stage_timer("executor", agent_id):
                 executor.execute_actions(tweet_actions=actions)
+    if received is not None:
+        REACTION_SECONDS.labels(str(agent_id)).observe(time.time() - received)
 
-            # Sleep for an hour (3600 seconds) before the next iteration
-            print("Sleeping for an hour💤 💤💤")
-            await asyncio.sleep(3600)
+
+async def _sleep_until_stopped(sleep, seconds: float, stop: asyncio.Event = None,
+                               wake: asyncio.Event = None) -> bool:
+    """Sleep `seconds`, or less if `stop` or `wake` is set; True if `wake` cut it short."""
+    if stop is None and wake is None:
+        await sleep(seconds)
+        return False
+    waits = [asyncio.ensure_future(sleep(seconds))]
+    waits += [asyncio.ensure_future(event.wait()) for event in (stop, wake) if event is not None]
+    _, pending = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    return wake is not None and wake.is_set()
+
+
+async def run(collector, strategy, executor, agent_name, agent_id, test, client=None, weaviate_client=None,
+              sleep=asyncio.sleep, on_cycle=None, trending=None, max_emerging=3, stop: asyncio.Event = None,
+              before_cycle=None, inbox=None):
+    """
+    Cycle forever, or until `stop` is set; a stopped agent finishes its current cycle first.
+    `before_cycle` runs at the top of every cycle (the supervisor applies reloaded params there).
+    With a webhook `inbox`, pushed work wakes the agent between cycles and is handled at once.
+    """
+    log = {"agent": agent_name}
+    logger.info("Running engine 🚒", extra=log)
+
+    while stop is None or not stop.is_set():
+        if before_cycle:
+            before_cycle()
+        try:
+            actions = await run_cycle(collector, strategy, executor, agent_name, agent_id, test, client, weaviate_client,
+                                      trending, max_emerging)
+            if on_cycle:
+                on_cycle(agent_name, actions)
         except Exception as e:
-            print(f"Error in run: {e}")
+            logger.exception("Error in run: %s", e, extra=log)
+
+        # Sleep for an hour (3600 seconds) before the next iteration
+        logger.info("Sleeping for an hour💤", extra=log)
+        if inbox is None:
+            await _sleep_until_stopped(sleep, 3600, stop)
+            continue
+        wake = inbox.bind()
+        deadline = time.monotonic() + 3600
+        while (await _sleep_until_stopped(sleep, max(deadline - time.monotonic(), 0), stop, wake)
+               and (stop is None or not stop.is_set())):
+            # Cleared before draining, so work arriving mid-reaction wakes the agent again
+            wake.clear()
+            try:
+                await react(collector, strategy, executor, agent_name, agent_id, test, inbox)
+            except Exception as e:
+                logger.exception("Error reacting to webhook events: %s", e, extra=log)
+
+    logger.info("Engine stopped 🛑", extra=log)
 
 
 if __name__ == "__main__":
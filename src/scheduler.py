@@ -0,0 +1,275 @@
+"""Distributed agent scheduling over Redis.
+
+Every agent is a member of one sorted set, scored by the time its next cycle
+is due. A worker claims a due agent by creating its lease key with
+`SET NX PX`; the lease holds the worker's id and expires on its own unless a
+heartbeat extends it; while leased, the agent's score follows the lease's
+expiry, so agents in flight stay out of the due range other workers read.
+When the cycle ends the worker reschedules the agent and drops the lease in
+one script, and only if the lease is still its own. A worker that dies
+mid-cycle leaves a lease that simply runs out, and the agent comes due again
+at that moment, so any other worker picks it up within `lease` seconds.
+
+Rate-limit quotas seen by each worker's credential router are shared through
+one Redis hash per credential (`RedisQuota`), so a 429 on one node steers
+every node away from that credential until its window resets.
+
+Works with `redis.Redis(decode_responses=True)` or `sim.fake_redis.FakeRedis`.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+PREFIX = "twitter-agent"
+
+# KEYS[1] lease, KEYS[2] schedule; ARGV[1] owner, ARGV[2] lease ms, ARGV[3] lease expiry, ARGV[4] agent id
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  redis.call('zadd', KEYS[2], 'XX', ARGV[3], ARGV[4])
+  return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS[1] lease, KEYS[2] schedule; ARGV[1] owner, ARGV[2] due, ARGV[3] agent id
+RESCHEDULE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  redis.call('zadd', KEYS[2], 'XX', ARGV[2], ARGV[3])
+  return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def connect(url: str = REDIS_URL):
+    import redis
+
+    return redis.Redis.from_url(url, decode_responses=True)
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class RedisScheduler:
+    """
+    Args:
+        redis: client with decoded responses
+        worker_id: this process's lease owner id; must be unique across workers
+        lease: seconds a claim survives without a heartbeat
+        interval: seconds from the end of one cycle to the next
+    """
+
+    def __init__(self, redis, worker_id: str = None, lease: float = 120, interval: float = 3600,
+                 prefix: str = PREFIX, clock: Callable[[], float] = time.time):
+        self.redis = redis
+        self.worker_id = worker_id or worker_name()
+        self.lease = lease
+        self.interval = interval
+        self.prefix = prefix
+        self.clock = clock
+        self.schedule_key = f"{prefix}:schedule"
+        self._renew = redis.register_script(RENEW_SCRIPT)
+        self._reschedule = redis.register_script(RESCHEDULE_SCRIPT)
+
+    @classmethod
+    def from_params(cls, redis, params: dict, **kwargs):
+        config = params.get("scheduler") or {}
+        return cls(redis, lease=config.get("lease_seconds", 120), interval=config.get("interval_seconds", 3600),
+                   prefix=config.get("prefix", PREFIX), **kwargs)
+
+    def lease_key(self, agent_id) -> str:
+        return f"{self.prefix}:lease:{agent_id}"
+
+    def register(self, agent_ids: Iterable, due: float = None):
+        """Schedule agents not yet known (due now by default); agents already scheduled keep their due time."""
+        due = self.clock() if due is None else due
+        mapping = {str(agent_id): due for agent_id in agent_ids}
+        if mapping:
+            self.redis.zadd(self.schedule_key, mapping, nx=True)
+
+    def unregister(self, agent_id):
+        self.redis.zrem(self.schedule_key, str(agent_id))
+
+    def claim(self, limit: int, known: Set[str] = None) -> List[str]:
+        """Lease up to `limit` due agents, earliest first; with `known`, only those agents."""
+        if limit <= 0:
+            return []
+        now = self.clock()
+        due = self.redis.zrangebyscore(self.schedule_key, "-inf", now, start=0, num=limit * 4)
+        claimed = []
+        for agent_id in due:
+            if known is not None and agent_id not in known:
+                # Registered by a worker with a newer tokens.yml; leave it to a worker that has its credentials
+                continue
+            if self.redis.set(self.lease_key(agent_id), self.worker_id, nx=True, px=int(self.lease * 1000)):
+                # Out of the due range while leased; if this worker dies the score comes due with the lease
+                self.redis.zadd(self.schedule_key, {agent_id: now + self.lease}, xx=True)
+                claimed.append(agent_id)
+                if len(claimed) == limit:
+                    break
+        return claimed
+
+    def renew(self, agent_id) -> bool:
+        return bool(self._renew(keys=[self.lease_key(agent_id), self.schedule_key],
+                                args=[self.worker_id, int(self.lease * 1000), self.clock() + self.lease,
+                                      str(agent_id)]))
+
+    def complete(self, agent_id, next_due: float = None) -> bool:
+        """Reschedule the agent and drop the lease; False if the lease had already passed to another worker."""
+        next_due = self.clock() + self.interval if next_due is None else next_due
+        return self._reschedule_and_drop(agent_id, next_due)
+
+    def release(self, agent_id) -> bool:
+        """Give the lease up and make the agent due now, so another worker can run the cycle."""
+        return self._reschedule_and_drop(agent_id, self.clock())
+
+    def _reschedule_and_drop(self, agent_id, due: float) -> bool:
+        return bool(self._reschedule(keys=[self.lease_key(agent_id), self.schedule_key],
+                                     args=[self.worker_id, due, str(agent_id)]))
+
+    def owner(self, agent_id) -> Optional[str]:
+        return self.redis.get(self.lease_key(agent_id))
+
+    def next_due(self) -> Optional[float]:
+        first = self.redis.zrange(self.schedule_key, 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+
+class Worker:
+    """
+    Claims due agents and runs their cycles, at most `concurrency` at a time.
+
+    Cycles block the event loop in places (the Twitter and Weaviate clients
+    are synchronous), so leases are renewed from a thread rather than a task.
+
+    Args:
+        run_cycle: coroutine function (agent id) -> runs one cycle of that agent
+        agents: ids this worker can run (it holds their credentials); None for any
+        poll: seconds between claim attempts while idle
+    """
+
+    def __init__(self, scheduler: RedisScheduler, run_cycle: Callable[[str], Awaitable], agents: Iterable = None,
+                 concurrency: int = 4, poll: float = 1.0):
+        self.scheduler = scheduler
+        self.run_cycle = run_cycle
+        self.agents = None if agents is None else {str(agent_id) for agent_id in agents}
+        self.concurrency = concurrency
+        self.poll = poll
+        self.completed = 0
+        self.lost = 0
+        self._held: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_params(cls, scheduler: RedisScheduler, run_cycle, params: dict, agents: Iterable = None):
+        config = params.get("scheduler") or {}
+        return cls(scheduler, run_cycle, agents, concurrency=config.get("concurrency", 4),
+                   poll=config.get("poll_seconds", 1.0))
+
+    def _beat(self):
+        while not self._stop.wait(self.scheduler.lease / 3):
+            with self._lock:
+                held = list(self._held)
+            for agent_id in held:
+                try:
+                    if not self.scheduler.renew(agent_id):
+                        logger.warning("Lease on agent %s lost mid-cycle", agent_id, extra={"agent": agent_id})
+                except Exception as e:
+                    logger.warning("Lease renewal failed: %s", e, extra={"agent": agent_id})
+
+    async def _execute(self, agent_id: str):
+        log = {"agent": agent_id}
+        with self._lock:
+            self._held.add(agent_id)
+        try:
+            await self.run_cycle(agent_id)
+        except asyncio.CancelledError:
+            self.scheduler.release(agent_id)
+            raise
+        except Exception as e:
+            logger.exception("Error in cycle: %s", e, extra=log)
+        finally:
+            with self._lock:
+                self._held.discard(agent_id)
+
+        if self.scheduler.complete(agent_id):
+            self.completed += 1
+        else:
+            # Another worker took over after the lease ran out; it owns the schedule entry now
+            self.lost += 1
+            logger.warning("Lease expired before the cycle finished; not rescheduling", extra=log)
+
+    async def run(self, stop: asyncio.Event = None):
+        """Claim and run cycles until `stop` is set; running cycles are cancelled and their leases released."""
+        stop = stop or asyncio.Event()
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+        running: Dict[str, asyncio.Task] = {}
+        try:
+            while not stop.is_set():
+                for agent_id in [a for a, task in running.items() if task.done()]:
+                    running.pop(agent_id)
+                for agent_id in self.scheduler.claim(self.concurrency - len(running), self.agents):
+                    running[agent_id] = asyncio.create_task(self._execute(agent_id), name=f"cycle-{agent_id}")
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in running.values():
+                task.cancel()
+            await asyncio.gather(*running.values(), return_exceptions=True)
+            self._stop.set()
+            self._heartbeat.join()
+
+
+class RedisQuota:
+    """
+    One credential's per-endpoint (remaining, reset) quota in a Redis hash, shared by every worker.
+
+    Reads come from a local copy refreshed at most every `refresh` seconds, so
+    routing a call does not cost a round trip per credential; writes go
+    straight to Redis.
+    """
+
+    def __init__(self, redis, name: str, prefix: str = PREFIX, refresh: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.redis = redis
+        self.key = f"{prefix}:quota:{name}"
+        self.refresh = refresh
+        self.clock = clock
+        self._local: Dict[str, tuple] = {}
+        self._loaded = float("-inf")
+
+    def _load(self):
+        if self.clock() - self._loaded < self.refresh:
+            return
+        self._local = {}
+        for endpoint, value in (self.redis.hgetall(self.key) or {}).items():
+            remaining, reset = value.split(":")
+            self._local[endpoint] = (int(remaining), int(reset))
+        self._loaded = self.clock()
+
+    def get(self, endpoint: str, default=None):
+        self._load()
+        return self._local.get(endpoint, default)
+
+    def __setitem__(self, endpoint: str, value: tuple):
+        remaining, reset = value
+        self._local[endpoint] = (int(remaining), int(reset))
+        self.redis.hset(self.key, endpoint, f"{int(remaining)}:{int(reset)}")
+        # Twitter windows are at most 24 hours; stale credentials age out of Redis
+        self.redis.expire(self.key, 86400)
@@ -0,0 +1,666 @@
+"""In-process stand-ins for the Twitter, Weaviate, Giphy and OpenAI backends.
+
+The stand-ins speak the same method signatures and return the same types as
+tweepy, weaviate-client and langchain, so collectors, strategies and executors
+run unmodified against them. Every backend counts its calls per endpoint and
+draws latency and errors from a configurable `LatencyModel`.
+"""
+
+import bisect
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import tweepy
+from langchain.llms.base import LLM
+
+
+class LatencyModel:
+    """Log-normal latency around `median_ms`, with an independent error rate."""
+
+    def __init__(self, median_ms: float = 0.0, sigma: float = 0.5, error_rate: float = 0.0,
+                 error_status: int = 503, seed: Optional[int] = None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+
+    def delay(self) -> float:
+        """Return a latency draw in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(self.median_ms / 1000), self.sigma)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+
+LatencyConfig = Union[LatencyModel, Dict[str, LatencyModel], None]
+
+
+class ApiStats:
+    """Thread-safe per-endpoint call, error and latency counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.errors = Counter()
+        self.rate_limited = Counter()
+        self.latency_seconds = 0.0
+
+    def record(self, endpoint: str, latency: float = 0.0):
+        with self._lock:
+            self.calls[endpoint] += 1
+            self.latency_seconds += latency
+
+    def record_error(self, endpoint: str, status: int):
+        with self._lock:
+            self.errors[endpoint] += 1
+            if status == 429:
+                self.rate_limited[endpoint] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "errors": dict(self.errors),
+                "rate_limited": dict(self.rate_limited),
+                "latency_seconds": self.latency_seconds,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.errors.clear()
+            self.rate_limited.clear()
+            self.latency_seconds = 0.0
+
+
+class _FakeBackend:
+    def __init__(self, latency: LatencyConfig = None, sleep: Callable[[float], None] = time.sleep,
+                 stats: ApiStats = None):
+        if isinstance(latency, LatencyModel) or latency is None:
+            latency = {"default": latency or LatencyModel()}
+        self.latency = latency
+        self.sleep = sleep
+        self.stats = stats or ApiStats()
+
+    def _model(self, endpoint: str) -> LatencyModel:
+        return self.latency.get(endpoint) or self.latency["default"]
+
+    def _call(self, endpoint: str):
+        model = self._model(endpoint)
+        delay = model.delay()
+        if delay:
+            self.sleep(delay)
+        self.stats.record(endpoint, delay)
+        if model.should_fail():
+            self.stats.record_error(endpoint, model.error_status)
+            raise self._error(endpoint, model.error_status)
+
+    def _error(self, endpoint: str, status: int) -> Exception:
+        return RuntimeError(f"{endpoint}: HTTP {status}")
+
+
+# ---------------------------------------------------------------------------
+# Twitter
+# ---------------------------------------------------------------------------
+
+_WORDS = (
+    "moon", "rocket", "vibes", "alpha", "gm", "bullish", "degen", "chain", "model",
+    "agent", "data", "launch", "art", "stack", "meme", "signal", "crypto", "AI",
+)
+_HANZI = ("月亮", "火箭", "朋友", "未来", "梦想", "数据")
+# The line count asked for by strategy.prompt.packed_reply_prompt
+_PACKED_COUNT = re.compile(r"Answer with exactly (\d+) lines")
+
+
+class _FakeHTTPResponse:
+    """Just enough of requests.Response for tweepy's HTTPException."""
+
+    reasons = {429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+    def __init__(self, status_code: int, headers: dict = None):
+        self.status_code = status_code
+        self.reason = self.reasons.get(status_code, "Error")
+        self.headers = headers or {}
+
+    def json(self):
+        return {"detail": self.reason}
+
+
+class TweetFactory:
+    """Generates synthetic tweet payloads with increasing snowflake-like ids."""
+
+    def __init__(self, seed: Optional[int] = None, clock: Callable[[], float] = time.time,
+                 n_authors: int = 5000, start_id: int = 1_700_000_000_000_000_000):
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.n_authors = n_authors
+        self._next_id = start_id
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            self._next_id += self.rng.randint(1, 4096)
+            return self._next_id
+
+    def author_id(self) -> int:
+        return 10_000 + self.rng.randrange(self.n_authors)
+
+    def text(self) -> str:
+        words = self.rng.choices(_WORDS, k=self.rng.randint(4, 14))
+        if self.rng.random() < 0.3:
+            words.append(self.rng.choice(_HANZI))
+        if self.rng.random() < 0.2:
+            words.append(f"https://t.co/{self.rng.getrandbits(40):x}")
+        return " ".join(words)
+
+    def make(self, author_id: Optional[int] = None, conversation_id: Optional[int] = None,
+             in_reply_to: Optional[int] = None, text: Optional[str] = None) -> dict:
+        tweet_id = self.next_id()
+        created_at = datetime.fromtimestamp(self.clock(), timezone.utc)
+        data = {
+            "id": str(tweet_id),
+            "text": text if text is not None else self.text(),
+            "author_id": str(author_id if author_id is not None else self.author_id()),
+            "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "conversation_id": str(conversation_id or tweet_id),
+            "public_metrics": {
+                "like_count": int(self.rng.paretovariate(1.2)) - 1,
+                "retweet_count": int(self.rng.paretovariate(1.6)) - 1,
+                "reply_count": int(self.rng.paretovariate(2.0)) - 1,
+                "quote_count": 0,
+            },
+        }
+        if in_reply_to is not None:
+            data["referenced_tweets"] = [{"type": "replied_to", "id": str(in_reply_to)}]
+        return data
+
+    def user(self, user_id: int) -> dict:
+        rng = random.Random(user_id)
+        return {
+            "id": str(user_id),
+            "name": f"user {user_id}",
+            "username": f"user{user_id}",
+            "public_metrics": {
+                "followers_count": int(rng.paretovariate(0.9) * 20),
+                "following_count": rng.randint(0, 2000),
+                "tweet_count": rng.randint(0, 50_000),
+            },
+        }
+
+
+class FakeFeed:
+    """A reverse-chronological stream of tweets that grows each time it is polled."""
+
+    def __init__(self, factory: TweetFactory, per_poll: int = 10, max_size: int = 5000):
+        self.factory = factory
+        self.per_poll = per_poll
+        self.max_size = max_size
+        self.tweets: List[dict] = []  # oldest first
+
+    def arrivals(self) -> int:
+        """Number of new tweets that appeared since the last poll."""
+        return self.per_poll
+
+    def poll(self):
+        for _ in range(self.arrivals()):
+            self.tweets.append(self.factory.make())
+        if len(self.tweets) > self.max_size:
+            del self.tweets[: len(self.tweets) - self.max_size]
+
+    def page(self, max_results: int = 10, since_id=None, pagination_token=None):
+        """Return (tweets newest first, next_token) like the v2 timeline endpoints."""
+        end = int(pagination_token) if pagination_token else len(self.tweets)
+        floor = 0
+        if since_id is not None:
+            floor = bisect.bisect_right(self.tweets, int(since_id), key=lambda t: int(t["id"]))
+        start = max(floor, end - max_results)
+        next_token = str(start) if start > floor else None
+        return self.tweets[start:end][::-1], next_token
+
+
+class FakeTwitterClient(_FakeBackend):
+    """Stand-in for `tweepy.Client` (API v2)."""
+
+    def __init__(self, factory: TweetFactory = None, latency: LatencyConfig = None,
+                 sleep: Callable[[float], None] = time.sleep, stats: ApiStats = None,
+                 rate_limits: Dict[str, tuple] = None, clock: Callable[[], float] = time.monotonic,
+                 n_lists: int = 3, followers_per_user: int = 150, feed_per_poll: int = 10,
+                 feed: Callable[[TweetFactory], "FakeFeed"] = None):
+        super().__init__(latency, sleep, stats)
+        self.factory = factory or TweetFactory()
+        self.clock = clock
+        # endpoint -> (requests, window seconds); defaults to unlimited
+        self.rate_limits = rate_limits or {}
+        self._windows: Dict[str, list] = {}
+        self.n_lists = n_lists
+        self.followers_per_user = followers_per_user
+        feed = feed or (lambda factory: FakeFeed(factory, per_poll=feed_per_poll))
+        self.home = feed(self.factory)
+        self.mentions = FakeFeed(self.factory, per_poll=0)
+        self.lists: Dict[str, FakeFeed] = defaultdict(lambda: feed(self.factory))
+        self.posted: List[dict] = []
+
+    def _error(self, endpoint: str, status: int) -> Exception:
+        response = _FakeHTTPResponse(status)
+        if status == 429:
+            return tweepy.TooManyRequests(response, response_json=response.json())
+        return tweepy.TwitterServerError(response, response_json=response.json())
+
+    def _call(self, endpoint: str):
+        limit = self.rate_limits.get(endpoint)
+        if limit is not None:
+            requests, window = limit
+            now = self.clock()
+            start, used = self._windows.get(endpoint, (now, 0))
+            if now - start >= window:
+                start, used = now, 0
+            if used >= requests:
+                self.stats.record(endpoint)
+                self.stats.record_error(endpoint, 429)
+                raise self._error(endpoint, 429)
+            self._windows[endpoint] = (start, used + 1)
+        super()._call(endpoint)
+
+    def rate_limit_remaining(self) -> Dict[str, int]:
+        now = self.clock()
+        remaining = {}
+        for endpoint, (requests, window) in self.rate_limits.items():
+            start, used = self._windows.get(endpoint, (now, 0))
+            remaining[endpoint] = requests if now - start >= window else requests - used
+        return remaining
+
+    def _tweets_response(self, tweets: List[dict], next_token=None, expansions=None) -> tweepy.Response:
+        includes = {}
+        if expansions and "author_id" in expansions:
+            authors = {int(t["author_id"]) for t in tweets}
+            includes["users"] = [tweepy.User(self.factory.user(a)) for a in authors]
+        meta = {"result_count": len(tweets)}
+        if tweets:
+            meta["newest_id"] = tweets[0]["id"]
+            meta["oldest_id"] = tweets[-1]["id"]
+        if next_token:
+            meta["next_token"] = next_token
+        data = [tweepy.Tweet(t) for t in tweets] or None
+        return tweepy.Response(data, includes, [], meta)
+
+    # Reads -----------------------------------------------------------------
+
+    def get_home_timeline(self, max_results=None, since_id=None, pagination_token=None,
+                          expansions=None, **kwargs):
+        self._call("get_home_timeline")
+        if pagination_token is None:
+            self.home.poll()
+        page, next_token = self.home.page(max_results or 100, since_id, pagination_token)
+        return self._tweets_response(page, next_token, expansions)
+
+    def get_list_tweets(self, id, max_results=None, pagination_token=None, expansions=None, **kwargs):
+        self._call("get_list_tweets")
+        feed = self.lists[str(id)]
+        if pagination_token is None:
+            feed.poll()
+        page, next_token = feed.page(max_results or 100, None, pagination_token)
+        return self._tweets_response(page, next_token, expansions)
+
+    def get_users_mentions(self, id, max_results=None, since_id=None, pagination_token=None,
+                           expansions=None, **kwargs):
+        self._call("get_users_mentions")
+        if pagination_token is None:
+            self.mentions.poll()
+        page, next_token = self.mentions.page(max_results or 100, since_id, pagination_token)
+        return self._tweets_response(page, next_token, expansions)
+
+    def get_users_tweets(self, id, max_results=None, pagination_token=None, expansions=None, **kwargs):
+        self._call("get_users_tweets")
+        page = [t for t in self.posted[::-1]][: max_results or 10]
+        return self._tweets_response(page, None, expansions)
+
+    def search_recent_tweets(self, query, max_results=None, next_token=None, expansions=None, **kwargs):
+        self._call("search_recent_tweets")
+        tweets = [self.factory.make() for _ in range(max_results or 10)]
+        token = str(self.factory.rng.getrandbits(32)) if self.factory.rng.random() < 0.5 else None
+        return self._tweets_response(tweets, token, expansions)
+
+    def get_owned_lists(self, id, **kwargs):
+        self._call("get_owned_lists")
+        lists = [tweepy.List({"id": str(1_655_930_000_000_000_000 + i), "name": f"list {i}"})
+                 for i in range(self.n_lists)]
+        return tweepy.Response(lists, {}, [], {"result_count": len(lists)})
+
+    def get_liking_users(self, id, **kwargs):
+        self._call("get_liking_users")
+        count = random.Random(int(id)).randint(0, 100)
+        return tweepy.Response(None, {}, [], {"result_count": count})
+
+    def get_users_followers(self, id, max_results=None, pagination_token=None, **kwargs):
+        self._call("get_users_followers")
+        max_results = max_results or 100
+        start = int(pagination_token) if pagination_token else 0
+        end = min(self.followers_per_user, start + max_results)
+        base = int(id) * 7919 % 1_000_000_007
+        users = [tweepy.User(self.factory.user(base + i)) for i in range(start, end)]
+        meta = {"result_count": len(users)}
+        if end < self.followers_per_user:
+            meta["next_token"] = str(end)
+        return tweepy.Response(users or None, {}, [], meta)
+
+    def get_user(self, id=None, username=None, **kwargs):
+        self._call("get_user")
+        return tweepy.Response(tweepy.User(self.factory.user(int(id or 1))), {}, [], {})
+
+    def get_users(self, ids=None, usernames=None, **kwargs):
+        self._call("get_users")
+        users = [tweepy.User(self.factory.user(int(i))) for i in (ids or [])]
+        return tweepy.Response(users or None, {}, [], {"result_count": len(users)})
+
+    # Writes ----------------------------------------------------------------
+
+    def like(self, tweet_id, **kwargs):
+        self._call("like")
+        return tweepy.Response({"liked": True}, {}, [], {})
+
+    def retweet(self, tweet_id, **kwargs):
+        self._call("retweet")
+        return tweepy.Response({"retweeted": True}, {}, [], {})
+
+    def follow_user(self, target_user_id, **kwargs):
+        self._call("follow_user")
+        return tweepy.Response({"following": True, "pending_follow": False}, {}, [], {})
+
+    def create_tweet(self, text=None, in_reply_to_tweet_id=None, quote_tweet_id=None,
+                     media_ids=None, **kwargs):
+        self._call("create_tweet")
+        tweet = self.factory.make(text=text or "", in_reply_to=in_reply_to_tweet_id)
+        self.posted.append(tweet)
+        return tweepy.Response({"id": tweet["id"], "text": tweet["text"]}, {}, [], {})
+
+
+class FakeV1API(_FakeBackend):
+    """Stand-in for `tweepy.API` (v1.1), which the engine only uses to upload media."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._next_media_id = 1_600_000_000_000_000_000
+
+    def _error(self, endpoint: str, status: int) -> Exception:
+        response = _FakeHTTPResponse(status)
+        return tweepy.TwitterServerError(response, response_json=response.json())
+
+    def media_upload(self, filename, **kwargs):
+        self._call("media_upload")
+        self._next_media_id += 1
+        return SimpleNamespace(media_id=self._next_media_id, media_id_string=str(self._next_media_id))
+
+
+# ---------------------------------------------------------------------------
+# Giphy
+# ---------------------------------------------------------------------------
+
+_GIF_BYTES = b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+
+
+class FakeGiphy(_FakeBackend):
+    """Stand-in for the Giphy search endpoint and GIF downloads."""
+
+    def search(self, url: str) -> dict:
+        self._call("search")
+        return {
+            "data": [
+                {
+                    "slug": f"fake-gif-{i}-{uuid.uuid4().hex[:8]}",
+                    "images": {"downsized": {"url": f"https://media.giphy.test/{i}.gif"}},
+                }
+                for i in range(20)
+            ]
+        }
+
+    def download(self, url: str) -> bytes:
+        self._call("download")
+        return _GIF_BYTES
+
+    def get(self, url, **kwargs):
+        """`requests.Session.get`: the search endpoint returns JSON, anything else GIF bytes."""
+        if "/gifs/search" in url:
+            results = self.search(url)
+            return SimpleNamespace(json=lambda: results, status_code=200, raise_for_status=lambda: None)
+        return SimpleNamespace(content=self.download(url), status_code=200, raise_for_status=lambda: None)
+
+    def install(self, module):
+        """Point a module's pooled HTTP session (`gif_reply._http`) at this fake."""
+        module._http = lambda: self
+
+
+# ---------------------------------------------------------------------------
+# Weaviate
+# ---------------------------------------------------------------------------
+
+class _ClassStore:
+    """Columnar storage for one Weaviate class."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.columns: Dict[str, list] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def insert(self, properties: dict, object_id: Optional[str] = None) -> str:
+        object_id = object_id or str(uuid.uuid4())
+        n = len(self.ids)
+        for name in properties:
+            if name not in self.columns:
+                self.columns[name] = [None] * n
+        for name, column in self.columns.items():
+            column.append(properties.get(name))
+        self.ids.append(object_id)
+        return object_id
+
+    def rows(self, properties: List[str], limit: Optional[int], offset: int = 0,
+             additional: List[str] = ()) -> List[dict]:
+        end = len(self.ids) if limit is None else min(len(self.ids), offset + limit)
+        rows = []
+        for i in range(offset, end):
+            row = {p: self.columns[p][i] if p in self.columns else None for p in properties}
+            if additional:
+                row["_additional"] = {"id": self.ids[i]} if "id" in additional else {}
+            rows.append(row)
+        return rows
+
+
+class _FakeGetBuilder:
+    def __init__(self, client, class_name, properties):
+        self.client = client
+        self.class_name = class_name
+        self.properties = list(properties)
+        self.limit = None
+        self.offset = 0
+        self.additional = []
+
+    def with_limit(self, limit):
+        self.limit = limit
+        return self
+
+    def with_offset(self, offset):
+        self.offset = offset
+        return self
+
+    def with_additional(self, properties):
+        self.additional = [properties] if isinstance(properties, str) else list(properties)
+        return self
+
+    def do(self):
+        self.client._call("query.get")
+        store = self.client.classes[self.class_name]
+        rows = store.rows(self.properties, self.limit, self.offset, self.additional)
+        return {"data": {"Get": {self.class_name: rows}}}
+
+
+class _FakeAggregateBuilder:
+    def __init__(self, client, class_name):
+        self.client = client
+        self.class_name = class_name
+
+    def with_meta_count(self):
+        return self
+
+    def do(self):
+        self.client._call("query.aggregate")
+        count = len(self.client.classes[self.class_name])
+        return {"data": {"Aggregate": {self.class_name: [{"meta": {"count": count}}]}}}
+
+
+class _FakeQuery:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, class_name, properties=None):
+        return _FakeGetBuilder(self.client, class_name, properties or [])
+
+    def aggregate(self, class_name):
+        return _FakeAggregateBuilder(self.client, class_name)
+
+
+class _FakeDataObject:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, data_object, class_name, uuid=None, vector=None, **kwargs):
+        self.client._call("data_object.create")
+        return self.client.classes[class_name].insert(data_object, uuid)
+
+
+class _FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.batch_size = 100
+        self._pending = []
+
+    def __call__(self, batch_size=None, **kwargs):
+        if batch_size:
+            self.batch_size = batch_size
+        return self
+
+    def configure(self, batch_size=None, **kwargs):
+        return self(batch_size, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def add_data_object(self, data_object, class_name, uuid=None, vector=None, **kwargs):
+        self._pending.append((class_name, data_object, uuid))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return uuid
+
+    def flush(self):
+        if not self._pending:
+            return
+        self.client._call("batch.create_objects")
+        for class_name, data_object, object_id in self._pending:
+            self.client.classes[class_name].insert(data_object, object_id)
+        self._pending = []
+
+
+class FakeWeaviateClient(_FakeBackend):
+    """Stand-in for `weaviate.Client`, backed by columnar in-memory storage."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.classes: Dict[str, _ClassStore] = defaultdict(_ClassStore)
+        self.query = _FakeQuery(self)
+        self.data_object = _FakeDataObject(self)
+        self.batch = _FakeBatch(self)
+
+    def seed_tweets(self, n: int, factory: TweetFactory, agent_ids: List[Any]):
+        """Preload `n` rows into the Tweets class without counting them as API calls."""
+        store = self.classes["Tweets"]
+        now = datetime.fromtimestamp(factory.clock(), timezone.utc).isoformat(timespec="seconds")
+        for i in range(n):
+            tweet = factory.make()
+            store.insert({
+                "tweet": tweet["text"],
+                "tweet_id": tweet["id"],
+                "agent_id": str(agent_ids[i % len(agent_ids)]),
+                "author_id": tweet["author_id"],
+                "like_count": tweet["public_metrics"]["like_count"],
+                "follower_count": 0,
+                "date": now,
+            })
+
+
+# ---------------------------------------------------------------------------
+# LLM
+# ---------------------------------------------------------------------------
+
+class FakeLLM(LLM):
+    """
+    Stand-in for langchain's `OpenAI` LLM that returns short canned completions.
+
+    Packed prompts (`Answer with exactly N lines`) get one numbered line per
+    item, except that each line is left out with probability `pack_miss_rate`,
+    so the per-tweet fallback for unparsed items runs too.
+    """
+
+    model_name: str = "text-davinci-003"
+    pack_miss_rate: float = 0.1
+    latency: Any = None
+    stats: Any = None
+    sleep: Any = None
+    seed: Optional[int] = None
+    rng: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.latency is None:
+            self.latency = LatencyModel()
+        if self.stats is None:
+            self.stats = ApiStats()
+        if self.sleep is None:
+            self.sleep = time.sleep
+        self.rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        delay = self.latency.delay()
+        if delay:
+            self.sleep(delay)
+        self.stats.record("completions", delay)
+        if self.latency.should_fail():
+            self.stats.record_error("completions", self.latency.error_status)
+            raise RuntimeError(f"completions: HTTP {self.latency.error_status}")
+
+        packed = _PACKED_COUNT.search(prompt)
+        if packed:
+            return "\n".join(f"{i}. {self._text(prompt)}" for i in range(1, int(packed.group(1)) + 1)
+                             if self.rng.random() >= self.pack_miss_rate)
+        return self._text(prompt)
+
+    def _text(self, prompt: str) -> str:
+        words = self.rng.choices(_WORDS, k=self.rng.randint(3, 12))
+        if "three words" in prompt:
+            words = words[:3]
+        else:
+            words.append(self.rng.choice(_HANZI) + " ✨")
+        return " ".join(words)
+
+    def stream(self, prompt: str, stop: Optional[List[str]] = None):
+        """Yield the completion a few characters at a time in OpenAI's streaming chunk format."""
+        text = self._call(prompt, stop)
+        for start in range(0, len(text), 4):
+            yield {"choices": [{"text": text[start:start + 4], "index": 0}]}
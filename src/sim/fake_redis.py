@@ -0,0 +1,181 @@
+"""In-process stand-in for the subset of Redis the distributed scheduler uses.
+
+Strings with millisecond TTLs, sorted sets and hashes, with the same
+redis-py method signatures (decoded responses). The scheduler's Lua scripts
+run as Python equivalents, so `scheduler.RedisScheduler`, `Worker` and
+`RedisQuota` can be exercised by several workers in one process, on a
+virtual clock if need be.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from scheduler import RENEW_SCRIPT, RESCHEDULE_SCRIPT
+
+
+class _Script:
+    def __init__(self, redis: "FakeRedis", fn: Callable):
+        self.redis = redis
+        self.fn = fn
+
+    def __call__(self, keys: List[str] = (), args: list = ()):
+        with self.redis._lock:
+            return self.fn(list(keys), [str(a) for a in args])
+
+
+class FakeRedis:
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._data: Dict[str, object] = {}
+        self._expires: Dict[str, float] = {}
+        self.calls = 0
+        self._scripts = {
+            RENEW_SCRIPT: self._renew_script,
+            RESCHEDULE_SCRIPT: self._reschedule_script,
+        }
+
+    # Keys ------------------------------------------------------------------
+
+    def _live(self, name: str):
+        expires = self._expires.get(name)
+        if expires is not None and expires <= self.clock():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return self._data.get(name)
+
+    def get(self, name: str) -> Optional[str]:
+        with self._lock:
+            self.calls += 1
+            return self._live(name)
+
+    def set(self, name: str, value, nx: bool = False, xx: bool = False, px: int = None, ex: float = None):
+        with self._lock:
+            self.calls += 1
+            exists = self._live(name) is not None
+            if (nx and exists) or (xx and not exists):
+                return None
+            self._data[name] = str(value)
+            self._expires.pop(name, None)
+            if px is not None:
+                self._expires[name] = self.clock() + px / 1000
+            elif ex is not None:
+                self._expires[name] = self.clock() + ex
+            return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            self.calls += 1
+            removed = 0
+            for name in names:
+                if self._live(name) is not None:
+                    removed += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return removed
+
+    def pexpire(self, name: str, ms: int) -> bool:
+        with self._lock:
+            self.calls += 1
+            if self._live(name) is None:
+                return False
+            self._expires[name] = self.clock() + int(ms) / 1000
+            return True
+
+    def expire(self, name: str, seconds: float) -> bool:
+        return self.pexpire(name, int(seconds * 1000))
+
+    def pttl(self, name: str) -> int:
+        with self._lock:
+            if self._live(name) is None:
+                return -2
+            expires = self._expires.get(name)
+            return -1 if expires is None else int((expires - self.clock()) * 1000)
+
+    # Sorted sets -----------------------------------------------------------
+
+    def _zset(self, name: str) -> Dict[str, float]:
+        return self._data.setdefault(name, {}) if self._live(name) is None else self._data[name]
+
+    def zadd(self, name: str, mapping: Dict[str, float], nx: bool = False, xx: bool = False) -> int:
+        with self._lock:
+            self.calls += 1
+            zset = self._zset(name)
+            added = 0
+            for member, score in mapping.items():
+                if (nx and member in zset) or (xx and member not in zset):
+                    continue
+                added += member not in zset
+                zset[member] = float(score)
+            return added
+
+    def zrem(self, name: str, *members: str) -> int:
+        with self._lock:
+            self.calls += 1
+            zset = self._live(name) or {}
+            return sum(zset.pop(member, None) is not None for member in members)
+
+    def zscore(self, name: str, member: str) -> Optional[float]:
+        with self._lock:
+            self.calls += 1
+            return (self._live(name) or {}).get(member)
+
+    def zrangebyscore(self, name: str, min, max, start: int = None, num: int = None, withscores: bool = False):
+        with self._lock:
+            self.calls += 1
+            lo, hi = float(min), float(max)
+            items = sorted(((s, m) for m, s in (self._live(name) or {}).items() if lo <= s <= hi))
+            if start is not None:
+                items = items[start:start + num if num is not None else None]
+            return [(m, s) for s, m in items] if withscores else [m for _, m in items]
+
+    def zrange(self, name: str, start: int, end: int, withscores: bool = False):
+        with self._lock:
+            self.calls += 1
+            items = sorted((s, m) for m, s in (self._live(name) or {}).items())
+            items = items[start:None if end == -1 else end + 1]
+            return [(m, s) for s, m in items] if withscores else [m for _, m in items]
+
+    # Hashes ----------------------------------------------------------------
+
+    def hset(self, name: str, key: str = None, value=None, mapping: dict = None) -> int:
+        with self._lock:
+            self.calls += 1
+            if self._live(name) is None:
+                self._data[name] = {}
+            fields = dict(mapping or {})
+            if key is not None:
+                fields[key] = value
+            added = sum(k not in self._data[name] for k in fields)
+            self._data[name].update({k: str(v) for k, v in fields.items()})
+            return added
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        with self._lock:
+            self.calls += 1
+            return (self._live(name) or {}).get(key)
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        with self._lock:
+            self.calls += 1
+            return dict(self._live(name) or {})
+
+    # Scripts ---------------------------------------------------------------
+
+    def register_script(self, script: str) -> _Script:
+        if script not in self._scripts:
+            raise NotImplementedError("FakeRedis only runs the scheduler's scripts")
+        return _Script(self, self._scripts[script])
+
+    def _renew_script(self, keys, args):
+        if self._live(keys[0]) == args[0]:
+            self.zadd(keys[1], {args[3]: float(args[2])}, xx=True)
+            return int(self.pexpire(keys[0], int(args[1])))
+        return 0
+
+    def _reschedule_script(self, keys, args):
+        if self._live(keys[0]) == args[0]:
+            self.zadd(keys[1], {args[2]: float(args[1])}, xx=True)
+            return self.delete(keys[0])
+        return 0
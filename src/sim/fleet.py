@@ -0,0 +1,130 @@
+"""Build engine agents wired to the in-process stand-in backends."""
+
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+# gif_reply builds an OpenAI LLM at import time, which needs a key to be set
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+
+from langchain.chains import LLMChain
+
+from collector.collector import TwitterCollector
+from executor.executor import TwitterExecutor
+from strategy.media import gif_reply
+from strategy.budget import HourlyBudget, TokenCounter, TokenGovernor
+from strategy.sampler import ActionSampler
+from strategy.strategy import TwitterStrategy
+
+from .backends import (
+    ApiStats,
+    FakeFeed,
+    FakeGiphy,
+    FakeLLM,
+    FakeTwitterClient,
+    FakeV1API,
+    FakeWeaviateClient,
+    LatencyConfig,
+    LatencyModel,
+    TweetFactory,
+)
+
+
+class FleetAgent:
+    """One agent's collector, strategy and executor plus its fake clients."""
+
+    def __init__(self, agent_id, agent_name, client, v1_api, collector, strategy, executor):
+        self.agent_id = agent_id
+        self.agent_name = agent_name
+        self.client = client
+        self.v1_api = v1_api
+        self.collector = collector
+        self.strategy = strategy
+        self.executor = executor
+
+    def cycle_args(self, weaviate_client, test: bool = False) -> tuple:
+        """Positional arguments for `main.run_cycle` / `main.run`."""
+        return (self.collector, self.strategy, self.executor, self.agent_name,
+                self.agent_id, test, self.client, weaviate_client)
+
+
+class Fleet:
+    """
+    A set of agents sharing one fake Weaviate, LLM and Giphy backend.
+
+    Args:
+        n_agents: number of agents to build
+        stored_tweets: rows preloaded into the Tweets class
+        latency: per-backend latency config, keyed by "twitter", "v1", "weaviate", "giphy" and "llm"
+        sleep: how backends wait out their latency (a virtual clock can swap this)
+        clock: time source for tweet timestamps and rate-limit windows
+        rate_limits: per-endpoint (requests, window seconds) applied to every Twitter client
+        params: params.yaml contents used to build each agent's action sampler
+        feed: builds the home timeline and list feeds for each Twitter client
+    """
+
+    def __init__(self, n_agents: int, stored_tweets: int = 0, seed: Optional[int] = None,
+                 latency: Dict[str, LatencyConfig] = None, sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.time, rate_limits: Dict[str, tuple] = None,
+                 params: dict = None, factory: TweetFactory = None,
+                 feed: Callable[[TweetFactory], FakeFeed] = None):
+        latency = latency or {}
+        self.sleep = sleep
+        self.clock = clock
+        self.factory = factory or TweetFactory(seed=seed, clock=clock)
+        self.twitter_stats = ApiStats()
+        self.weaviate = FakeWeaviateClient(latency.get("weaviate"), sleep)
+        self.giphy = FakeGiphy(latency.get("giphy"), sleep)
+        self.llm = FakeLLM(latency=latency.get("llm") or LatencyModel(), sleep=sleep, seed=seed)
+
+        # The GIF path calls Giphy and its own LLM chain at module level
+        self.giphy.install(gif_reply)
+        gif_reply.gif_chain = LLMChain(llm=self.llm, prompt=gif_reply.gif_prompt)
+
+        self.global_budget = None
+        if params is not None and params.get("llm_budget"):
+            self.global_budget = HourlyBudget(params["llm_budget"].get("global_tokens_per_hour"), clock)
+            token_counter = TokenCounter(self.llm.model_name)
+
+        self.agents: List[FleetAgent] = []
+        for i in range(n_agents):
+            agent_id = str(1000 + i)
+            agent_name = f"agent_{i}"
+            client = FakeTwitterClient(self.factory, latency.get("twitter"), sleep, self.twitter_stats,
+                                       rate_limits=rate_limits, clock=clock, feed=feed)
+            v1_api = FakeV1API(latency.get("v1"), sleep, self.twitter_stats)
+            twitter_client = {
+                "client": client,
+                "v1_api": v1_api,
+                "strategy": "basic",
+                "user_name": agent_name,
+                "agent_id": agent_id,
+            }
+            if params is not None:
+                sampler = ActionSampler.from_params(params, "basic", agent_id)
+            else:
+                sampler = ActionSampler(seed=None if seed is None else seed + i)
+            budget = None
+            if self.global_budget is not None:
+                budget = TokenGovernor.from_params(params, self.global_budget, clock=clock, counter=token_counter)
+
+            collector = TwitterCollector(agent_id, client, None, self.weaviate)
+            pack_size = params.get("reply_pack_size", 1) if params is not None else 1
+            strategy = TwitterStrategy(self.llm, twitter_client, None, sampler, budget, pack_size=pack_size)
+            executor = TwitterExecutor(agent_id, client)
+            self.agents.append(FleetAgent(agent_id, agent_name, client, v1_api, collector, strategy, executor))
+
+        if stored_tweets:
+            self.weaviate.seed_tweets(stored_tweets, self.factory, [a.agent_id for a in self.agents])
+
+    def reset_stats(self):
+        for stats in (self.twitter_stats, self.weaviate.stats, self.giphy.stats, self.llm.stats):
+            stats.reset()
+
+    def stats(self) -> dict:
+        return {
+            "twitter": self.twitter_stats.snapshot(),
+            "weaviate": self.weaviate.stats.snapshot(),
+            "giphy": self.giphy.stats.snapshot(),
+            "llm": self.llm.stats.snapshot(),
+        }
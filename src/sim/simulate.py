@@ -0,0 +1,153 @@
+"""Run the engine's `main.run` loop for many agents on a virtual clock.
+
+A day of hourly cycles for a fleet of agents completes in seconds. Every agent
+cycle emits one JSON trace record with the actions taken, the API calls it
+made, how many were rate limited, the remaining per-endpoint quota and LLM
+usage, so scheduling and throughput changes can be compared run to run.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import IO, Optional
+
+from .backends import LatencyModel
+from .clock import VirtualClock
+from .fleet import Fleet
+from .timeline import SyntheticTimeline
+
+# Per-user Twitter API v2 limits as (requests, window seconds)
+DEFAULT_RATE_LIMITS = {
+    "get_home_timeline": (180, 900),
+    "get_list_tweets": (900, 900),
+    "get_owned_lists": (15, 900),
+    "get_liking_users": (75, 900),
+    "get_users_followers": (15, 900),
+    "get_users_mentions": (180, 900),
+    "search_recent_tweets": (180, 900),
+    "like": (50, 900),
+    "retweet": (50, 900),
+    "create_tweet": (200, 900),
+    "follow_user": (50, 900),
+}
+
+
+def _delta(after: dict, before: dict) -> dict:
+    return {k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)}
+
+
+class CycleTracer:
+    """Writes one JSON record per agent cycle.
+
+    Agents run their synchronous work back to back on one event loop, so the
+    backend counters that moved since the previous record belong to the agent
+    that just finished its cycle.
+    """
+
+    def __init__(self, fleet: Fleet, clock: VirtualClock, out: IO[str]):
+        self.fleet = fleet
+        self.clock = clock
+        self.out = out
+        self.start = clock.time()
+        self.agents = {agent.agent_name: agent for agent in fleet.agents}
+        self.cycles = Counter()
+        self.totals = {"actions": Counter(), "api_calls": Counter(), "rate_limited": Counter(), "llm_calls": 0}
+        self._previous = fleet.stats()
+
+    def __call__(self, agent_name: str, actions):
+        stats = self.fleet.stats()
+        previous, self._previous = self._previous, stats
+        agent = self.agents[agent_name]
+        self.cycles[agent_name] += 1
+
+        action_counts = Counter(action.action for action in actions)
+        api_calls = _delta(stats["twitter"]["calls"], previous["twitter"]["calls"])
+        rate_limited = _delta(stats["twitter"]["rate_limited"], previous["twitter"]["rate_limited"])
+        llm_calls = stats["llm"]["calls"].get("completions", 0) - previous["llm"]["calls"].get("completions", 0)
+
+        self.totals["actions"].update(action_counts)
+        self.totals["api_calls"].update(api_calls)
+        self.totals["rate_limited"].update(rate_limited)
+        self.totals["llm_calls"] += llm_calls
+
+        record = {
+            "time": datetime.fromtimestamp(self.clock.time(), timezone.utc).isoformat(timespec="seconds"),
+            "elapsed_hours": round((self.clock.time() - self.start) / 3600, 4),
+            "agent": agent_name,
+            "cycle": self.cycles[agent_name],
+            "actions": dict(action_counts),
+            "api_calls": api_calls,
+            "rate_limited": rate_limited,
+            "rate_limit_remaining": agent.client.rate_limit_remaining(),
+            "llm": {"calls": llm_calls},
+        }
+        if agent.strategy.budget is not None:
+            record["budget"] = agent.strategy.budget.snapshot()
+        self.out.write(json.dumps(record) + "\n")
+
+    def summary(self) -> dict:
+        return {
+            "agents": len(self.agents),
+            "cycles": sum(self.cycles.values()),
+            "actions": dict(self.totals["actions"]),
+            "api_calls": dict(self.totals["api_calls"]),
+            "rate_limited": dict(self.totals["rate_limited"]),
+            "llm_calls": self.totals["llm_calls"],
+        }
+
+
+async def simulate(n_agents: int = 3, hours: float = 24.0, seed: Optional[int] = 0, stored_tweets: int = 500,
+                   tweets_per_hour: float = 30.0, latency: dict = None, rate_limits: dict = None,
+                   params: dict = None, trace: IO[str] = None, quiet: bool = True) -> dict:
+    """
+    Drive `main.run` for `n_agents` over `hours` of virtual time.
+
+    Backend latency is charged to the virtual clock, so it shows up in the
+    trace timestamps without costing wall time.
+    """
+    import main as engine
+
+    clock = VirtualClock(start=datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+    feed_seed = [seed]
+
+    def feed(factory):
+        feed_seed[0] = None if feed_seed[0] is None else feed_seed[0] + 1
+        return SyntheticTimeline(factory, clock.time, tweets_per_hour=tweets_per_hour, seed=feed_seed[0])
+
+    fleet = Fleet(
+        n_agents,
+        stored_tweets=stored_tweets,
+        seed=seed,
+        latency=latency or {"twitter": LatencyModel(120), "weaviate": LatencyModel(15), "llm": LatencyModel(900),
+                            "giphy": LatencyModel(200), "v1": LatencyModel(400)},
+        sleep=clock.advance,
+        clock=clock.time,
+        rate_limits=DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits,
+        params=params,
+        feed=feed,
+    )
+
+    trace = trace or sys.stdout
+    tracer = CycleTracer(fleet, clock, trace)
+    started = time.perf_counter()
+    root = logging.getLogger()
+    level = root.level
+    if quiet:
+        root.setLevel(logging.WARNING)
+    try:
+        tasks = [
+            asyncio.create_task(engine.run(*agent.cycle_args(fleet.weaviate), sleep=clock.sleep, on_cycle=tracer))
+            for agent in fleet.agents
+        ]
+        await clock.drive(tasks, until=clock.time() + hours * 3600)
+    finally:
+        root.setLevel(level)
+
+    summary = tracer.summary()
+    summary["virtual_hours"] = hours
+    summary["wall_seconds"] = round(time.perf_counter() - started, 3)
+    return summary
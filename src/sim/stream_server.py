@@ -0,0 +1,197 @@
+"""A local stand-in for the v2 filtered-stream endpoints.
+
+Serves `/2/tweets/search/stream/rules` (GET and POST) and
+`/2/tweets/search/stream`, emitting synthetic matching tweets as
+newline-delimited JSON with `\\r\\n` keep-alives in between. It can refuse the
+first connections or rule requests with a status code, drop each connection
+after a number of tweets, or cut some tweets short, so `FilteredStream`'s
+reconnect and backoff paths can be exercised offline:
+
+    with StreamServer(tweets_per_second=50, drop_after=100) as server:
+        stream = FilteredStream("token", base_url=server.url)
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from .backends import TweetFactory
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _refuse_rules(self) -> bool:
+        owner = self.server.owner
+        with owner.lock:
+            owner.rule_requests += 1
+            refuse = owner.rule_requests <= owner.refuse_rules_first
+        if refuse:
+            self._json(owner.refuse_status, {"title": "Refused", "status": owner.refuse_status})
+        return refuse
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/2/tweets/search/stream/rules":
+            if self._refuse_rules():
+                return
+            rules = list(self.server.owner.rules.values())
+            self._json(200, {"data": rules, "meta": {"result_count": len(rules)}})
+        elif path == "/2/tweets/search/stream":
+            self._stream()
+        else:
+            self._json(404, {"title": "Not Found"})
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/2/tweets/search/stream/rules":
+            self._json(404, {"title": "Not Found"})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self._refuse_rules():
+            return
+        owner = self.server.owner
+        created = []
+        with owner.lock:
+            for rule in body.get("add") or []:
+                owner.next_rule_id += 1
+                rule = dict(rule, id=str(owner.next_rule_id))
+                owner.rules[rule["id"]] = rule
+                created.append(rule)
+            for rule_id in (body.get("delete") or {}).get("ids") or []:
+                owner.rules.pop(rule_id, None)
+        self._json(200, {"data": created, "meta": {"summary": {"created": len(created)}}})
+
+    def _stream(self):
+        owner = self.server.owner
+        with owner.lock:
+            owner.connections += 1
+            refuse = owner.connections <= owner.refuse_first
+        if refuse:
+            self._json(owner.refuse_status, {"title": "Refused", "status": owner.refuse_status})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        sent = 0
+        interval = 1.0 / owner.tweets_per_second if owner.tweets_per_second else None
+        last_keep_alive = time.monotonic()
+        try:
+            while not owner.stopped.is_set():
+                if owner.drop_after is not None and sent >= owner.drop_after:
+                    break
+                if interval is not None and owner.rules:
+                    line = json.dumps(owner.payload()).encode()
+                    if owner.truncate_every and (sent + 1) % owner.truncate_every == 0:
+                        line = line[:len(line) // 2]
+                    self._chunk(line + b"\r\n")
+                    sent += 1
+                    with owner.lock:
+                        owner.sent += 1
+                    owner.stopped.wait(interval)
+                else:
+                    owner.stopped.wait(0.1)
+                if time.monotonic() - last_keep_alive >= owner.keep_alive:
+                    self._chunk(b"\r\n")
+                    last_keep_alive = time.monotonic()
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    owner: "StreamServer"
+
+
+class StreamServer:
+    """
+    Args:
+        tweets_per_second: rate of matching tweets while any rule is set
+        drop_after: close each stream connection after this many tweets
+        refuse_first: answer the first N stream connections with `refuse_status`
+        refuse_rules_first: answer the first N rules requests with `refuse_status`
+        truncate_every: cut every Nth tweet of a connection off half-way through its line
+        keep_alive: seconds between keep-alive newlines
+    """
+
+    def __init__(self, tweets_per_second: float = 20.0, drop_after: Optional[int] = None,
+                 refuse_first: int = 0, refuse_status: int = 429, keep_alive: float = 20.0,
+                 factory: TweetFactory = None, host: str = "127.0.0.1", port: int = 0,
+                 refuse_rules_first: int = 0, truncate_every: Optional[int] = None):
+        self.tweets_per_second = tweets_per_second
+        self.drop_after = drop_after
+        self.refuse_first = refuse_first
+        self.refuse_rules_first = refuse_rules_first
+        self.truncate_every = truncate_every
+        self.refuse_status = refuse_status
+        self.keep_alive = keep_alive
+        self.factory = factory or TweetFactory()
+        self.rules = {}
+        self.next_rule_id = 1_600_000_000_000_000_000
+        self.connections = 0
+        self.rule_requests = 0
+        self.sent = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self._server = _Server((host, port), _Handler)
+        self._server.owner = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def payload(self) -> dict:
+        with self.lock:
+            rules: List[dict] = list(self.rules.values())
+        rule = rules[self.factory.rng.randrange(len(rules))]
+        topic = rule.get("tag", "").split(":", 1)[-1] or rule["value"].split()[0]
+        tweet = self.factory.make()
+        tweet["text"] = f"{tweet['text']} #{topic}"
+        author = self.factory.user(int(tweet["author_id"]))
+        return {
+            "data": tweet,
+            "includes": {"users": [author]},
+            "matching_rules": [{"id": rule["id"], "tag": rule.get("tag")}],
+        }
+
+    def start(self) -> "StreamServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stream-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
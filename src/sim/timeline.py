@@ -0,0 +1,45 @@
+"""Synthetic timelines whose arrival rate follows the (virtual) time of day."""
+
+import math
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import numpy as np
+
+from .backends import FakeFeed, TweetFactory
+
+
+class SyntheticTimeline(FakeFeed):
+    """
+    A feed with Poisson arrivals at a diurnal rate.
+
+    The rate peaks at `peak_hour` UTC at `tweets_per_hour * (1 + amplitude)` and
+    bottoms out twelve hours later. Arrivals are drawn for the virtual time that
+    passed since the previous poll, so polling more often does not create more
+    tweets.
+    """
+
+    def __init__(self, factory: TweetFactory, clock: Callable[[], float], tweets_per_hour: float = 30.0,
+                 amplitude: float = 0.6, peak_hour: float = 15.0, seed: Optional[int] = None,
+                 max_size: int = 5000):
+        super().__init__(factory, per_poll=0, max_size=max_size)
+        self.clock = clock
+        self.tweets_per_hour = tweets_per_hour
+        self.amplitude = amplitude
+        self.peak_hour = peak_hour
+        self.rng = np.random.default_rng(seed)
+        self._last_poll = clock()
+
+    def rate(self, at: float) -> float:
+        """Expected tweets per hour at virtual time `at`."""
+        hour = datetime.fromtimestamp(at, timezone.utc)
+        hour = hour.hour + hour.minute / 60
+        phase = 2 * math.pi * (hour - self.peak_hour) / 24
+        return self.tweets_per_hour * (1 + self.amplitude * math.cos(phase))
+
+    def arrivals(self) -> int:
+        now = self.clock()
+        elapsed_hours = max(0.0, now - self._last_poll) / 3600
+        midpoint = (now + self._last_poll) / 2
+        self._last_poll = now
+        return int(self.rng.poisson(self.rate(midpoint) * elapsed_hours))
@@ -0,0 +1,151 @@
+"""A local stand-in for Twitter's side of Account Activity webhooks.
+
+Builds deliveries shaped like the real ones (v1.1 statuses and users),
+signs them with the consumer secret, and sends them to a receiver: a URL, or
+a Flask app directly through its test client. Deliveries recorded as JSONL
+(one payload per line, with an optional `_at` offset in seconds) can be
+replayed at their original pace or faster:
+
+    replayer = EventReplayer("secret", create_app("secret", dispatcher))
+    replayer.send(replayer.mention(agent_id, "@agent gm"))
+    replayer.replay("deliveries.jsonl", speed=10)
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, NamedTuple, Union
+
+import requests
+
+from webhook.app import SIGNATURE_HEADER, WEBHOOK_PATH
+from webhook.events import crc_response, sign
+
+from .backends import TweetFactory
+
+_V1_DATE = "%a %b %d %H:%M:%S +0000 %Y"
+
+
+class ReplayReport(NamedTuple):
+    sent: int
+    accepted: int
+    queued: int
+    seconds: float
+
+
+class EventReplayer:
+    """
+    Args:
+        target: the receiver's base URL, or the Flask app itself
+        factory: ids and texts of the generated tweets and users
+    """
+
+    def __init__(self, consumer_secret: str, target, factory: TweetFactory = None, path: str = WEBHOOK_PATH,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.consumer_secret = consumer_secret
+        self.factory = factory or TweetFactory()
+        self.path = path
+        self.sleep = sleep
+        if isinstance(target, str):
+            self._session = requests.Session()
+            self._url = target.rstrip("/") + path
+            self._client = None
+        else:
+            self._client = target.test_client()
+
+    # Building deliveries ---------------------------------------------------
+
+    def _user(self, user_id: int) -> dict:
+        user = self.factory.user(user_id)
+        return {"id": int(user_id), "id_str": str(user_id), "screen_name": user["username"],
+                "followers_count": user["public_metrics"]["followers_count"]}
+
+    def _status(self, author_id: int, text: str, in_reply_to: int = None, in_reply_to_user: int = None) -> dict:
+        tweet = self.factory.make(author_id=author_id, text=text)
+        return {
+            "id": int(tweet["id"]),
+            "id_str": tweet["id"],
+            "text": tweet["text"],
+            "created_at": datetime.fromtimestamp(self.factory.clock(), timezone.utc).strftime(_V1_DATE),
+            "user": self._user(author_id),
+            "in_reply_to_status_id_str": str(in_reply_to) if in_reply_to else None,
+            "in_reply_to_user_id_str": str(in_reply_to_user) if in_reply_to_user else None,
+            "entities": {"user_mentions": []},
+        }
+
+    def mention(self, agent_id, text: str = None, author_id: int = None, in_reply_to: int = None) -> dict:
+        """Another user @-mentions the agent, or replies to tweet `in_reply_to` of the agent."""
+        author_id = author_id or self.factory.author_id()
+        status = self._status(author_id, text or f"@agent {self.factory.text()}", in_reply_to,
+                              agent_id if in_reply_to else None)
+        status["entities"]["user_mentions"].append({"id_str": str(agent_id), "screen_name": "agent"})
+        return {"for_user_id": str(agent_id), "tweet_create_events": [status]}
+
+    def follow(self, agent_id, follower_id: int = None) -> dict:
+        follower_id = follower_id or self.factory.author_id()
+        return {
+            "for_user_id": str(agent_id),
+            "follow_events": [{
+                "type": "follow",
+                "created_timestamp": str(int(self.factory.clock() * 1000)),
+                "target": {"id": str(agent_id)},
+                "source": dict(self._user(follower_id), id=str(follower_id)),
+            }],
+        }
+
+    def like(self, agent_id, tweet_id: int, user_id: int = None) -> dict:
+        status = self._status(int(agent_id), self.factory.text())
+        status["id_str"], status["id"] = str(tweet_id), int(tweet_id)
+        return {
+            "for_user_id": str(agent_id),
+            "favorite_events": [{"favorited_status": status, "user": self._user(user_id or self.factory.author_id())}],
+        }
+
+    # Sending ---------------------------------------------------------------
+
+    def crc(self, token: str = "challenge") -> bool:
+        """Issue a CRC challenge; True if the receiver answered it correctly."""
+        if self._client is not None:
+            response = self._client.get(self.path, query_string={"crc_token": token})
+            body = response.get_json()
+        else:
+            response = self._session.get(self._url, params={"crc_token": token}, timeout=10)
+            body = response.json()
+        return response.status_code == 200 and body == crc_response(self.consumer_secret, token)
+
+    def send(self, payload: dict, signature: str = None) -> int:
+        """POST one signed delivery; returns the number of work items the receiver queued (-1 if refused)."""
+        body = json.dumps(payload).encode()
+        headers = {SIGNATURE_HEADER: signature or sign(self.consumer_secret, body),
+                   "Content-Type": "application/json"}
+        if self._client is not None:
+            response = self._client.post(self.path, data=body, headers=headers)
+            status, result = response.status_code, response.get_json(silent=True)
+        else:
+            response = self._session.post(self._url, data=body, headers=headers, timeout=10)
+            status, result = response.status_code, response.json() if response.ok else None
+        return result["queued"] if status == 200 else -1
+
+    def replay(self, deliveries: Union[str, Iterable[dict]], speed: float = None) -> ReplayReport:
+        """
+        Send recorded deliveries in order. With `speed`, the gaps between their `_at`
+        offsets are kept, divided by `speed`; without, they are sent back to back.
+        """
+        if isinstance(deliveries, str):
+            with open(deliveries) as f:
+                deliveries: List[dict] = [json.loads(line) for line in f if line.strip()]
+        started = time.monotonic()
+        sent = accepted = queued = 0
+        previous = None
+        for payload in deliveries:
+            payload = dict(payload)
+            at = payload.pop("_at", None)
+            if speed and at is not None and previous is not None and at > previous:
+                self.sleep((at - previous) / speed)
+            previous = at if at is not None else previous
+            result = self.send(payload)
+            sent += 1
+            if result >= 0:
+                accepted += 1
+                queued += result
+        return ReplayReport(sent, accepted, queued, time.monotonic() - started)
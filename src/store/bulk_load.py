@@ -0,0 +1,315 @@
+"""Parallel bulk loading of historical tweets into Weaviate.
+
+Archives are read as JSONL (optionally gzipped), CSV or Parquet, a chunk at a
+time. Each record is normalised to the `Tweets` properties, whichever dump
+format it came from (our own rows, API v2 `data` objects, v1.1 statuses),
+and validated; bad records are counted and can be written to a rejects file.
+Every object gets a uuid5 of its tweet id, so reloading an archive, or
+two overlapping archives, updates objects in place instead of duplicating
+them.
+
+Batches go to `/v1/batch/objects` from a pool of threads sharing the pooled
+transport, with at most two batches per thread in flight so memory stays
+bounded. Connection errors, 429s and 5xx responses are retried with
+exponential backoff; per-object errors in a batch response are counted as
+failures. With an embedding function, each worker embeds its batch in one
+call and sends the vectors along, so Weaviate does not vectorise objects
+one by one; that call is retried the same way, and a batch that still cannot
+be embedded is counted as failed.
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Set, TextIO
+
+import requests
+
+from utils.transport import WEAVIATE_URL, get_transport
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("jsonl", "csv", "parquet")
+# Twitter v1.1 `created_at`, e.g. "Wed Oct 10 20:19:24 +0000 2018"
+_V1_DATE = "%a %b %d %H:%M:%S %z %Y"
+
+
+class BulkReport(NamedTuple):
+    read: int
+    loaded: int
+    invalid: int
+    failed: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.loaded / self.seconds if self.seconds > 0 else 0.0
+
+
+# Reading -----------------------------------------------------------------
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(name)[1].lstrip(".").lower()
+    if ext in ("jsonl", "ndjson", "json"):
+        return "jsonl"
+    if ext in FORMATS:
+        return ext
+    raise ValueError(f"Cannot tell the format of {path}; pass one of {', '.join(FORMATS)}")
+
+
+def _open_text(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path), encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_records(path: str, fmt: str = None, chunk_size: int = 5000) -> Iterator[List[dict]]:
+    """Raw records of an archive, `chunk_size` at a time; JSONL lines are left unparsed for `load` to validate."""
+    fmt = fmt or detect_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    chunk = []
+    with _open_text(path) as f:
+        rows = csv.DictReader(f) if fmt == "csv" else (line.strip() for line in f if line.strip())
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+# Normalising -------------------------------------------------------------
+
+
+def object_id(tweet_id: str, class_name: str = "Tweets") -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"twitter-agent/{class_name}/{tweet_id}"))
+
+
+def _count(value) -> int:
+    if value in (None, ""):
+        return 0
+    count = int(float(value))
+    if count < 0:
+        raise ValueError(f"negative count {value!r}")
+    return count
+
+
+def _date(value) -> Optional[str]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        parsed = datetime.fromtimestamp(value, timezone.utc)
+    else:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            parsed = datetime.strptime(value, _V1_DATE)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def _nested(record: dict, key: str) -> dict:
+    value = record.get(key)
+    if isinstance(value, str) and value.startswith("{"):
+        # CSV exports keep nested objects as JSON text
+        value = json.loads(value)
+    return value if isinstance(value, dict) else {}
+
+
+def normalise(record: dict, agent_id: str = "bulk") -> dict:
+    """`Tweets` properties for one archive record; raises ValueError when it cannot be loaded."""
+    metrics = _nested(record, "public_metrics")
+    user = _nested(record, "user")
+    tweet_id = str(record.get("tweet_id") or record.get("id_str") or record.get("id") or "").strip()
+    if not tweet_id.isdigit():
+        raise ValueError(f"bad tweet id {tweet_id!r}")
+    text = record.get("tweet") or record.get("full_text") or record.get("text") or ""
+    if not text.strip():
+        raise ValueError("empty text")
+    return {
+        "tweet": text,
+        "tweet_id": tweet_id,
+        "agent_id": str(record.get("agent_id") or agent_id),
+        "author_id": str(record.get("author_id") or user.get("id_str") or user.get("id") or ""),
+        "like_count": _count(record.get("like_count", metrics.get("like_count", record.get("favorite_count")))),
+        "follower_count": _count(record.get("follower_count", user.get("followers_count"))),
+        "date": _date(record.get("date") or record.get("created_at")),
+    }
+
+
+# Loading -----------------------------------------------------------------
+
+
+class BulkLoader:
+    """
+    Args:
+        url: Weaviate root URL
+        batch_size: objects per `/v1/batch/objects` request
+        workers: threads posting batches
+        max_retries: retries of a batch after a connection error, 429 or 5xx
+        embed: texts -> vectors, called once per batch; None leaves vectorising to Weaviate
+        on_progress: called with a BulkReport at most once a second while loading
+    """
+
+    def __init__(self, url: str = WEAVIATE_URL, class_name: str = "Tweets", batch_size: int = 200,
+                 workers: int = 4, max_retries: int = 5, backoff: float = 0.5,
+                 embed: Callable[[List[str]], List[List[float]]] = None, agent_id: str = "bulk",
+                 session: requests.Session = None, on_progress: Callable[[BulkReport], None] = None,
+                 rejects: TextIO = None, sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        self.url = url.rstrip("/")
+        self.class_name = class_name
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.embed = embed
+        self.agent_id = agent_id
+        self.session = session or get_transport().session("weaviate-bulk")
+        self.on_progress = on_progress
+        self.rejects = rejects
+        self.sleep = sleep
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._read = self._loaded = self._invalid = self._failed = 0
+        self._started = 0.0
+
+    @classmethod
+    def from_params(cls, params: dict, **kwargs):
+        config = params.get("bulk_load") or {}
+        for key, default in (("batch_size", 200), ("workers", 4), ("max_retries", 5)):
+            kwargs.setdefault(key, config.get(key, default))
+        return cls(**kwargs)
+
+    def report(self) -> BulkReport:
+        with self._lock:
+            return BulkReport(self._read, self._loaded, self._invalid, self._failed, self.clock() - self._started)
+
+    def _reject(self, record: dict, reason: str):
+        with self._lock:
+            self._invalid += 1
+            if self.rejects is not None:
+                self.rejects.write(json.dumps({"reason": reason, "record": record}, default=str) + "\n")
+
+    def _post(self, objects: List[dict]) -> int:
+        """POST one batch, retrying transient failures; returns the objects Weaviate rejected."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(f"{self.url}/v1/batch/objects", json={"objects": objects}, timeout=120)
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    results = response.json()
+                    errors = [r for r in results if (r.get("result") or {}).get("errors")]
+                    if errors:
+                        logger.warning("%d of %d objects rejected, e.g. %s", len(errors), len(objects),
+                                       errors[0]["result"]["errors"])
+                    return len(errors)
+                reason = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                reason = str(e)
+            if attempt < self.max_retries:
+                delay = self.backoff * 2 ** attempt
+                logger.info("Batch failed (%s), retrying in %.1fs", reason, delay)
+                self.sleep(delay)
+        logger.warning("Batch of %d dropped after %d retries: %s", len(objects), self.max_retries, reason)
+        return len(objects)
+
+    def _embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Vectors for one batch, retrying failures as `_post` does; None if they persist."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embed(texts)
+            except Exception as e:
+                reason = str(e)
+            if attempt < self.max_retries:
+                delay = self.backoff * 2 ** attempt
+                logger.info("Embedding failed (%s), retrying in %.1fs", reason, delay)
+                self.sleep(delay)
+        logger.warning("Batch of %d dropped after %d embedding retries: %s", len(texts), self.max_retries, reason)
+        return None
+
+    def _write(self, batch: List[dict]):
+        objects = [{"class": self.class_name, "id": object_id(p["tweet_id"], self.class_name), "properties": p}
+                   for p in batch]
+        if self.embed is not None:
+            vectors = self._embed([p["tweet"] for p in batch])
+            if vectors is None:
+                with self._lock:
+                    self._failed += len(objects)
+                return
+            for obj, vector in zip(objects, vectors):
+                obj["vector"] = vector
+        try:
+            failed = self._post(objects)
+        except requests.HTTPError as e:
+            logger.warning("Batch of %d refused: %s", len(objects), e)
+            failed = len(objects)
+        with self._lock:
+            self._loaded += len(objects) - failed
+            self._failed += failed
+
+    def load(self, chunks: Iterable[List[dict]]) -> BulkReport:
+        """Normalise, validate and write every record of `chunks` (as from `read_records`)."""
+        with self._lock:
+            self._read = self._loaded = self._invalid = self._failed = 0
+        self._started = self.clock()
+        last_progress = self._started
+        pending: Set[Future] = set()
+        batch: List[dict] = []
+
+        def submit(executor, batch):
+            nonlocal last_progress
+            while len(pending) >= 2 * self.workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    future.result()
+            pending.add(executor.submit(self._write, batch))
+            if self.on_progress is not None and self.clock() - last_progress >= 1:
+                last_progress = self.clock()
+                self.on_progress(self.report())
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="bulk-load") as executor:
+            for chunk in chunks:
+                with self._lock:
+                    self._read += len(chunk)
+                for record in chunk:
+                    try:
+                        # A truncated or corrupt JSONL line is one bad record, not the end of the archive
+                        parsed = json.loads(record) if isinstance(record, str) else record
+                        batch.append(normalise(parsed, self.agent_id))
+                    except (ValueError, TypeError, AttributeError, OverflowError) as e:
+                        self._reject(record, str(e))
+                        continue
+                    if len(batch) == self.batch_size:
+                        submit(executor, batch)
+                        batch = []
+            if batch:
+                submit(executor, batch)
+            for future in pending:
+                future.result()
+
+        report = self.report()
+        if self.on_progress is not None:
+            self.on_progress(report)
+        return report
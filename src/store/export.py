@@ -0,0 +1,277 @@
+"""Incremental, columnar export of Weaviate classes to partitioned Parquet.
+
+Each class becomes a Hive-style dataset, `<directory>/<Class>/day=YYYY-MM-DD/`,
+partitioned by the UTC day of its `date` property (or of the object's
+creation time when it has none). Columns are typed from the class schema:
+text as string, int as int64, number as float64, date as a UTC timestamp,
+arrays as lists. Every row also carries `_id` and `_created`.
+
+Objects are read `chunk_size` at a time and each chunk is appended to one open
+`ParquetWriter` per partition as a row group, so memory is bounded by the
+chunk whatever the class size. Every run writes new files, finished under a
+temporary name and renamed at the end, then records the newest creation time
+it exported. The next run only exports objects created after that:
+
+- a first (or `full`) run walks the whole class with the object cursor into
+  a fresh directory, swapped in for the class's dataset only once complete,
+  so re-exporting never duplicates rows;
+- later runs page by `_creationTimeUnix` (keyset pagination), which needs
+  `indexTimestamps` on the class (store.schema turns it on); without it they
+  walk the cursor and skip older objects.
+"""
+
+import glob
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = "./data/export"
+STATE_FILE = "_export_state.json"
+IN_PROGRESS = ".inprogress"
+REPLACED = ".replaced"
+# Weaviate answers at most this many objects per query (QUERY_MAXIMUM_RESULTS)
+MAX_QUERY_RESULTS = 10000
+
+_ARROW_TYPES = {
+    "text": pa.string(),
+    "string": pa.string(),
+    "uuid": pa.string(),
+    "int": pa.int64(),
+    "number": pa.float64(),
+    "boolean": pa.bool_(),
+    "date": pa.timestamp("ms", tz="UTC"),
+}
+
+
+class ExportReport(NamedTuple):
+    class_name: str
+    rows: int
+    files: int
+    bytes: int
+    watermark_ms: Optional[int]
+    full: bool
+
+
+def _datetime(value) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def arrow_type(data_type: Sequence[str]) -> pa.DataType:
+    name = data_type[0]
+    if name.endswith("[]"):
+        return pa.list_(_ARROW_TYPES.get(name[:-2], pa.string()))
+    # Cross-references and geo/phone values are kept as JSON text
+    return _ARROW_TYPES.get(name, pa.string())
+
+
+class ParquetExporter:
+    """
+    Args:
+        directory: dataset root; one sub-directory per class
+        chunk_size: objects per read and per row group
+        compression: Parquet codec (zstd, snappy, gzip, none)
+    """
+
+    def __init__(self, weaviate_client, directory: str = EXPORT_DIR, chunk_size: int = 1000,
+                 compression: str = "zstd", clock=time.time):
+        self.client = weaviate_client
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.clock = clock
+
+    @classmethod
+    def from_params(cls, weaviate_client, params: dict, **kwargs):
+        config = params.get("export") or {}
+        kwargs.setdefault("directory", config.get("directory", EXPORT_DIR))
+        kwargs.setdefault("chunk_size", config.get("chunk_size", 1000))
+        kwargs.setdefault("compression", config.get("compression", "zstd"))
+        return cls(weaviate_client, **kwargs)
+
+    # State -----------------------------------------------------------------
+
+    def _state_path(self) -> str:
+        return os.path.join(self.directory, STATE_FILE)
+
+    def load_state(self) -> Dict[str, dict]:
+        try:
+            with open(self._state_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_state(self, state: Dict[str, dict]):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._state_path() + IN_PROGRESS
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self._state_path())
+
+    # Schema ----------------------------------------------------------------
+
+    def arrow_schema(self, class_schema: dict) -> pa.Schema:
+        fields = [pa.field("_id", pa.string(), nullable=False), pa.field("_created", pa.timestamp("ms", tz="UTC"))]
+        fields += [pa.field(p["name"], arrow_type(p["dataType"])) for p in class_schema["properties"]]
+        return pa.schema(fields)
+
+    # Reading ---------------------------------------------------------------
+
+    def _cursor_scan(self, class_name: str, since_ms: Optional[int]) -> Iterator[List[dict]]:
+        cursor = None
+        while True:
+            page = self.client.data_object.get(class_name=class_name, limit=self.chunk_size, after=cursor)
+            objects = page.get("objects") or []
+            rows = [dict(obj["properties"], _id=obj["id"], _created=int(obj.get("creationTimeUnix") or 0))
+                    for obj in objects]
+            if since_ms is not None:
+                rows = [row for row in rows if row["_created"] > since_ms]
+            if rows:
+                yield rows
+            if len(objects) < self.chunk_size:
+                return
+            cursor = objects[-1]["id"]
+
+    def _created_query(self, class_name: str, properties: List[str], operator: str, ms: int, limit: int) -> List[dict]:
+        response = (
+            self.client.query.get(class_name, properties)
+            .with_additional(["id", "creationTimeUnix"])
+            .with_where({"path": ["_creationTimeUnix"], "operator": operator, "valueText": str(ms)})
+            .with_sort({"path": ["_creationTimeUnix"], "order": "asc"})
+            .with_limit(limit)
+            .do()
+        )
+        rows = response["data"]["Get"][class_name] or []
+        for row in rows:
+            additional = row.pop("_additional")
+            row["_id"], row["_created"] = additional["id"], int(additional["creationTimeUnix"])
+        return rows
+
+    def _keyset_scan(self, class_name: str, properties: List[str], since_ms: int) -> Iterator[List[dict]]:
+        while True:
+            page = self._created_query(class_name, properties, "GreaterThan", since_ms, self.chunk_size)
+            if not page:
+                return
+            last = page[-1]["_created"]
+            if len(page) < self.chunk_size:
+                yield page
+                return
+            # Objects sharing the page's last millisecond may straddle pages; leave them to the next page
+            rows = [row for row in page if row["_created"] < last]
+            if rows:
+                since_ms = rows[-1]["_created"]
+            else:
+                # A whole page from one batch import: take that millisecond in one query
+                rows = self._created_query(class_name, properties, "Equal", last, MAX_QUERY_RESULTS)
+                since_ms = last
+            yield rows
+
+    def scan(self, class_schema: dict, since_ms: Optional[int] = None) -> Iterator[List[dict]]:
+        """Chunks of rows (properties plus `_id` and `_created`) created after `since_ms`."""
+        class_name = class_schema["class"]
+        indexed = (class_schema.get("invertedIndexConfig") or {}).get("indexTimestamps")
+        if since_ms is None or not indexed:
+            return self._cursor_scan(class_name, since_ms)
+        properties = [p["name"] for p in class_schema["properties"]]
+        return self._keyset_scan(class_name, properties, since_ms)
+
+    # Writing ---------------------------------------------------------------
+
+    def to_table(self, rows: List[dict], schema: pa.Schema) -> pa.Table:
+        columns = []
+        for field in schema:
+            values = [row.get(field.name) for row in rows]
+            if pa.types.is_timestamp(field.type):
+                if field.name == "_created":
+                    values = [datetime.fromtimestamp(v / 1000, timezone.utc) if v else None for v in values]
+                else:
+                    values = [_datetime(v) for v in values]
+            elif field.type == pa.string():
+                values = [v if v is None or isinstance(v, str) else json.dumps(v) for v in values]
+            columns.append(pa.array(values, field.type))
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    @staticmethod
+    def _days(table: pa.Table) -> List[str]:
+        column = "date" if "date" in table.column_names else "_created"
+        return [value.strftime("%Y-%m-%d") if value is not None else "unknown"
+                for value in table.column(column).to_pylist()]
+
+    def export(self, class_name: str, full: bool = False) -> ExportReport:
+        state = self.load_state()
+        since_ms = None if full else (state.get(class_name) or {}).get("created_ms")
+        class_schema = self.client.schema.get(class_name)
+        schema = self.arrow_schema(class_schema)
+        root = os.path.join(self.directory, class_name)
+        # Leftovers of an interrupted run were never recorded in the state; drop them
+        for stale in glob.glob(os.path.join(root, "*", "*" + IN_PROGRESS)):
+            os.remove(stale)
+        shutil.rmtree(root + IN_PROGRESS, ignore_errors=True)
+        if os.path.isdir(root + REPLACED):
+            if not os.path.isdir(root):
+                # Interrupted between the two renames of a full run's swap
+                os.replace(root + REPLACED, root)
+            else:
+                shutil.rmtree(root + REPLACED)
+        full = since_ms is None
+        # A full run rewrites every row, so it builds a new dataset beside the old one
+        target = root + IN_PROGRESS if full else root
+
+        run = f"{int(self.clock())}-{uuid.uuid4().hex[:8]}"
+        writers: Dict[str, pq.ParquetWriter] = {}
+        paths: Dict[str, str] = {}
+        rows = 0
+        watermark = since_ms
+        try:
+            for chunk in self.scan(class_schema, since_ms):
+                table = self.to_table(chunk, schema)
+                days = self._days(table)
+                for day in sorted(set(days)):
+                    if day not in writers:
+                        directory = os.path.join(target, f"day={day}")
+                        os.makedirs(directory, exist_ok=True)
+                        paths[day] = os.path.join(directory, f"part-{run}.parquet")
+                        writers[day] = pq.ParquetWriter(paths[day] + IN_PROGRESS, schema,
+                                                        compression=self.compression)
+                    writers[day].write_table(table.take([i for i, d in enumerate(days) if d == day]))
+                rows += len(chunk)
+                newest = max(row["_created"] for row in chunk)
+                watermark = newest if watermark is None else max(watermark, newest)
+                logger.info("Exported %d rows of %s", rows, class_name)
+        except BaseException:
+            for day, writer in writers.items():
+                writer.close()
+                os.remove(paths[day] + IN_PROGRESS)
+            if full:
+                shutil.rmtree(target, ignore_errors=True)
+            raise
+
+        size = 0
+        for day, writer in writers.items():
+            writer.close()
+            os.replace(paths[day] + IN_PROGRESS, paths[day])
+            size += os.path.getsize(paths[day])
+        if full:
+            os.makedirs(target, exist_ok=True)
+            if os.path.isdir(root):
+                os.replace(root, root + REPLACED)
+            os.replace(target, root)
+            shutil.rmtree(root + REPLACED, ignore_errors=True)
+        state[class_name] = {
+            "created_ms": watermark,
+            "exported_at": datetime.fromtimestamp(self.clock(), timezone.utc).isoformat(timespec="seconds"),
+            "rows": rows,
+        }
+        self._save_state(state)
+        return ExportReport(class_name, rows, len(writers), size, watermark, full)
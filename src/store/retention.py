@@ -0,0 +1,274 @@
+"""Retention for the Tweets class: TTL deletes and duplicate collapsing, a bounded slice at a time.
+
+Timeline ingestion writes the same tweets again every cycle and nothing was
+ever deleted. `RetentionJob` bounds the class from both ends:
+
+- expiry: batch deletes by `date`, oldest hour first, so no single delete
+  walks the whole class; a slice holding more than the deletes left this run
+  is narrowed first;
+- compaction: an id-cursor scan that looks up each page's `tweet_id`s with
+  one filtered query and deletes every copy but the freshest (latest `date`,
+  then highest `like_count`). Filters on several values are an `Or` of
+  `Equal`s, which Weaviate 1.19 understands (`ContainsAny` needs 1.21).
+
+Each run stops after `max_deletes` deletions and `pages_per_run` scan pages,
+pausing between requests; the scan resumes from its cursor on the next run.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from utils.metrics import RETENTION_DELETED
+
+logger = logging.getLogger(__name__)
+
+# Weaviate answers at most this many objects per query (QUERY_MAXIMUM_RESULTS)
+MAX_QUERY_RESULTS = 10000
+
+
+class RetentionReport(NamedTuple):
+    expired: int
+    duplicates: int
+    scanned: int
+    scan_complete: bool
+    objects: int
+    bytes_per_object: int
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return (self.expired + self.duplicates) * self.bytes_per_object
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+def any_equal(path: str, values: List[str]) -> dict:
+    """`path` equal to any of `values`; an `Or` of `Equal`s, as ContainsAny needs Weaviate 1.21."""
+    operands = [{"path": [path], "operator": "Equal", "valueText": value} for value in values]
+    return operands[0] if len(operands) == 1 else {"operator": "Or", "operands": operands}
+
+
+def _timestamp(date: Optional[str]) -> float:
+    if not date:
+        return 0.0
+    return datetime.fromisoformat(date.replace("Z", "+00:00")).timestamp()
+
+
+class RetentionJob:
+    """
+    Args:
+        ttl: seconds a tweet is kept after its `date`; None keeps everything
+        slice_seconds: width of the `date` range removed per delete request
+        max_deletes: deletions per run, expiry and compaction together
+        page_size: objects per scan page (and per duplicate lookup)
+        pages_per_run: scan pages per run
+        pause: seconds to wait between requests
+        interval: seconds between runs of the background thread
+    """
+
+    def __init__(self, weaviate_client, class_name: str = "Tweets", ttl: Optional[float] = 7 * 86400,
+                 slice_seconds: float = 3600, max_deletes: int = 5000, page_size: int = 200,
+                 pages_per_run: int = 20, pause: float = 0.5, interval: float = 3600,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = None):
+        self.client = weaviate_client
+        self.class_name = class_name
+        self.ttl = ttl
+        self.slice_seconds = slice_seconds
+        self.max_deletes = max_deletes
+        self.page_size = page_size
+        self.pages_per_run = pages_per_run
+        self.pause = pause
+        self.interval = interval
+        self.clock = clock
+        self.last_report: Optional[RetentionReport] = None
+        self._cursor: Optional[str] = None
+        self._stop = threading.Event()
+        # Pauses end early when the job is closed
+        self.sleep = sleep or self._stop.wait
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_params(cls, weaviate_client, params: dict, **kwargs):
+        config = params.get("retention") or {}
+        ttl_days = config.get("ttl_days", 7)
+        return cls(
+            weaviate_client,
+            ttl=ttl_days * 86400 if ttl_days else None,
+            max_deletes=config.get("max_deletes_per_run", 5000),
+            page_size=config.get("page_size", 200),
+            pages_per_run=config.get("pages_per_run", 20),
+            pause=config.get("pause_seconds", 0.5),
+            interval=config.get("interval_seconds", 3600),
+            **kwargs,
+        )
+
+    # Expiry ----------------------------------------------------------------
+
+    def _oldest(self) -> Optional[float]:
+        response = (
+            self.client.query.get(self.class_name, ["date"])
+            .with_sort({"path": ["date"], "order": "asc"})
+            .with_limit(1)
+            .do()
+        )
+        rows = response["data"]["Get"][self.class_name]
+        return _timestamp(rows[0]["date"]) if rows and rows[0].get("date") else None
+
+    def _delete(self, where: dict) -> int:
+        result = self.client.batch.delete_objects(self.class_name, where, output="minimal")
+        results = result.get("results") or {}
+        if results.get("failed"):
+            logger.warning("Retention: %d deletes failed in %s", results["failed"], self.class_name)
+        return results.get("successful", 0)
+
+    def _count(self, where: dict) -> int:
+        response = self.client.query.aggregate(self.class_name).with_where(where).with_meta_count().do()
+        return response["data"]["Aggregate"][self.class_name][0]["meta"]["count"]
+
+    def expire(self, budget: int) -> int:
+        """Delete tweets older than the TTL, oldest slice first, never more than `budget`."""
+        if self.ttl is None:
+            return 0
+        cutoff = self.clock() - self.ttl
+        deleted = 0
+        while deleted < budget and not self._stop.is_set():
+            oldest = self._oldest()
+            if oldest is None or oldest >= cutoff:
+                break
+            # A batch delete removes its whole slice, so narrow the slice until it fits in what is left
+            upper = min(oldest + self.slice_seconds, cutoff)
+            where = {"path": ["date"], "operator": "LessThan", "valueDate": _iso(upper)}
+            count = self._count(where)
+            while count > budget - deleted and upper - oldest > 1:
+                upper = oldest + (upper - oldest) / 2
+                where = {"path": ["date"], "operator": "LessThan", "valueDate": _iso(upper)}
+                count = self._count(where)
+            if count > budget - deleted:
+                logger.info("Retention: oldest second of %s holds more than the %d deletes left; next run",
+                            self.class_name, budget - deleted)
+                break
+            removed = self._delete(where)
+            deleted += removed
+            if removed == 0:
+                break
+            self.sleep(self.pause)
+        if deleted:
+            RETENTION_DELETED.labels(self.class_name, "expired").inc(deleted)
+        return deleted
+
+    # Compaction ------------------------------------------------------------
+
+    def _page(self) -> List[dict]:
+        page = self.client.data_object.get(class_name=self.class_name, limit=self.page_size, after=self._cursor)
+        return page.get("objects") or []
+
+    def _copies(self, tweet_ids: List[str]) -> List[dict]:
+        response = (
+            self.client.query.get(self.class_name, ["tweet_id", "date", "like_count", "follower_count"])
+            .with_additional(["id"])
+            .with_where(any_equal("tweet_id", tweet_ids))
+            .with_limit(MAX_QUERY_RESULTS)
+            .do()
+        )
+        if "data" not in response:
+            raise RuntimeError(f"Duplicate lookup on {self.class_name} failed: {response.get('errors')}")
+        return response["data"]["Get"][self.class_name] or []
+
+    def compact(self, budget: int) -> Tuple[int, int, bool]:
+        """Scan up to `pages_per_run` pages; returns (duplicates deleted, objects scanned, scan finished)."""
+        deleted = scanned = 0
+        for _ in range(self.pages_per_run):
+            if deleted >= budget or self._stop.is_set():
+                return deleted, scanned, False
+            objects = self._page()
+            scanned += len(objects)
+            tweet_ids = sorted({str(obj["properties"].get("tweet_id")) for obj in objects
+                                if obj["properties"].get("tweet_id")})
+            if tweet_ids:
+                groups: Dict[str, List[dict]] = {}
+                for row in self._copies(tweet_ids):
+                    groups.setdefault(row["tweet_id"], []).append(row)
+                stale = []
+                for rows in groups.values():
+                    if len(rows) > 1:
+                        rows.sort(key=lambda r: (_timestamp(r.get("date")), r.get("like_count") or 0,
+                                                 r.get("follower_count") or 0), reverse=True)
+                        stale += [row["_additional"]["id"] for row in rows[1:]]
+                stale = stale[:budget - deleted]
+                if stale:
+                    removed = self._delete(any_equal("id", stale))
+                    RETENTION_DELETED.labels(self.class_name, "duplicate").inc(removed)
+                    deleted += removed
+            if len(objects) < self.page_size:
+                self._cursor = None
+                return deleted, scanned, True
+            self._cursor = objects[-1]["id"]
+            self.sleep(self.pause)
+        return deleted, scanned, False
+
+    # Reporting -------------------------------------------------------------
+
+    def count(self) -> int:
+        response = self.client.query.aggregate(self.class_name).with_meta_count().do()
+        return response["data"]["Aggregate"][self.class_name][0]["meta"]["count"]
+
+    def bytes_per_object(self) -> int:
+        """Rough footprint of one object: stored properties, the vector (or its PQ code) and its HNSW links."""
+        sample = self.client.data_object.get(class_name=self.class_name, limit=1, with_vector=True)
+        objects = sample.get("objects") or []
+        if not objects:
+            return 0
+        index = self.client.schema.get(self.class_name).get("vectorIndexConfig") or {}
+        vector = objects[0].get("vector") or []
+        pq = index.get("pq") or {}
+        vector_bytes = (pq.get("segments") or len(vector)) if pq.get("enabled") else 4 * len(vector)
+        # Layer-0 neighbours are capped at 2 * maxConnections, 8 bytes each
+        links = 2 * index.get("maxConnections", 64) * 8 if vector else 0
+        return len(json.dumps(objects[0]["properties"])) + vector_bytes + links
+
+    def run_once(self) -> RetentionReport:
+        expired = self.expire(self.max_deletes)
+        duplicates, scanned, complete = self.compact(self.max_deletes - expired)
+        report = RetentionReport(expired, duplicates, scanned, complete, self.count(), self.bytes_per_object())
+        self.last_report = report
+        logger.info(
+            "Retention on %s: %d expired, %d duplicates removed (%d scanned%s), ~%.1f MB reclaimed, "
+            "%d objects (~%.1f MB) left",
+            self.class_name, expired, duplicates, scanned, ", scan complete" if complete else "",
+            report.reclaimed_bytes / 1e6, report.objects, report.objects * report.bytes_per_object / 1e6,
+        )
+        return report
+
+    # Background ------------------------------------------------------------
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning("Retention run on %s failed: %s", self.class_name, e)
+            self._stop.wait(self.interval)
+
+    def start(self) -> "RetentionJob":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,329 @@
+"""Versioned Weaviate schema for the Tweets and Remilio classes, with named performance profiles.
+
+A profile fixes what the inverted index holds (which properties are
+filterable, which are BM25-searchable) and how the HNSW vector index trades
+memory for recall (`ef`, `efConstruction`, `maxConnections`, and optional
+product quantization). `SchemaManager.migrate()` brings a live instance up to
+the current version without losing data:
+
+- missing classes and properties are created;
+- mutable index settings (`ef`, PQ) are updated in place;
+- settings Weaviate cannot change on a live class (tokenization, index
+  flags, `efConstruction`, `maxConnections`) are applied by copying the class
+  into a staging class with its vectors, recreating it, and copying back.
+
+The applied version and profile are recorded per class in `SchemaMeta`.
+"""
+
+import logging
+import uuid
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+META_CLASS = "SchemaMeta"
+STAGING_SUFFIX = "Migration"
+
+
+class Profile(NamedTuple):
+    vectorizer: str = "text2vec-openai"
+    # -1 lets Weaviate pick ef per query from the limit (dynamic ef)
+    ef: int = -1
+    ef_construction: int = 128
+    max_connections: int = 64
+    # Product quantization: ~segments bytes per vector instead of 4 bytes per dimension
+    pq: bool = False
+    pq_segments: int = 0
+    pq_training_limit: int = 100000
+    filterable: Tuple[str, ...] = ("tweet_id", "agent_id", "author_id", "date", "like_count", "follower_count")
+    searchable: Tuple[str, ...] = ("tweet", "content")
+
+
+PROFILES: Dict[str, Profile] = {
+    "default": Profile(),
+    # Recall first: wider search and a denser graph, more memory per vector
+    "high_recall": Profile(ef=256, ef_construction=512, max_connections=64),
+    # Memory first: a sparser graph, PQ-compressed vectors, no BM25 index on the tweet text
+    "low_memory": Profile(ef=64, ef_construction=64, max_connections=16, pq=True, searchable=("content",)),
+    # No vectors at all (no OpenAI key); text search goes through BM25
+    "no_vectorizer": Profile(vectorizer="none"),
+}
+
+# (name, dataType, tokenization, description); ids are one token each so equality filters hit the index exactly
+PROPERTIES: Dict[str, List[tuple]] = {
+    "Tweets": [
+        ("tweet", "text", "word", "tweet text"),
+        ("tweet_id", "text", "field", "tweet id"),
+        ("agent_id", "text", "field", "agent id"),
+        ("author_id", "text", "field", "author id"),
+        ("date", "date", None, "date"),
+        ("follower_count", "int", None, "follower count"),
+        ("like_count", "int", None, "like count"),
+    ],
+    "Remilio": [
+        ("content", "text", "word", "content"),
+    ],
+}
+
+DESCRIPTIONS = {
+    "Tweets": "Recent tweet from the timeline",
+    "Remilio": "Remilio content for vector store",
+}
+
+
+def _property(name: str, data_type: str, tokenization: Optional[str], description: str, profile: Profile) -> dict:
+    prop = {
+        "name": name,
+        "dataType": [data_type],
+        "description": description,
+        "indexFilterable": name in profile.filterable,
+    }
+    if data_type == "text":
+        prop["tokenization"] = tokenization
+        prop["indexSearchable"] = name in profile.searchable
+    return prop
+
+
+def vector_index_config(profile: Profile) -> dict:
+    return {
+        "ef": profile.ef,
+        "efConstruction": profile.ef_construction,
+        "maxConnections": profile.max_connections,
+        "pq": {
+            "enabled": profile.pq,
+            "segments": profile.pq_segments,
+            "trainingLimit": profile.pq_training_limit,
+        },
+    }
+
+
+def class_definition(class_name: str, profile: Profile) -> dict:
+    return {
+        "class": class_name,
+        "description": DESCRIPTIONS.get(class_name, class_name),
+        "properties": [_property(*spec, profile) for spec in PROPERTIES[class_name]],
+        "vectorizer": profile.vectorizer,
+        "vectorIndexType": "hnsw",
+        "vectorIndexConfig": vector_index_config(profile),
+        # creationTimeUnix filters let retention and exports select by insert time
+        "invertedIndexConfig": {"indexTimestamps": True},
+    }
+
+
+META_DEFINITION = {
+    "class": META_CLASS,
+    "description": "Schema version applied to each class",
+    "properties": [
+        {"name": "class_name", "dataType": ["text"], "tokenization": "field", "indexSearchable": False},
+        {"name": "version", "dataType": ["int"]},
+        {"name": "profile", "dataType": ["text"], "tokenization": "field", "indexSearchable": False},
+    ],
+    "vectorizer": "none",
+    "vectorIndexConfig": {"skip": True},
+}
+
+
+def _meta_id(class_name: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"twitter-agent/schema/{class_name}"))
+
+
+class SchemaManager:
+    """
+    Args:
+        client: weaviate.Client
+        profile: name in PROFILES
+        overrides: Profile fields replacing the profile's own (e.g. {"ef": 128})
+        classes: classes to manage
+        page_size: objects per read while copying a class
+    """
+
+    def __init__(self, client, profile: str = "default", overrides: dict = None,
+                 classes: Tuple[str, ...] = ("Tweets", "Remilio"), page_size: int = 500):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown schema profile {profile!r}; expected one of {sorted(PROFILES)}")
+        self.client = client
+        self.profile_name = profile
+        self.profile = PROFILES[profile]._replace(**(overrides or {}))
+        self.classes = classes
+        self.page_size = page_size
+
+    @classmethod
+    def from_params(cls, client, params: dict, **kwargs):
+        config = dict(params.get("schema") or {})
+        profile = config.pop("profile", "default")
+        for key in ("filterable", "searchable"):
+            if key in config:
+                config[key] = tuple(config[key])
+        return cls(client, profile, config, **kwargs)
+
+    # Inspection ------------------------------------------------------------
+
+    def _classes(self) -> Dict[str, dict]:
+        return {c["class"]: c for c in self.client.schema.get().get("classes", [])}
+
+    def version(self, class_name: str) -> int:
+        """Schema version recorded for `class_name`; 0 if none (a class made by the old setup scripts)."""
+        try:
+            obj = self.client.data_object.get_by_id(_meta_id(class_name), class_name=META_CLASS)
+        except Exception:
+            return 0
+        return int(obj["properties"]["version"]) if obj else 0
+
+    def _needs_rebuild(self, current: dict, desired: dict) -> List[str]:
+        """Differences Weaviate cannot apply to a live class."""
+        reasons = []
+        existing = {p["name"]: p for p in current.get("properties", [])}
+        for prop in desired["properties"]:
+            have = existing.get(prop["name"])
+            if have is None:
+                continue
+            for key, default in (("tokenization", "word"), ("indexFilterable", True), ("indexSearchable", True)):
+                if key in prop and have.get(key, default) != prop[key]:
+                    reasons.append(f"{prop['name']}.{key}: {have.get(key, default)} -> {prop[key]}")
+        have_index = current.get("vectorIndexConfig") or {}
+        for key in ("efConstruction", "maxConnections"):
+            if key in have_index and have_index[key] != desired["vectorIndexConfig"][key]:
+                reasons.append(f"vectorIndexConfig.{key}: {have_index[key]} -> {desired['vectorIndexConfig'][key]}")
+        if current.get("vectorizer") != desired["vectorizer"]:
+            reasons.append(f"vectorizer: {current.get('vectorizer')} -> {desired['vectorizer']}")
+        return reasons
+
+    def plan(self) -> Dict[str, List[str]]:
+        """What `migrate()` would change, per class."""
+        classes = self._classes()
+        changes = {}
+        for class_name in self.classes:
+            desired = class_definition(class_name, self.profile)
+            current = classes.get(class_name)
+            if current is None:
+                changes[class_name] = ["create"]
+                continue
+            steps = []
+            present = {p["name"] for p in current.get("properties", [])}
+            steps += [f"add property {p['name']}" for p in desired["properties"] if p["name"] not in present]
+            if self._index_update(current, desired):
+                steps.append("update vector index (ef, pq)")
+            steps += [f"rebuild ({reason})" for reason in self._needs_rebuild(current, desired)]
+            if steps:
+                changes[class_name] = steps
+        return changes
+
+    @staticmethod
+    def _index_update(current: dict, desired: dict) -> dict:
+        have = current.get("vectorIndexConfig") or {}
+        want = desired["vectorIndexConfig"]
+        update = {}
+        if have.get("ef", want["ef"]) != want["ef"]:
+            update["ef"] = want["ef"]
+        have_pq = have.get("pq") or {}
+        if bool(have_pq.get("enabled", False)) != want["pq"]["enabled"]:
+            update["pq"] = want["pq"]
+        return update
+
+    # Migration -------------------------------------------------------------
+
+    def migrate(self, rebuild: bool = True) -> Dict[str, List[str]]:
+        """
+        Apply the profile and record SCHEMA_VERSION; returns the changes made.
+
+        With `rebuild=False` (engine start-up), changes that need a class copy
+        are only logged, and the class keeps its recorded version.
+        """
+        classes = self._classes()
+        if META_CLASS not in classes:
+            self.client.schema.create_class(META_DEFINITION)
+
+        applied = {}
+        for class_name in self.classes:
+            staging = class_name + STAGING_SUFFIX
+            desired = class_definition(class_name, self.profile)
+            if staging in classes:
+                # A previous rebuild stopped part-way; the staging class holds the full copy
+                logger.warning("Resuming interrupted rebuild of %s from %s", class_name, staging)
+                self._restore(class_name, staging, desired)
+                classes = self._classes()
+            current = classes.get(class_name)
+            if current is None:
+                self.client.schema.create_class(desired)
+                applied[class_name] = ["create"]
+                self._record(class_name)
+                continue
+
+            steps = []
+            present = {p["name"] for p in current.get("properties", [])}
+            for prop in desired["properties"]:
+                if prop["name"] not in present:
+                    self.client.schema.property.create(class_name, prop)
+                    steps.append(f"add property {prop['name']}")
+            update = self._index_update(current, desired)
+            if update:
+                self.client.schema.update_config(class_name, {"vectorIndexConfig": update})
+                steps.append(f"update vector index {sorted(update)}")
+
+            reasons = self._needs_rebuild(current, desired)
+            if reasons and not rebuild:
+                logger.warning("%s needs a rebuild to match the schema (%s); run setup_schema.py",
+                               class_name, "; ".join(reasons))
+            elif reasons:
+                self._rebuild(class_name, desired)
+                steps.append(f"rebuild ({'; '.join(reasons)})")
+            if steps:
+                applied[class_name] = steps
+                logger.info("Migrated %s: %s", class_name, ", ".join(steps))
+            if not reasons or rebuild:
+                self._record(class_name)
+        return applied
+
+    def _record(self, class_name: str):
+        properties = {"class_name": class_name, "version": SCHEMA_VERSION, "profile": self.profile_name}
+        object_id = _meta_id(class_name)
+        if self.client.data_object.exists(object_id, class_name=META_CLASS):
+            self.client.data_object.replace(properties, META_CLASS, object_id)
+        else:
+            self.client.data_object.create(properties, META_CLASS, object_id)
+
+    def _count(self, class_name: str) -> int:
+        response = self.client.query.aggregate(class_name).with_meta_count().do()
+        return response["data"]["Aggregate"][class_name][0]["meta"]["count"]
+
+    def _objects(self, class_name: str) -> Iterator[dict]:
+        """Every object of a class with its vector, paged with the id cursor."""
+        after = None
+        while True:
+            page = self.client.data_object.get(class_name=class_name, with_vector=True, limit=self.page_size,
+                                               after=after)
+            objects = page.get("objects") or []
+            yield from objects
+            if len(objects) < self.page_size:
+                return
+            after = objects[-1]["id"]
+
+    def _copy(self, source: str, target: str) -> int:
+        copied = 0
+        with self.client.batch(batch_size=self.page_size) as batch:
+            for obj in self._objects(source):
+                # The stored vector is reused, so nothing is sent to the vectorizer again
+                batch.add_data_object(obj["properties"], target, uuid=obj["id"], vector=obj.get("vector"))
+                copied += 1
+        return copied
+
+    def _rebuild(self, class_name: str, desired: dict):
+        staging = class_name + STAGING_SUFFIX
+        self.client.schema.create_class(dict(desired, **{"class": staging}))
+        copied = self._copy(class_name, staging)
+        if self._count(staging) != self._count(class_name):
+            self.client.schema.delete_class(staging)
+            raise RuntimeError(f"Copy of {class_name} into {staging} is incomplete; {class_name} left unchanged")
+        logger.info("Copied %d objects of %s to %s", copied, class_name, staging)
+        self.client.schema.delete_class(class_name)
+        self._restore(class_name, staging, desired)
+
+    def _restore(self, class_name: str, staging: str, desired: dict):
+        if not self.client.schema.exists(class_name):
+            self.client.schema.create_class(desired)
+        copied = self._copy(staging, class_name)
+        if self._count(class_name) < self._count(staging):
+            raise RuntimeError(f"Copy of {staging} back into {class_name} is incomplete; {staging} kept")
+        self.client.schema.delete_class(staging)
+        logger.info("Rebuilt %s (%d objects)", class_name, copied)
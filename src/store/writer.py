@@ -0,0 +1,89 @@
+"""Batched writes into the Weaviate tweet store."""
+
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """
+    Buffers objects and writes them to Weaviate in batches.
+
+    A batch goes out once `batch_size` objects are waiting or the oldest has
+    waited `max_delay` seconds, whichever comes first. `start()` runs a
+    background thread that enforces the delay when no new objects arrive.
+    Failed batches are logged and dropped; the stream they came from moves on.
+    """
+
+    def __init__(self, weaviate_client, class_name: str = "Tweets", batch_size: int = 100,
+                 max_delay: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self.client = weaviate_client
+        self.class_name = class_name
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.clock = clock
+        self.written = 0
+        self.failed = 0
+        self._pending: List[dict] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, properties: dict):
+        with self._lock:
+            if not self._pending:
+                self._oldest = self.clock()
+            self._pending.append(properties)
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def _due(self) -> bool:
+        with self._lock:
+            return bool(self._pending) and self.clock() - self._oldest >= self.max_delay
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._oldest = None
+        if not rows:
+            return
+        # One writer at a time keeps batches in arrival order
+        with self._write_lock:
+            try:
+                with self.client.batch(batch_size=len(rows)) as batch:
+                    for properties in rows:
+                        batch.add_data_object(properties, self.class_name)
+                self.written += len(rows)
+            except Exception as e:
+                self.failed += len(rows)
+                logger.warning("Writing a batch of %d %s failed: %s", len(rows), self.class_name, e)
+
+    def _run(self):
+        while not self._stop.wait(min(self.max_delay, 1.0)):
+            if self._due():
+                self.flush()
+
+    def start(self) -> "BatchWriter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="batch-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
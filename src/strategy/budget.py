@@ -0,0 +1,142 @@
+import logging
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+FULL = "full"
+SHORT = "short"
+CHEAP = "cheap"
+
+
+class TokenCounter:
+    """Counts tokens with the model's own tokenizer."""
+
+    def __init__(self, model_name: str = "text-davinci-003"):
+        self.model_name = model_name
+        try:
+            self.encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # tiktoken fetches encodings on first use; without network fall back to ~4 chars/token
+            logger.warning("Tokenizer for %s unavailable (%s); estimating tokens from length", model_name, e)
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is None:
+            return math.ceil(len(text.encode("utf-8")) / 4)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+class HourlyBudget:
+    """A token allowance that resets at the top of every clock hour."""
+
+    def __init__(self, tokens_per_hour: Optional[int], clock: Callable[[], float] = time.time):
+        self.limit = tokens_per_hour
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._hour = None
+        self._spent = 0
+
+    def _roll(self):
+        hour = int(self.clock() // 3600)
+        if hour != self._hour:
+            self._hour = hour
+            self._spent = 0
+
+    def remaining(self) -> float:
+        if self.limit is None:
+            return math.inf
+        with self._lock:
+            self._roll()
+            return max(0, self.limit - self._spent)
+
+    def fraction_left(self) -> float:
+        if self.limit is None:
+            return 1.0
+        return self.remaining() / self.limit if self.limit else 0.0
+
+    def charge(self, tokens: int):
+        with self._lock:
+            self._roll()
+            self._spent += tokens
+
+    def spent(self) -> int:
+        with self._lock:
+            self._roll()
+            return self._spent
+
+
+class TokenGovernor:
+    """
+    Enforces an agent's hourly token budget together with the fleet-wide one.
+
+    The governor picks a generation mode from whichever budget is tighter:
+    full prompts, the short prompts once `short_below` of the budget is left,
+    and no generation at all (likes/retweets only) once a worst-case
+    completion no longer fits.
+    """
+
+    def __init__(self, agent_budget: HourlyBudget, global_budget: HourlyBudget = None,
+                 counter: TokenCounter = None, short_below: float = 0.25, max_completion_tokens: int = 256):
+        self.agent_budget = agent_budget
+        self.global_budget = global_budget or HourlyBudget(None)
+        self.counter = counter or TokenCounter()
+        self.short_below = short_below
+        self.max_completion_tokens = max_completion_tokens
+
+    @classmethod
+    def from_params(cls, params: dict, global_budget: HourlyBudget, agent_tokens_per_hour: Optional[int] = None,
+                    model_name: str = "text-davinci-003", max_completion_tokens: int = 256,
+                    clock: Callable[[], float] = time.time, counter: TokenCounter = None):
+        config = params.get("llm_budget") or {}
+        if agent_tokens_per_hour is None:
+            agent_tokens_per_hour = config.get("agent_tokens_per_hour")
+        return cls(
+            HourlyBudget(agent_tokens_per_hour, clock),
+            global_budget,
+            counter or TokenCounter(model_name),
+            short_below=config.get("short_prompt_below", 0.25),
+            max_completion_tokens=max_completion_tokens,
+        )
+
+    def remaining(self) -> float:
+        return min(self.agent_budget.remaining(), self.global_budget.remaining())
+
+    def mode(self, prompt_tokens: int = 0) -> str:
+        if self.remaining() < prompt_tokens + self.max_completion_tokens:
+            return CHEAP
+        if min(self.agent_budget.fraction_left(), self.global_budget.fraction_left()) < self.short_below:
+            return SHORT
+        return FULL
+
+    def allows(self, prompt_tokens: int, completion_tokens: int = None) -> bool:
+        if completion_tokens is None:
+            completion_tokens = self.max_completion_tokens
+        return self.remaining() >= prompt_tokens + completion_tokens
+
+    def count(self, text: str) -> int:
+        return self.counter.count(text)
+
+    def charge(self, tokens: int):
+        self.agent_budget.charge(tokens)
+        self.global_budget.charge(tokens)
+
+    def snapshot(self) -> dict:
+        """JSON-safe state; an unlimited budget's remaining tokens are None rather than inf."""
+        def finite(value):
+            return None if math.isinf(value) else value
+
+        return {
+            "agent_spent": self.agent_budget.spent(),
+            "agent_remaining": finite(self.agent_budget.remaining()),
+            "global_remaining": finite(self.global_budget.remaining()),
+            "mode": self.mode(),
+        }
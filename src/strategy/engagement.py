@@ -0,0 +1,165 @@
+"""Local engagement model: predicts how many likes a stored tweet draws.
+
+Text is tokenised like the topic detector (words, hashtags, bigrams) and
+hashed into `dim` binary features, scaled so every tweet's text vector has
+unit length; a handful of standardised numeric features (author followers,
+length, hashtags, mentions, links, questions, retweets) sit alongside. A
+ridge regression on log1p(like_count) is fitted with full-batch Adam, where
+each epoch is two `np.bincount`s over the nonzero features. No LLM call and
+no GPU is needed either to train or to score.
+
+The fitted weights are saved as one compressed `.npz` of float32 arrays.
+Scoring a cycle's `TweetBatch` is one hashing pass over its texts plus a
+gather and a dot product, so the strategy can rank every candidate before it
+spends LLM calls on any of them.
+"""
+
+import logging
+import os
+import re
+import zlib
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from collector.batch import TweetBatch
+from collector.topics import tokenize
+
+logger = logging.getLogger(__name__)
+
+ENGAGEMENT_MODEL_PATH = "./data/engagement.npz"
+NUMERIC_FEATURES = ("log_followers", "length", "hashtags", "mentions", "links", "question", "retweet")
+FORMAT_VERSION = 1
+
+_HASHTAG = re.compile(r"#\w")
+_MENTION = re.compile(r"@\w")
+_LINK = re.compile(r"https?://")
+
+
+class EngagementModel:
+    """
+    Args:
+        dim: hashed text features; collisions are rare below a few tens of thousands of distinct terms
+        l2: ridge penalty on every weight except the bias
+        epochs: full passes over the training rows
+        learning_rate: Adam step size
+    """
+
+    def __init__(self, dim: int = 1 << 16, l2: float = 1e-4, epochs: int = 200, learning_rate: float = 0.05):
+        self.dim = dim
+        self.l2 = l2
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.weights = np.zeros(dim, np.float32)
+        self.numeric_weights = np.zeros(len(NUMERIC_FEATURES), np.float32)
+        self.bias = 0.0
+        self.mean = np.zeros(len(NUMERIC_FEATURES), np.float32)
+        self.scale = np.ones(len(NUMERIC_FEATURES), np.float32)
+        self.trained = False
+
+    @classmethod
+    def from_params(cls, params: dict):
+        config = params.get("engagement_model") or {}
+        return cls(dim=config.get("dim", 1 << 16), l2=config.get("l2", 1e-4), epochs=config.get("epochs", 200),
+                   learning_rate=config.get("learning_rate", 0.05))
+
+    # Features --------------------------------------------------------------
+
+    def _hashed(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """COO (row, column, value) of the hashed text features."""
+        columns, counts = [], []
+        for text in texts:
+            hashed = {zlib.crc32(term.encode()) % self.dim for term in tokenize(text)}
+            columns.extend(hashed)
+            counts.append(len(hashed))
+        counts = np.asarray(counts, np.int64)
+        rows = np.repeat(np.arange(len(texts)), counts)
+        values = np.repeat(1 / np.sqrt(np.maximum(counts, 1)), counts)
+        return rows, np.fromiter(columns, np.int64, len(columns)), values
+
+    @staticmethod
+    def _numeric(texts: Sequence[str], follower_counts: np.ndarray) -> np.ndarray:
+        features = np.empty((len(texts), len(NUMERIC_FEATURES)), np.float64)
+        features[:, 0] = np.log1p(np.maximum(np.asarray(follower_counts, np.float64), 0))
+        for i, text in enumerate(texts):
+            features[i, 1:] = (len(text) / 280, len(_HASHTAG.findall(text)), len(_MENTION.findall(text)),
+                               len(_LINK.findall(text)), "?" in text, text.startswith("RT @"))
+        return features
+
+    # Scoring ---------------------------------------------------------------
+
+    def predict(self, texts: Sequence[str], follower_counts: np.ndarray) -> np.ndarray:
+        """Predicted log1p(like_count) for each text."""
+        rows, columns, values = self._hashed(texts)
+        numeric = (self._numeric(texts, follower_counts) - self.mean) / self.scale
+        text_part = np.bincount(rows, weights=self.weights[columns] * values, minlength=len(texts))
+        return self.bias + text_part + numeric @ self.numeric_weights
+
+    def score(self, batch: TweetBatch) -> np.ndarray:
+        return self.predict(batch.texts, batch.follower_counts)
+
+    # Training --------------------------------------------------------------
+
+    def fit(self, texts: Sequence[str], follower_counts: np.ndarray, like_counts: np.ndarray) -> float:
+        """Fit on the given rows, replacing any earlier fit; returns the training RMSE (in log1p likes)."""
+        n = len(texts)
+        if n == 0:
+            raise ValueError("No rows to train the engagement model on")
+        y = np.log1p(np.maximum(np.asarray(like_counts, np.float64), 0))
+        rows, columns, values = self._hashed(texts)
+        numeric = self._numeric(texts, follower_counts)
+        mean, scale = numeric.mean(axis=0), numeric.std(axis=0)
+        # Constant columns (e.g. every follower_count unknown) stay unscaled; their std is only rounding error
+        scale[scale < 1e-6] = 1
+        numeric = (numeric - mean) / scale
+
+        # One parameter vector: hashed weights, numeric weights, bias; Adam moments alongside
+        params = np.zeros(self.dim + len(NUMERIC_FEATURES) + 1)
+        params[-1] = y.mean()
+        m, v = np.zeros_like(params), np.zeros_like(params)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        penalty = np.full_like(params, self.l2)
+        penalty[-1] = 0
+        for step in range(1, self.epochs + 1):
+            w, wn, b = params[:self.dim], params[self.dim:-1], params[-1]
+            residual = (b + np.bincount(rows, weights=w[columns] * values, minlength=n) + numeric @ wn - y) / n
+            grad = penalty * params
+            grad[:self.dim] += np.bincount(columns, weights=values * residual[rows], minlength=self.dim)
+            grad[self.dim:-1] += numeric.T @ residual
+            grad[-1] += residual.sum()
+            m = beta1 * m + (1 - beta1) * grad
+            v = beta2 * v + (1 - beta2) * grad * grad
+            params -= self.learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+        self.weights = params[:self.dim].astype(np.float32)
+        self.numeric_weights = params[self.dim:-1].astype(np.float32)
+        self.bias = float(params[-1])
+        self.mean, self.scale = mean.astype(np.float32), scale.astype(np.float32)
+        self.trained = True
+        return float(np.sqrt(np.mean((self.predict(texts, follower_counts) - y) ** 2)))
+
+    def fit_batch(self, batch: TweetBatch) -> float:
+        return self.fit(batch.texts, batch.follower_counts, batch.like_counts)
+
+    # Persistence -----------------------------------------------------------
+
+    def save(self, path: str = ENGAGEMENT_MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path, version=FORMAT_VERSION, dim=self.dim, weights=self.weights, numeric_weights=self.numeric_weights,
+            bias=self.bias, mean=self.mean, scale=self.scale, features=np.array(NUMERIC_FEATURES),
+        )
+
+    @classmethod
+    def load(cls, path: str = ENGAGEMENT_MODEL_PATH) -> "EngagementModel":
+        with np.load(path) as data:
+            if int(data["version"]) != FORMAT_VERSION or tuple(data["features"]) != NUMERIC_FEATURES:
+                raise ValueError(f"{path} was saved by an incompatible version; retrain with --train")
+            model = cls(dim=int(data["dim"]))
+            model.weights = data["weights"]
+            model.numeric_weights = data["numeric_weights"]
+            model.bias = float(data["bias"])
+            model.mean = data["mean"]
+            model.scale = data["scale"]
+        model.trained = True
+        return model
@@ -1,22 +1,25 @@
 import os
 import re
+import logging
 import yaml
 import tweepy
 import random
 import pytz
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-import urllib.request
-import json
-import requests
 from langchain.prompts import PromptTemplate
 from langchain.llms import OpenAI
 from langchain.chains import LLMChain
 
+from utils.transport import get_transport
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 giphy_api_key = os.getenv("GIPHY_API", "")
+GIPHY_SEARCH_URL = "https://api.giphy.com/v1/gifs/search"
 
 llm = OpenAI(temperature=0.9)
 gif_prompt = PromptTemplate(
@@ -47,7 +50,7 @@ def generate_response(tweet):
     response = reply_chain.run(
         tweet.text
     )  # Replace this with your actual LLM-generated response
-    print(f"Responding to {tweet.user.screen_name}: {tweet.text}")
+    logger.info("Responding to %s: %s", tweet.user.screen_name, tweet.text)
     return response
 
 
@@ -67,11 +70,18 @@ def modifier(s):
     return " #".join(ls)
 
 
+def _http():
+    """Pooled session for Giphy search and GIF downloads."""
+    return get_transport().session("giphy")
+
+
 def gif_download(gif_url):
     """
     Takes the URL of an Image/GIF and downloads it
     """
-    gif_data = requests.get(gif_url).content
+    response = _http().get(gif_url, timeout=30)
+    response.raise_for_status()
+    gif_data = response.content
     with open("image.gif", "wb") as handler:
         handler.write(gif_data)
         handler.close()
@@ -92,7 +102,7 @@ def gif_post(gif_url_list, msg, twitter_client):
         result = v1_api.media_upload("image.gif")
         return result
     except Exception as e:
-        print("Error occurred: ", e)
+        logger.warning("GIF upload failed: %s", e)
 
 
 def search_gif(query, twitter_client):
@@ -100,21 +110,13 @@ def search_gif(query, twitter_client):
     Searches for GIFs based on a query
     """
     words = re.findall(r"\w+", query, re.MULTILINE)
-    formatted_query = "+".join(words)
-    print("Searching for GIFs based on query: ", formatted_query)
-    giphy_url = (
-        "https://api.giphy.com/v1/gifs/search?api_key="
-        + giphy_api_key
-        + "&q="
-        + formatted_query
-        + "&limit=20&offset=0&rating=r&lang=en"
-    )
-
-    with urllib.request.urlopen(giphy_url) as response:
-        html = response.read()
+    formatted_query = " ".join(words)
+    logger.debug("Searching for GIFs based on query: %s", formatted_query)
+    params = {"api_key": giphy_api_key, "q": formatted_query, "limit": 20, "offset": 0, "rating": "r", "lang": "en"}
 
-    h = html.decode("utf-8")
-    gif_info = json.loads(h)
+    response = _http().get(GIPHY_SEARCH_URL, params=params, timeout=10)
+    response.raise_for_status()
+    gif_info = response.json()
     gif_data = gif_info["data"]
     gif_urls = []
     slugs = []
@@ -0,0 +1,35 @@
+import re
+from typing import List, Optional
+
+_ITEM_START = re.compile(r"^\s*(?:\*\*)?\[?(\d{1,3})\]?(?:\*\*)?\s*[\.\):\-]\s*(.*)$")
+
+
+def format_items(texts: List[str]) -> str:
+    """Number the tweets one per line, flattening their whitespace so numbering stays unambiguous."""
+    return "\n".join(f"{i}. {' '.join(text.split())}" for i, text in enumerate(texts, 1))
+
+
+def parse_numbered(completion: str, count: int) -> List[Optional[str]]:
+    """
+    Split a `1. ...` / `2) ...` style completion back into `count` items.
+
+    Lines that do not start a new number are treated as a continuation of the
+    current item. Numbers outside 1..count, repeats and empty items come back
+    as None so the caller can regenerate just those.
+    """
+    items: List[Optional[str]] = [None] * count
+    seen = set()
+    current = None
+    for line in completion.splitlines():
+        match = _ITEM_START.match(line)
+        if match:
+            number = int(match.group(1))
+            if 1 <= number <= count and number not in seen:
+                seen.add(number)
+                current = number - 1
+                items[current] = match.group(2).strip()
+            else:
+                current = None
+        elif current is not None and line.strip():
+            items[current] = f"{items[current]} {line.strip()}".strip()
+    return [item or None for item in items]
@@ -0,0 +1,83 @@
+import zlib
+from typing import Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+ACTIONS = (
+    "like_timeline_tweets",
+    "retweet_timeline_tweets",
+    "reply_to_timeline",
+    "gif_reply_to_timeline",
+    "quote_tweet",
+    "post_tweet",
+    "none",
+)
+NONE_INDEX = ACTIONS.index("none")
+
+DEFAULT_PROBABILITIES = {
+    "like_timeline_tweets": 0.02,
+    "retweet_timeline_tweets": 0.01,
+    "reply_to_timeline": 0.02,
+    "gif_reply_to_timeline": 0.02,
+    "quote_tweet": 0.01,
+    "post_tweet": 0.02,
+    "none": 0.90,
+}
+
+
+class ActionSampler:
+    """Draws one action per tweet for a whole cycle in a single NumPy call."""
+
+    def __init__(self, probabilities: Mapping[str, float] = DEFAULT_PROBABILITIES, seed=None):
+        self.probabilities = self._normalise(probabilities)
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_params(cls, params: dict, strategy: Union[str, Mapping, None] = None, agent_id=None):
+        """
+        Build a sampler for an agent.
+
+        `strategy` is the `strategy` field from tokens.yml: either the name of a
+        profile under `strategies` in params.yaml, or a mapping of per-action
+        probabilities that overrides the `basic` profile.
+        """
+        profiles = params.get("strategies") or {}
+        probabilities = dict(DEFAULT_PROBABILITIES)
+        probabilities.update(profiles.get("basic") or {})
+        if isinstance(strategy, Mapping):
+            probabilities.update(strategy)
+        elif strategy is not None:
+            if strategy not in profiles:
+                raise ValueError(f"Unknown strategy profile: {strategy}")
+            probabilities.update(profiles[strategy])
+
+        return cls(probabilities, seed=cls._agent_seed(params.get("sampler_seed"), agent_id))
+
+    @staticmethod
+    def _agent_seed(seed: Optional[int], agent_id) -> Optional[np.random.SeedSequence]:
+        # Derive an independent, reproducible stream per agent from the global seed
+        if seed is None:
+            return None
+        if agent_id is None:
+            return np.random.SeedSequence(seed)
+        return np.random.SeedSequence([seed, zlib.crc32(str(agent_id).encode())])
+
+    @staticmethod
+    def _normalise(probabilities: Mapping[str, float]) -> np.ndarray:
+        unknown = set(probabilities) - set(ACTIONS)
+        if unknown:
+            raise ValueError(f"Unknown actions in probabilities: {sorted(unknown)}")
+        weights = np.array([float(probabilities.get(a, 0.0)) for a in ACTIONS])
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("Action probabilities must be non-negative and not all zero")
+        return weights / weights.sum()
+
+    def sample(self, n: int) -> np.ndarray:
+        """Return an action index (into ACTIONS) for each of `n` tweets."""
+        return self.rng.choice(len(ACTIONS), size=n, p=self.probabilities)
+
+    def sample_actions(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (positions, action indices) for the tweets that drew a real action."""
+        draws = self.sample(n)
+        positions = np.flatnonzero(draws != NONE_INDEX)
+        return positions, draws[positions]
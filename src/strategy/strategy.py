@@ -1,16 +1,56 @@
-import random
 import re
-from langchain.docstore.document import Document
+import logging
+import numpy as np
+from langchain.callbacks import get_openai_callback
 from langchain.chains import LLMChain
-from typing import List
+from typing import List, Optional, Sequence
+from collector.batch import Tweet, TweetAction, TweetBatch
+from collector.mentions import Mention
+from utils.metrics import record_llm_tokens, stage_timer
 from .media.gif_reply import generate_gif_response
-from .prompt import reply_prompt, tweet_prompt
+from .budget import CHEAP, SHORT, TokenCounter, TokenGovernor
+from .engagement import EngagementModel
+from .packing import format_items, parse_numbered
+from .prompt import packed_reply_prompt, reply_prompt, short_reply_prompt, short_tweet_prompt, tweet_prompt
+from .sampler import ACTIONS, ActionSampler
+from .text_length import MAX_WEIGHTED_LENGTH, weighted_length
+
+logger = logging.getLogger(__name__)
+
+# Cheaper stand-ins for generative actions once the token budget cannot cover another completion
+BUDGET_FALLBACKS = {
+    "reply_to_timeline": "like_timeline_tweets",
+    "gif_reply_to_timeline": "like_timeline_tweets",
+    "quote_tweet": "retweet_timeline_tweets",
+    "post_tweet": None,
+}
+
+# Actions whose text is a reply to the tweet, and so can be generated in packs
+REPLY_ACTIONS = {"reply_to_timeline", "gif_reply_to_timeline", "quote_tweet"}
+# Actions that spend an LLM completion on the tweet they are drawn for
+GENERATIVE_INDICES = np.array([ACTIONS.index(a) for a in REPLY_ACTIONS | {"post_tweet"}])
+# Default `response` of the reply actions: generate one. An explicit None means generation already failed
+_GENERATE = object()
 
 class TwitterStrategy:
-    def __init__(self, llm, twitter_client, vectorstore):
+    def __init__(self, llm, twitter_client, vectorstore, sampler: ActionSampler = None,
+                 budget: TokenGovernor = None, max_attempts: int = 3, pack_size: int = 1,
+                 max_length: int = MAX_WEIGHTED_LENGTH, max_mention_replies: int = 10,
+                 ranker: EngagementModel = None):
         self.llm = llm
         self.vectorstore = vectorstore
         self.twitter_client = twitter_client
+        self.agent_id = twitter_client["agent_id"]
+        self.sampler = sampler or ActionSampler()
+        self.budget = budget
+        self.token_counter = budget.counter if budget else TokenCounter(getattr(llm, "model_name", "text-davinci-003"))
+        self.max_attempts = max_attempts
+        self.pack_size = pack_size
+        self.max_length = max_length
+        self.max_mention_replies = max_mention_replies
+        # With a trained engagement model, LLM-backed actions go to the tweets it rates highest
+        self.ranker = ranker
+        self._packed_llms = {}
         self.action_mapping = {
             "like_timeline_tweets": self.like_tweet,
             "retweet_timeline_tweets": self.retweet_tweet,
@@ -18,133 +58,248 @@ class TwitterStrategy:
             "gif_reply_to_timeline": self.gif_reply_to_timeline,
             "quote_tweet": self.quote_tweet,
             "post_tweet": self.post_tweet,
-            "none": self.none_action,
         }
-        self.probabilities = [
-            0.02,  # like_timeline_tweets
-            0.01,  # retweet_timeline_tweets
-            0.02,  # reply_to_timeline
-            0.02,  # gif_reply_to_timeline
-            0.01,  # quote_tweet
-            0.02,  # post_tweet
-            0.90,  # none
-        ]
-
-    def run(self, twitterstate):
-        print("Running strategy...")
-        print("Twitter state: ", twitterstate)
-        results = self.process_and_action_tweets(twitterstate)
+
+    def run(self, twitterstate, mentions: Sequence[Mention] = ()):
+        logger.debug("Twitter state: %d tweets, %d mentions", len(twitterstate), len(mentions),
+                     extra={"agent": self.agent_id})
+        results = self.process_and_action_tweets(twitterstate, mentions)
         return results
 
-    def weighted_random_choice(self, actions, probabilities):
-        return random.choices(actions, probabilities)[0]
-
-    def process_and_action_tweets(self, tweets: List[Document]):
-        actions = [
-            "like_timeline_tweets",
-            "retweet_timeline_tweets",
-            "reply_to_timeline",
-            "gif_reply_to_timeline",
-            "quote_tweet",
-            "post_tweet",
-            "none",
-        ]
-
-        results: List[Document] = []
-        for tweet in tweets:
-            action = self.weighted_random_choice(actions, self.probabilities)
-            method = self.action_mapping.get(action)
-            if method:
-                doc = method(tweet)
-                results.append(doc)
+    def _afford(self, action: str) -> Optional[str]:
+        if self.budget is not None and action in BUDGET_FALLBACKS and self.budget.mode() == CHEAP:
+            return BUDGET_FALLBACKS[action]
+        return action
+
+    def process_and_action_tweets(self, tweets: TweetBatch, mentions: Sequence[Mention] = ()) -> List[TweetAction]:
+        # Mentions are answered before anything is sampled from the timeline, replies to the agent first
+        planned = []
+        for mention in mentions[:self.max_mention_replies]:
+            action = self._afford("reply_to_timeline")
+            planned.append((action, mention, mention.prompt_text))
+
+        # Draw the whole cycle's actions at once; "none" draws are never materialised
+        positions, action_indices = self.sampler.sample_actions(len(tweets))
+        positions = self._rank(tweets, positions, action_indices)
+        for position, action_index in zip(positions.tolist(), action_indices.tolist()):
+            action = self._afford(ACTIONS[action_index])
+            if action is None:
+                continue
+            tweet = tweets[position]
+            planned.append((action, tweet, tweet.text))
+
+        # Write all of the cycle's replies and quotes up front, several per completion
+        reply_slots = [i for i, (action, _, _) in enumerate(planned) if action in REPLY_ACTIONS]
+        replies = self.generate_responses([planned[i][2] for i in reply_slots])
+        responses = dict(zip(reply_slots, replies))
+
+        results: List[TweetAction] = []
+        for i, (action, tweet, _) in enumerate(planned):
+            method = self.action_mapping[action]
+            if action in REPLY_ACTIONS:
+                result = method(tweet, response=responses[i])
+            else:
+                result = method(tweet)
+            if result is not None:
+                results.append(result)
 
         return results
 
-    def post_tweet(self, tweet: Document):
-        response = self.generate_tweet(tweet.page_content)
-        metadata = {"action": "post_tweet"}
-        return Document(page_content=response, metadata=metadata)
+    def _rank(self, tweets: TweetBatch, positions: np.ndarray, action_indices: np.ndarray) -> np.ndarray:
+        """
+        Move the sampled generative actions onto the best-scored tweets. Other draws keep their
+        tweets unless a generative action took it; those move to the tweets the generative draws
+        left, so every tweet still gets at most one action.
+        """
+        generative = np.isin(action_indices, GENERATIVE_INDICES)
+        if self.ranker is None or not generative.any():
+            return positions
+        with stage_timer("ranker", self.agent_id):
+            scores = self.ranker.score(tweets)
+        top = np.argsort(-scores, kind="stable")[:int(generative.sum())]
+        others = positions[~generative].copy()
+        displaced = np.isin(others, top)
+        spare = positions[generative][~np.isin(positions[generative], top)]
+        others[displaced] = spare[:int(displaced.sum())]
+        ranked = positions.copy()
+        ranked[generative] = top
+        ranked[~generative] = others
+        return ranked
 
-    def generate_tweet(self, input_text):
-        print("Generating tweet...")
-        prompt = tweet_prompt
-        tweet_chain = LLMChain(llm=self.llm, prompt=prompt)
-        response = tweet_chain.run(input_text)
+    def post_tweet(self, tweet: Tweet) -> Optional[TweetAction]:
+        response = self.generate_tweet(tweet.text)
+        if response is None:
+            return None
+        return TweetAction("post_tweet", text=response)
 
-        # Remove newlines and periods from the beginning and end of the tweet
-        response = re.sub(r"^[\n\.\"]*", "", response)
-        response = re.sub(r"[\n\.\"]*$", "", response)
+    def _run_chain(self, prompt, llm=None, **inputs) -> str:
+        chain = LLMChain(llm=llm or self.llm, prompt=prompt)
+        with stage_timer("llm", self.agent_id):
+            response = chain.run(**inputs)
+        self._charge(self.token_counter.count(prompt.format(**inputs)), self.token_counter.count(response))
+        return response
+
+    def _stream(self, prompt, **inputs):
+        """
+        Stream a completion and stop reading as soon as it runs over the length limit.
+
+        Returns the text received and whether the stream was cut short.
+        """
+        prompt_text = prompt.format(**inputs)
+        text = ""
+        overflowed = False
+        with stage_timer("llm", self.agent_id):
+            stream = self.llm.stream(prompt_text)
+            try:
+                for chunk in stream:
+                    choice = chunk["choices"][0]
+                    text += choice.get("text") or choice.get("delta", {}).get("content") or ""
+                    if weighted_length(self._clean(text)) > self.max_length:
+                        overflowed = True
+                        break
+            finally:
+                # Closing the generator drops the HTTP response, so no more tokens are produced for it
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+        self._charge(self.token_counter.count(prompt_text), self.token_counter.count(text))
+        return text, overflowed
+
+    def _complete(self, prompt, **inputs) -> str:
+        """A single completion; None when it was abandoned for running over the length limit."""
+        if not callable(getattr(self.llm, "stream", None)):
+            return self._run_chain(prompt, **inputs)
+        text, overflowed = self._stream(prompt, **inputs)
+        if overflowed:
+            logger.debug("Completion over %d weighted characters, abandoned mid-stream", self.max_length,
+                         extra={"agent": self.agent_id})
+            return None
+        return text
+
+    def _charge(self, prompt_tokens: int, completion_tokens: int):
+        record_llm_tokens(self.agent_id, prompt_tokens, completion_tokens)
+        if self.budget is not None:
+            self.budget.charge(prompt_tokens + completion_tokens)
+
+    def _pick_prompt(self, prompt, short_prompt):
+        if self.budget is not None and self.budget.mode() == SHORT:
+            return short_prompt
+        return prompt
+
+    def _generate(self, prompt, input_text):
+        """Generate text within the length limit; None if out of budget or attempts."""
+        for _ in range(self.max_attempts):
+            if self.budget is not None:
+                prompt_tokens = self.token_counter.count(prompt.format(input_text=input_text))
+                if not self.budget.allows(prompt_tokens):
+                    logger.info("Token budget exhausted, skipping generation", extra={"agent": self.agent_id})
+                    return None
 
-        _len_check = self._check_length(response)
+            response = self._complete(prompt, input_text=input_text)
+            if response is None:
+                continue
 
-        if _len_check is False:
-            self.generate_tweet(input_text)
+            response = self._clean(response)
+            if self._check_length(response):
+                return response
 
-        print(f"Generated tweet: {response}")
+        logger.warning("No generation within the length limit after %d attempts", self.max_attempts,
+                       extra={"agent": self.agent_id})
+        return None
+
+    def generate_tweet(self, input_text):
+        logger.debug("Generating tweet...", extra={"agent": self.agent_id})
+        response = self._generate(self._pick_prompt(tweet_prompt, short_tweet_prompt), input_text)
+        if response is not None:
+            logger.info("Generated tweet: %s", response, extra={"agent": self.agent_id})
         return response
 
-    def reply_to_timeline(self, tweet: Document):
-        response = self.generate_response(tweet.page_content)
-        metadata = {
-            "tweet_id": tweet.metadata["tweet_id"],
-            "action": "reply_to_timeline",
-        }
-        return Document(page_content=response, metadata=metadata)
-
-    def gif_reply_to_timeline(self, tweet: Document):
-        response = self.generate_response(tweet.page_content)
-        print(response)
-        gif_id = generate_gif_response(tweet.page_content, self.twitter_client)
-        metadata = {
-            "tweet_id": tweet.metadata["tweet_id"],
-            "media_id": gif_id,
-            "action": "gif_reply_to_timeline",
-        }
-        return Document(page_content=response, metadata=metadata)
+    def reply_to_timeline(self, tweet: Tweet, response: Optional[str] = _GENERATE) -> Optional[TweetAction]:
+        if response is _GENERATE:
+            response = self.generate_response(tweet.text)
+        if response is None:
+            return None
+        return TweetAction("reply_to_timeline", tweet.tweet_id, response)
 
-    def like_tweet(self, tweet: Document):
-        # As like action doesn't generate a response, metadata will be sufficient
-        metadata = {
-            "tweet_id": tweet.metadata["tweet_id"],
-            "action": "like_timeline_tweets",
-        }
-        return Document(page_content=tweet.page_content, metadata=metadata)
+    def gif_reply_to_timeline(self, tweet: Tweet, response: Optional[str] = _GENERATE) -> Optional[TweetAction]:
+        if response is _GENERATE:
+            response = self.generate_response(tweet.text)
+        if response is None:
+            return None
+        with get_openai_callback() as usage:
+            gif_id = generate_gif_response(tweet.text, self.twitter_client)
+        self._charge(usage.prompt_tokens, usage.completion_tokens)
+        return TweetAction("gif_reply_to_timeline", tweet.tweet_id, response, media_id=gif_id)
 
-    def retweet_tweet(self, tweet: Document):
-        # Similarly for retweet action
-        metadata = {
-            "tweet_id": tweet.metadata["tweet_id"],
-            "action": "retweet_timeline_tweets",
-        }
-        return Document(page_content=tweet.page_content, metadata=metadata)
+    def like_tweet(self, tweet: Tweet) -> TweetAction:
+        # As like action doesn't generate a response, the tweet id will be sufficient
+        return TweetAction("like_timeline_tweets", tweet.tweet_id, tweet.text)
 
-    def quote_tweet(self, tweet: Document):
-        response = self.generate_response(tweet.page_content)
-        metadata = {"tweet_id": tweet.metadata["tweet_id"], "action": "quote_tweet"}
-        return Document(page_content=response, metadata=metadata)
+    def retweet_tweet(self, tweet: Tweet) -> TweetAction:
+        # Similarly for retweet action
+        return TweetAction("retweet_timeline_tweets", tweet.tweet_id, tweet.text)
 
-    def none_action(self, tweet: Document):
-        # No action, just return metadata with action as "none"
-        metadata = {"tweet_id": tweet.metadata["tweet_id"], "action": "none"}
-        return Document(page_content=tweet.page_content, metadata=metadata)
+    def quote_tweet(self, tweet: Tweet, response: Optional[str] = _GENERATE) -> Optional[TweetAction]:
+        if response is _GENERATE:
+            response = self.generate_response(tweet.text)
+        if response is None:
+            return None
+        return TweetAction("quote_tweet", tweet.tweet_id, response)
 
     def generate_response(self, input_text):
-        prompt = reply_prompt
-        tweet_chain = LLMChain(llm=self.llm, prompt=prompt)
-        response = tweet_chain.run(input_text=input_text)
+        response = self._generate(self._pick_prompt(reply_prompt, short_reply_prompt), input_text)
+        if response is not None:
+            logger.info("Generated response: %s", response, extra={"agent": self.agent_id})
+        return response
 
-        # Remove newlines and periods from the beginning and end of the tweet
-        response = re.sub(r"^[\n\.\"]*", "", response)
-        response = re.sub(r"[\n\.\"]*$", "", response)
+    def generate_responses(self, input_texts: List[str]) -> List[str]:
+        """Reply to several tweets, `pack_size` per completion; unparsed items are regenerated one by one."""
+        results = []
+        for start in range(0, len(input_texts), max(1, self.pack_size)):
+            chunk = input_texts[start:start + max(1, self.pack_size)]
+            packed = self._generate_packed(chunk) if len(chunk) > 1 else [None]
+            for input_text, response in zip(chunk, packed):
+                if response is None:
+                    response = self.generate_response(input_text)
+                results.append(response)
+        return results
+
+    def _packed_llm(self, count: int):
+        # Give a packed request room for `count` replies, where the LLM supports a per-request cap
+        max_tokens = getattr(self.llm, "max_tokens", None)
+        if not max_tokens or max_tokens < 0:
+            return self.llm
+        if count not in self._packed_llms:
+            self._packed_llms[count] = self.llm.copy(update={"max_tokens": max_tokens * count})
+        return self._packed_llms[count]
 
-        _len_check = self._check_length(response)
+    def _generate_packed(self, input_texts: List[str]) -> List[str]:
+        inputs = {"count": len(input_texts), "items": format_items(input_texts)}
+        if self.budget is not None:
+            prompt_tokens = self.token_counter.count(packed_reply_prompt.format(**inputs))
+            if not self.budget.allows(prompt_tokens, self.budget.max_completion_tokens * len(input_texts)):
+                return [None] * len(input_texts)
 
-        if _len_check is False:
-            self.generate_response(input_text)
+        completion = self._run_chain(packed_reply_prompt, llm=self._packed_llm(len(input_texts)), **inputs)
+        responses = []
+        for response in parse_numbered(completion, len(input_texts)):
+            if response is not None:
+                response = self._clean(response)
+                if not response or not self._check_length(response):
+                    response = None
+            responses.append(response)
 
-        print(f"Generated Response: {response}")
+        parsed = sum(r is not None for r in responses)
+        logger.info("Packed generation: %d/%d replies parsed", parsed, len(input_texts),
+                    extra={"agent": self.agent_id})
+        return responses
+
+    @staticmethod
+    def _clean(response: str) -> str:
+        # Remove newlines and periods from the beginning and end of the tweet
+        response = re.sub(r"^[\n\.\"]*", "", response)
+        response = re.sub(r"[\n\.\"]*$", "", response)
         return response
 
     def _check_length(self, text):
-        if len(text) > 140:
-            return False
+        return weighted_length(text) <= self.max_length
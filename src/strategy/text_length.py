@@ -0,0 +1,72 @@
+"""Tweet length as Twitter counts it (twitter-text v3 weighting).
+
+Most Latin, Cyrillic and punctuation code points weigh 1, everything else
+(CJK, most other scripts) weighs 2, every emoji sequence weighs 2 however many
+code points it has, and every URL weighs 23 regardless of its length. The
+limit is 280 weighted characters.
+"""
+
+import re
+import unicodedata
+
+MAX_WEIGHTED_LENGTH = 280
+URL_LENGTH = 23
+
+# (start, end) code point ranges that weigh 1; everything else weighs 2
+_LIGHT_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))
+
+_URL = re.compile(
+    r"https?://[^\s]+"
+    r"|(?<![\w@./])(?:www\.)?(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+"
+    r"(?:com|net|org|io|co|ai|xyz|app|dev|me|ly|gg|so|to|tv|fm|info|news|finance)(?:/[^\s]*)?(?![\w])",
+    re.IGNORECASE,
+)
+
+# An emoji (optionally with skin tone / variation selector), joined to further emoji by ZWJ,
+# or a pair of regional indicators (a flag), or a keycap sequence
+_EMOJI_BASE = (
+    "\U0001F000-\U0001FAFF"
+    "☀-➿"
+    "⌀-⏿"
+    "⬀-⯿"
+    "〰〽㊗㊙©®‼⁉™ℹ↔-↙↩↪"
+)
+_EMOJI_MODIFIERS = "️︎\U0001F3FB-\U0001F3FF⃣\U000E0020-\U000E007F"
+_EMOJI = re.compile(
+    rf"[\U0001F1E6-\U0001F1FF]{{2}}"
+    rf"|[0-9#*]️?⃣"
+    rf"|[{_EMOJI_BASE}][{_EMOJI_MODIFIERS}]*(?:‍[{_EMOJI_BASE}][{_EMOJI_MODIFIERS}]*)*"
+)
+
+
+def _char_weight(char: str) -> int:
+    code_point = ord(char)
+    for start, end in _LIGHT_RANGES:
+        if start <= code_point <= end:
+            return 1
+    return 2
+
+
+def _text_weight(text: str) -> int:
+    weight = 0
+    position = 0
+    for match in _EMOJI.finditer(text):
+        weight += sum(_char_weight(c) for c in text[position:match.start()])
+        weight += 2
+        position = match.end()
+    return weight + sum(_char_weight(c) for c in text[position:])
+
+
+def weighted_length(text: str) -> int:
+    """Length of `text` in Twitter's weighted characters."""
+    text = unicodedata.normalize("NFC", text)
+    weight = 0
+    position = 0
+    for match in _URL.finditer(text):
+        weight += _text_weight(text[position:match.start()]) + URL_LENGTH
+        position = match.end()
+    return weight + _text_weight(text[position:])
+
+
+def fits(text: str, limit: int = MAX_WEIGHTED_LENGTH) -> bool:
+    return weighted_length(text) <= limit
@@ -0,0 +1,264 @@
+"""Hot reload of tokens.yml and params.yaml for a running engine.
+
+`ConfigWatcher` polls both files and reports one only when its content
+changed and still parses; a half-written or invalid file is logged and the
+running config kept. `AgentSupervisor` diffs the token list by agent id:
+
+- new accounts are built and started;
+- removed accounts are stopped once their current cycle ends;
+- an account whose credentials or name changed is restarted;
+- a changed `strategy` or `token_budget` is applied in place.
+
+Every other agent keeps running with its connections, caches and
+watermarks. Changed params.yaml is handed to each agent and swapped in by
+`apply_policy` at the start of its next cycle, so no cycle runs on half of
+an edit. Sections only read at startup are logged as needing a restart.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import yaml
+
+from collector.followers import FollowBackPolicy
+from strategy.sampler import ActionSampler
+
+logger = logging.getLogger(__name__)
+
+# params.yaml sections that are read once, when the process starts
+STARTUP_SECTIONS = ("transport", "schema", "stream", "retention", "read_cache", "topic_detection", "trending_topics")
+# tokens.yml fields an agent's clients are built from; changing one restarts that agent
+CREDENTIAL_FIELDS = ("token", "secret", "user_name")
+
+
+class ConfigWatcher:
+    """
+    Polls YAML files for content changes.
+
+    Args:
+        paths: name -> path, e.g. {"tokens": "./tokens.yml", "params": "./params.yaml"}
+    """
+
+    def __init__(self, paths: Dict[str, str]):
+        self.paths = paths
+        self._stats: Dict[str, tuple] = {}
+        self._digests: Dict[str, str] = {}
+        for name in paths:
+            self._read(name)
+
+    def _read(self, name: str) -> Optional[bytes]:
+        """The file's content if it changed since the last read, else None."""
+        path = self.paths[name]
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # Skip the read while neither mtime nor size moved
+        if self._stats.get(name) == (stat.st_mtime_ns, stat.st_size):
+            return None
+        self._stats[name] = (stat.st_mtime_ns, stat.st_size)
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        if self._digests.get(name) == digest:
+            return None
+        self._digests[name] = digest
+        return content
+
+    def poll(self) -> Dict[str, Any]:
+        """Parsed contents of every file that changed; invalid files are skipped until fixed."""
+        changes = {}
+        for name, path in self.paths.items():
+            content = self._read(name)
+            if content is None:
+                continue
+            try:
+                parsed = yaml.safe_load(content)
+            except yaml.YAMLError as e:
+                logger.warning("Ignoring invalid %s, keeping the running config: %s", path, e)
+                continue
+            if parsed is None:
+                # Most likely caught mid-write; the finished file arrives on a later poll
+                logger.warning("Ignoring empty %s, keeping the running config", path)
+                continue
+            changes[name] = parsed
+        return changes
+
+
+def apply_policy(params: dict, token: dict, strategy, collector):
+    """Swap an agent's policy parameters for those in `params`; call between cycles."""
+    # Build everything that can fail first, then assign, so an error leaves the old policy whole
+    sampler = ActionSampler.from_params(params, token["strategy"], token["id"])
+    follow_back = FollowBackPolicy.from_params(params, token["id"])
+    budget_config = params.get("llm_budget") or {}
+    mention_config = params.get("mentions") or {}
+
+    # Keep the sampler's RNG so a seeded run stays reproducible across reloads
+    strategy.sampler.probabilities = sampler.probabilities
+    strategy.pack_size = params.get("reply_pack_size", 1)
+    strategy.max_mention_replies = mention_config.get("max_replies_per_cycle", 10)
+    if strategy.budget is not None:
+        strategy.budget.agent_budget.limit = token.get("token_budget") or budget_config.get("agent_tokens_per_hour")
+        strategy.budget.global_budget.limit = budget_config.get("global_tokens_per_hour")
+        strategy.budget.short_below = budget_config.get("short_prompt_below", 0.25)
+
+    collector.tweets_per_cycle = (params.get("ingest") or {}).get("tweets_per_cycle", 100)
+    if collector.follower_sync is not None and collector.follower_sync.policy is not None:
+        follow_back.rng = collector.follower_sync.policy.rng
+        collector.follower_sync.policy = follow_back
+    if collector.mentions is not None:
+        collector.mentions.max_pages = mention_config.get("max_pages", 5)
+        collector.mentions.max_per_poll = mention_config.get("max_replies_per_cycle", 10)
+        collector.mentions.context_ttl = mention_config.get("context_ttl_seconds", 3600)
+        collector.mentions.context_size = mention_config.get("context_size", 5)
+
+
+class AgentHandle:
+    """One supervised agent: its tokens.yml entry, its components and its stop signal."""
+
+    def __init__(self, token: dict, parts: Any, apply: Callable[["AgentHandle", dict], None]):
+        self.token = token
+        self.parts = parts
+        self.stop = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self._apply = apply
+        self._pending: Optional[dict] = None
+
+    @property
+    def agent_id(self) -> str:
+        return str(self.token["id"])
+
+    def update(self, params: dict):
+        """Queue `params` for the next cycle; a newer update replaces one not yet applied."""
+        self._pending = params
+
+    def apply_pending(self):
+        params, self._pending = self._pending, None
+        if params is None:
+            return
+        try:
+            self._apply(self, params)
+            logger.info("Applied reloaded params", extra={"agent": self.token.get("user_name", self.agent_id)})
+        except Exception as e:
+            logger.warning("Could not apply reloaded params, keeping the old ones: %s", e,
+                           extra={"agent": self.token.get("user_name", self.agent_id)})
+
+
+class AgentSupervisor:
+    """
+    Runs one task per agent and reconciles them with tokens.yml and params.yaml.
+
+    Args:
+        build: coroutine function (token entry, params) -> the agent's components
+        run: coroutine function (AgentHandle) -> runs the agent until `handle.stop` is set,
+            calling `handle.apply_pending()` before each cycle
+        apply: (AgentHandle, params) -> None, swaps in new policy parameters
+        retire: (AgentHandle) -> None, called once a removed or restarted agent has stopped
+        watcher: a ConfigWatcher with "tokens" and "params" entries; None disables reloading
+        interval: seconds between polls
+    """
+
+    def __init__(self, build: Callable[[dict, dict], Awaitable[Any]], run: Callable[[AgentHandle], Awaitable[None]],
+                 apply: Callable[[AgentHandle, dict], None], params: dict,
+                 retire: Callable[[AgentHandle], None] = None, watcher: ConfigWatcher = None,
+                 interval: float = 5.0):
+        self.build = build
+        self.run = run
+        self.apply = apply
+        self.params = params
+        self.retire = retire
+        self.watcher = watcher
+        self.interval = interval
+        self.agents: Dict[str, AgentHandle] = {}
+
+    async def _run(self, handle: AgentHandle):
+        try:
+            await self.run(handle)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Agent stopped: %s", e, extra={"agent": handle.token.get("user_name")})
+
+    def start(self, token: dict, parts: Any) -> AgentHandle:
+        handle = AgentHandle(token, parts, self.apply)
+        handle.task = asyncio.create_task(self._run(handle), name=f"agent-{handle.agent_id}")
+        self.agents[handle.agent_id] = handle
+        return handle
+
+    async def add(self, token: dict) -> Optional[AgentHandle]:
+        try:
+            parts = await self.build(token, self.params)
+        except Exception as e:
+            logger.exception("Could not start agent: %s", e, extra={"agent": token.get("user_name")})
+            return None
+        return self.start(token, parts)
+
+    async def remove(self, agent_id: str):
+        handle = self.agents.pop(agent_id)
+        handle.stop.set()
+        # The agent finishes its current cycle; its sleep ends as soon as stop is set
+        await handle.task
+        if self.retire is not None:
+            self.retire(handle)
+
+    async def reload(self, tokens: Optional[List[dict]] = None, params: Optional[dict] = None):
+        if params is not None:
+            stale = [k for k in STARTUP_SECTIONS if self.params.get(k) != params.get(k)]
+            if stale:
+                logger.warning("params.yaml: changes to %s need a restart to take effect", ", ".join(stale))
+            self.params = params
+            for handle in self.agents.values():
+                handle.update(params)
+
+        if tokens is None:
+            return
+        wanted = {str(token["id"]): token for token in tokens}
+        removed = [a for a in self.agents if a not in wanted]
+        restarted, updated = [], []
+        for agent_id, handle in self.agents.items():
+            token = wanted.get(agent_id)
+            if token is None or token == handle.token:
+                continue
+            if any(token.get(k) != handle.token.get(k) for k in CREDENTIAL_FIELDS):
+                restarted.append(agent_id)
+            else:
+                updated.append(agent_id)
+        added = [a for a in wanted if a not in self.agents]
+
+        for agent_id in updated:
+            # strategy or token_budget only: a policy change like any other
+            handle = self.agents[agent_id]
+            handle.token = wanted[agent_id]
+            handle.update(self.params)
+        await asyncio.gather(*(self.remove(a) for a in removed + restarted))
+        for agent_id in restarted + added:
+            await self.add(wanted[agent_id])
+        if removed or restarted or updated or added:
+            logger.info("tokens.yml reloaded: %d added, %d removed, %d restarted, %d updated in place",
+                        len(added), len(removed), len(restarted), len(updated))
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            changes = self.watcher.poll()
+            if changes:
+                try:
+                    await self.reload(changes.get("tokens"), changes.get("params"))
+                except Exception as e:
+                    logger.exception("Reload failed: %s", e)
+
+    async def serve(self, agents: List[tuple]):
+        """Start `(token, parts)` pairs, then follow config changes; returns once every agent has stopped."""
+        for token, parts in agents:
+            self.start(token, parts)
+        if self.watcher is None or not self.interval:
+            await asyncio.gather(*(handle.task for handle in list(self.agents.values())))
+            return
+        watch = asyncio.create_task(self.watch(), name="config-watch")
+        try:
+            await watch
+        finally:
+            watch.cancel()
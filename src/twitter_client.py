@@ -1,44 +1,63 @@
 import os
+import threading
 import tweepy
 import yaml
 from dotenv import load_dotenv
 
+from utils.router import CredentialRouter, ReadCache
+from utils.transport import get_transport
+
 # Load environment variables
 load_dotenv()
 
 API_KEY = os.getenv("API_KEY", "")
 API_SECRET_KEY = os.getenv("API_SECRET_KEY", "")
 BEARER_TOKEN = os.getenv("BEARER_TOKEN", "")
+# Extra app-only tokens (comma-separated) add their own read windows to the router
+BEARER_TOKENS = [token for token in os.getenv("BEARER_TOKENS", "").split(",") if token] or [BEARER_TOKEN]
+
+TOKENS_PATH = './tokens.yml'
+
 
-# Load the access tokens and secrets from the YAML file
-with open('./tokens.yml', 'r') as f:
-    tokens = yaml.safe_load(f)
+def load_tokens(path: str = TOKENS_PATH) -> list:
+    # Load the access tokens and secrets from the YAML file
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or []
 
 def _fetch_v1_api(access_token, access_token_secret):
     auth = tweepy.OAuth1UserHandler(API_KEY, API_SECRET_KEY)
     auth.set_access_token(access_token, access_token_secret)
     api = tweepy.API(auth)
-    return api
+    return get_transport().twitter(api)
+
+
+class _Lazy:
+    """Builds the wrapped object on first attribute access."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._obj = None
+        self._lock = threading.Lock()
 
-def _fetch_client(access_token, access_token_secret):
-    client = tweepy.Client(
-            bearer_token=BEARER_TOKEN,
-            consumer_key=API_KEY,
-            consumer_secret=API_SECRET_KEY,
-            access_token=access_token,
-            access_token_secret=access_token_secret,
-            wait_on_rate_limit=True,
-        )
+    def __getattr__(self, name):
+        with self._lock:
+            if self._obj is None:
+                self._obj = self._factory()
+        return getattr(self._obj, name)
 
-    return client
 
+def fetch_clients(tokens: list = None, router: CredentialRouter = None, cache: ReadCache = None) -> list:
+    if tokens is None:
+        tokens = load_tokens()
+    if router is None:
+        router = CredentialRouter(BEARER_TOKENS, API_KEY, API_SECRET_KEY, cache=cache)
 
-def fetch_clients() -> list:
-    # Initialize a client for each set of access tokens/secrets
+    # Register every token with the router; clients are only built when first called
     client_data = []
     for token in tokens:
-        client = _fetch_client(token['token'], token['secret'])
-        v1_api = _fetch_v1_api(token['token'], token['secret'])
+        router.add_user(token['id'], token['token'], token['secret'])
+        client = router.client_for(token['id'])
+        v1_api = _Lazy(lambda token=token: _fetch_v1_api(token['token'], token['secret']))
         strategy = token['strategy']
         user_name = token['user_name']
         agent_id = token['id']
@@ -48,6 +67,8 @@ def fetch_clients() -> list:
             "strategy": strategy,
             "user_name": user_name,
             "agent_id": agent_id,
+            "token_budget": token.get('token_budget'),
+            "router": router,
         })
 
     return client_data
@@ -0,0 +1,89 @@
+import threading
+from functools import wraps
+
+import tweepy
+from prometheus_client import Counter, Histogram, start_http_server
+
+STAGE_SECONDS = Histogram(
+    "twitter_agent_stage_seconds",
+    "Latency of engine stages (collector, strategy, executor) and backend calls (llm, weaviate)",
+    ["agent", "stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+API_CALLS = Counter("twitter_agent_api_calls", "Twitter API calls", ["agent", "endpoint"])
+RATE_LIMITED = Counter("twitter_agent_rate_limited", "Twitter API responses with HTTP 429", ["agent", "endpoint"])
+LLM_TOKENS = Counter("twitter_agent_llm_tokens", "LLM tokens consumed", ["agent", "kind"])
+CACHE_HITS = Counter("twitter_agent_cache_hits", "Read cache hits", ["agent", "cache"])
+CACHE_MISSES = Counter("twitter_agent_cache_misses", "Read cache misses", ["agent", "cache"])
+RETENTION_DELETED = Counter("twitter_agent_retention_deleted", "Objects deleted by retention", ["class", "reason"])
+WEBHOOK_EVENTS = Counter("twitter_agent_webhook_events", "Account activity events turned into work items",
+                         ["agent", "kind"])
+REACTION_SECONDS = Histogram(
+    "twitter_agent_reaction_seconds",
+    "Time from the oldest pending webhook event arriving to the agent acting on it",
+    ["agent"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 3600),
+)
+
+
+def stage_timer(stage: str, agent):
+    """Context manager that observes the duration of `stage` for `agent`."""
+    return STAGE_SECONDS.labels(str(agent), stage).time()
+
+
+def record_llm_tokens(agent, prompt_tokens: int, completion_tokens: int):
+    LLM_TOKENS.labels(str(agent), "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(str(agent), "completion").inc(completion_tokens)
+
+
+def record_cache(agent, cache: str, hit: bool):
+    (CACHE_HITS if hit else CACHE_MISSES).labels(str(agent), cache).inc()
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0"):
+    """Serve /metrics; clients sending `Accept: application/openmetrics-text` get OpenMetrics."""
+    start_http_server(port, addr=addr)
+
+
+class InstrumentedClient:
+    """
+    Wraps a `tweepy.Client` so every API method call is counted per agent and endpoint.
+
+    tweepy sleeps through 429s itself when `wait_on_rate_limit` is set, so those
+    are counted from a response hook on the client's HTTP session; clients
+    without a session (stand-ins) are counted from the raised exception.
+    Clients that count their own calls (`counts_calls`, the router's, which
+    serves some reads from its cache) are left to do so.
+    """
+
+    def __init__(self, client, agent):
+        self._client = client
+        self._agent = str(agent)
+        self._local = threading.local()
+        self._session = getattr(client, "session", None)
+        self._counted = getattr(client, "counts_calls", False)
+        if self._session is not None:
+            self._session.hooks.setdefault("response", []).append(self._on_response)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            if not self._counted:
+                API_CALLS.labels(self._agent, name).inc()
+            self._local.endpoint = name
+            try:
+                return attr(*args, **kwargs)
+            except tweepy.TooManyRequests:
+                if self._session is None:
+                    RATE_LIMITED.labels(self._agent, name).inc()
+                raise
+
+        return call
+
+    def _on_response(self, response, *args, **kwargs):
+        if response.status_code == 429:
+            RATE_LIMITED.labels(self._agent, getattr(self._local, "endpoint", "unknown")).inc()
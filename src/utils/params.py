@@ -0,0 +1,10 @@
+import yaml
+
+PARAMS_PATH = "./params.yaml"
+
+
+def load_params(path: str = PARAMS_PATH) -> dict:
+    """Load agent policy parameters from params.yaml."""
+    with open(path, "r") as f:
+        params = yaml.safe_load(f)
+    return params or {}
@@ -0,0 +1,335 @@
+"""Route Twitter API v2 reads across every credential the process holds.
+
+Each user token and each app-only bearer token has its own rate-limit window
+per endpoint. Calls that need the agent's own user context (home timeline,
+posting, liking, following) always go through that agent's token; reads that
+any credential may make (search, list tweets, user and tweet lookups) go to
+the eligible credential with the most remaining quota, as last reported in
+the `x-rate-limit-*` response headers. A 429 fails over to the next
+credential, so read throughput grows with the number of credentials. When
+every eligible credential is exhausted the call raises `RateLimited` at once
+rather than sleeping until a window resets: callers run on the event loop,
+and a blocking wait would stall every agent.
+
+Shared reads also pass through a `ReadCache`: identical concurrent requests
+(same endpoint and normalised arguments) share one in-flight call, and the
+result is served to every agent for a short TTL, so agents following the same
+lists or searching the same topics stop repeating each other's reads.
+
+Clients are built on first use, not when the token file is loaded.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, List, MutableMapping, Optional
+
+import tweepy
+
+from utils.metrics import API_CALLS, RATE_LIMITED, record_cache
+from utils.transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+# tweepy.Client reads that accept both user-context and app-only auth
+SHARED_READS = frozenset({
+    "get_tweet", "get_tweets", "search_recent_tweets", "get_users_tweets", "get_users_mentions",
+    "get_liking_users", "get_retweeters", "get_quote_tweets", "get_users_followers", "get_users_following",
+    "get_user", "get_users", "get_list", "get_list_tweets", "get_owned_lists", "get_list_members",
+    "get_list_followers", "get_followed_lists", "get_list_memberships", "get_liked_tweets",
+})
+# Reads only an app-only bearer token may make
+APP_ONLY_READS = frozenset({"get_recent_tweets_count"})
+
+
+class RateLimited(tweepy.TweepyException):
+    """Every credential that may make the call is rate-limited until `reset_at` (epoch seconds)."""
+
+    def __init__(self, endpoint: str, reset_at: float):
+        super().__init__(f"Every credential for {endpoint} is rate-limited until {reset_at:.0f}")
+        self.endpoint = endpoint
+        self.reset_at = reset_at
+
+
+class Credential:
+    """One token (a user's OAuth 1.0a pair, or an app bearer token) and its last-seen quota per endpoint."""
+
+    def __init__(self, name: str, factory: Callable[[], tweepy.Client], user_auth: bool,
+                 quota: MutableMapping[str, tuple] = None):
+        self.name = name
+        self.user_auth = user_auth
+        self._factory = factory
+        self._client: Optional[tweepy.Client] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # endpoint -> (remaining, reset epoch seconds); a shared store (scheduler.RedisQuota) spans processes
+        self.quota: MutableMapping[str, tuple] = {} if quota is None else quota
+        self.last_used = 0.0
+
+    @property
+    def client(self) -> tweepy.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = self._factory()
+                self._client.session.hooks.setdefault("response", []).append(self._on_response)
+            return self._client
+
+    @property
+    def built(self) -> bool:
+        return self._client is not None
+
+    def _on_response(self, response, *args, **kwargs):
+        endpoint = getattr(self._local, "endpoint", None)
+        remaining = response.headers.get("x-rate-limit-remaining")
+        reset = response.headers.get("x-rate-limit-reset")
+        if endpoint is not None and remaining is not None and reset is not None:
+            self.quota[endpoint] = (int(remaining), int(reset))
+        elif endpoint is not None and response.status_code == 429:
+            self.quota[endpoint] = (0, int(time.time()) + 60)
+
+    def remaining(self, endpoint: str, now: float) -> float:
+        """Calls left in the current window; unknown (never called, or window over) counts as unlimited."""
+        remaining, reset = self.quota.get(endpoint, (None, 0))
+        if remaining is None or reset <= now:
+            return float("inf")
+        return remaining
+
+    def reset_at(self, endpoint: str) -> float:
+        return self.quota.get(endpoint, (None, 0))[1]
+
+    def call(self, endpoint: str, *args, **kwargs):
+        method = getattr(self.client, endpoint)
+        self._local.endpoint = endpoint
+        try:
+            return method(*args, user_auth=self.user_auth, **kwargs)
+        finally:
+            self._local.endpoint = None
+
+
+def _unordered(key: str) -> bool:
+    # tweet_fields=["a", "b"], ["b", "a"] and "a,b" ask for the same thing; a query or a list of ids does not
+    return key.endswith("_fields") or key == "expansions"
+
+
+def _freeze(value, unordered: bool = False) -> Hashable:
+    if unordered and isinstance(value, str):
+        return tuple(sorted(value.split(",")))
+    if isinstance(value, (set, frozenset)) or (unordered and isinstance(value, (list, tuple))):
+        return tuple(sorted(str(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v, _unordered(k))) for k, v in value.items()))
+    return str(value)
+
+
+def request_key(endpoint: str, args: tuple, kwargs: dict) -> Hashable:
+    return (endpoint, tuple(_freeze(a) for a in args),
+            tuple(sorted((k, _freeze(v, _unordered(k))) for k, v in kwargs.items())))
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class ReadCache:
+    """
+    Single-flight coalescing plus a bounded TTL cache for shared reads.
+
+    Args:
+        ttl: seconds a result is served from the cache
+        ttls: per-endpoint TTLs overriding `ttl` (0 disables caching for that endpoint)
+        max_entries: least recently used results are dropped past this
+    """
+
+    def __init__(self, ttl: float = 60, ttls: Dict[str, float] = None, max_entries: int = 2048,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @classmethod
+    def from_params(cls, params: dict, **kwargs):
+        config = params.get("read_cache") or {}
+        return cls(ttl=config.get("ttl_seconds", 60), ttls=config.get("endpoint_ttl_seconds"),
+                   max_entries=config.get("max_entries", 2048), **kwargs)
+
+    def get(self, agent_id: str, endpoint: str, key: Hashable, fetch: Callable[[], Any]):
+        ttl = self.ttls.get(endpoint, self.ttl)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_cache(agent_id, endpoint, True)
+                return entry[0]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        record_cache(agent_id, endpoint, not leader)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fetch()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None and ttl > 0:
+                    self._entries[key] = (flight.result, self.clock() + ttl)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+        return flight.result
+
+
+class CredentialRouter:
+    """
+    Holds every credential and hands out per-agent clients (`client_for`).
+
+    Args:
+        bearer_tokens: app-only tokens; each has its own per-app windows
+        consumer_key, consumer_secret: the app's OAuth 1.0a keys for user tokens
+        client_factory: builds a tweepy.Client from its keyword arguments
+        cache: shared-read cache; None sends every read to the API
+        quota: credential name -> store for its quota; None keeps quotas in this process
+    """
+
+    def __init__(self, bearer_tokens: List[str] = (), consumer_key: str = "", consumer_secret: str = "",
+                 client_factory: Callable[..., tweepy.Client] = tweepy.Client, cache: ReadCache = None,
+                 clock: Callable[[], float] = time.time,
+                 quota: Callable[[str], MutableMapping[str, tuple]] = None):
+        self.consumer_key = consumer_key
+        self.cache = cache
+        self.consumer_secret = consumer_secret
+        self.client_factory = client_factory
+        self.clock = clock
+        self.quota = quota
+        self.users: Dict[str, Credential] = {}
+        self.apps: List[Credential] = [
+            self._credential(f"app:{i}", self._factory(bearer_token=token), user_auth=False)
+            for i, token in enumerate(t for t in bearer_tokens if t)
+        ]
+        self._lock = threading.Lock()
+
+    def _factory(self, **kwargs) -> Callable[[], tweepy.Client]:
+        def build():
+            # The router handles 429s itself, by failing over or raising RateLimited
+            return get_transport().twitter(self.client_factory(wait_on_rate_limit=False, **kwargs))
+        return build
+
+    def _credential(self, name: str, factory, user_auth: bool) -> Credential:
+        return Credential(name, factory, user_auth, self.quota(name) if self.quota is not None else None)
+
+    def add_user(self, agent_id, access_token: str, access_token_secret: str) -> Credential:
+        credential = self._credential(
+            f"user:{agent_id}",
+            self._factory(consumer_key=self.consumer_key, consumer_secret=self.consumer_secret,
+                          access_token=access_token, access_token_secret=access_token_secret),
+            user_auth=True,
+        )
+        self.users[str(agent_id)] = credential
+        return credential
+
+    def remove_user(self, agent_id):
+        # Clients already handed out for this agent fail their user-context calls from here on
+        self.users.pop(str(agent_id), None)
+
+    def client_for(self, agent_id) -> "RoutedClient":
+        return RoutedClient(self, str(agent_id))
+
+    def eligible(self, endpoint: str, agent_id: str) -> List[Credential]:
+        if endpoint in APP_ONLY_READS:
+            return list(self.apps)
+        if endpoint in SHARED_READS:
+            return list(self.apps) + list(self.users.values())
+        return [self.users[agent_id]]
+
+    def _pick(self, candidates: List[Credential], endpoint: str) -> Optional[Credential]:
+        now = self.clock()
+        with self._lock:
+            ready = [c for c in candidates if c.remaining(endpoint, now) > 0]
+            if not ready:
+                return None
+            # Most quota left; among equals, a client that already exists, then the least recently used
+            best = max(ready, key=lambda c: (c.remaining(endpoint, now), c.built, -c.last_used))
+            best.last_used = now
+            return best
+
+    def call(self, agent_id: str, endpoint: str, *args, **kwargs):
+        if self.cache is not None and (endpoint in SHARED_READS or endpoint in APP_ONLY_READS):
+            # Shared reads do not depend on who asks, so one agent's result serves them all
+            return self.cache.get(agent_id, endpoint, request_key(endpoint, args, kwargs),
+                                  lambda: self._call(agent_id, endpoint, *args, **kwargs))
+        return self._call(agent_id, endpoint, *args, **kwargs)
+
+    def _call(self, agent_id: str, endpoint: str, *args, **kwargs):
+        candidates = self.eligible(endpoint, agent_id)
+        while True:
+            credential = self._pick(candidates, endpoint)
+            if credential is None:
+                reset = min(c.reset_at(endpoint) for c in candidates)
+                logger.warning("Every credential for %s is rate-limited for %.0fs", endpoint,
+                               max(reset - self.clock(), 0), extra={"agent": agent_id})
+                raise RateLimited(endpoint, reset)
+            # Counted here rather than by InstrumentedClient, so reads served from the cache are not
+            API_CALLS.labels(agent_id, endpoint).inc()
+            try:
+                return credential.call(endpoint, *args, **kwargs)
+            except tweepy.TooManyRequests:
+                RATE_LIMITED.labels(agent_id, endpoint).inc()
+                if credential.remaining(endpoint, self.clock()) > 0:
+                    # No usable headers on the 429; assume the usual 15-minute window
+                    credential.quota[endpoint] = (0, int(self.clock()) + 900)
+                logger.info("%s rate-limited on %s, failing over", credential.name, endpoint,
+                            extra={"agent": agent_id})
+
+
+class RoutedClient:
+    """Stands in for one agent's `tweepy.Client`; every API method goes through the router."""
+
+    # No HTTP session of its own (see InstrumentedClient); the router counts 429s and the calls that go out
+    session = None
+    counts_calls = True
+
+    def __init__(self, router: CredentialRouter, agent_id: str):
+        self._router = router
+        self._agent_id = agent_id
+
+    def __getattr__(self, name):
+        attr = getattr(tweepy.Client, name)
+        if name.startswith("_") or not callable(attr):
+            return getattr(self._router.users[self._agent_id].client, name)
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            kwargs.pop("user_auth", None)
+            return self._router.call(self._agent_id, name, *args, **kwargs)
+
+        return call
@@ -0,0 +1,128 @@
+"""Pooled, keep-alive HTTP shared by every external client in the process.
+
+One `HTTPAdapter` owns the connection pools (one per host, at most
+`pool_maxsize` connections each) and is mounted on every `requests.Session`
+the Twitter, Weaviate, Giphy and OpenAI clients use. Sessions keep their own
+headers, auth and hooks (per-agent metrics, bearer tokens); only the
+connections are shared, so a TLS handshake is paid once per connection
+rather than once per client.
+"""
+
+import logging
+import threading
+import warnings
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+logger = logging.getLogger(__name__)
+
+WEAVIATE_URL = "http://localhost:8080"
+
+
+class Transport:
+    """
+    Args:
+        pool_connections: hosts whose pools are kept open
+        pool_maxsize: connections kept per host; with `pool_block` this is also a hard per-host limit
+        pool_block: wait for a free connection instead of opening one past `pool_maxsize`
+        max_retries: retries of failed connects (never of requests that reached the server)
+    """
+
+    def __init__(self, pool_connections: int = 16, pool_maxsize: int = 32, pool_block: bool = True,
+                 max_retries: int = 2):
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   max_retries=max_retries, pool_block=pool_block)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._weaviate: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_params(cls, params: dict):
+        return cls(**(params.get("transport") or {}))
+
+    def mount(self, session: requests.Session) -> requests.Session:
+        """Route `session` through the shared pools, asking for compressed responses."""
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        return session
+
+    def session(self, name: str = None) -> requests.Session:
+        """A pooled session; named sessions are created once and reused."""
+        if name is None:
+            return self.mount(requests.Session())
+        with self._lock:
+            if name not in self._sessions:
+                self._sessions[name] = self.mount(requests.Session())
+            return self._sessions[name]
+
+    def twitter(self, client):
+        """Pool a `tweepy.Client` or `tweepy.API` (both keep a `session` attribute)."""
+        self.mount(client.session)
+        return client
+
+    def weaviate(self, url: str = WEAVIATE_URL):
+        """One `weaviate.Client` per URL for the whole process, on the shared pools."""
+        import weaviate
+
+        with self._lock:
+            if url not in self._weaviate:
+                client = weaviate.Client(url)
+                # weaviate-client v3 keeps its requests.Session on the connection object
+                session = getattr(getattr(client, "_connection", None), "_session", None)
+                if isinstance(session, requests.Session):
+                    self.mount(session)
+                else:
+                    logger.warning("Weaviate client has no requests session; not pooled")
+                self._weaviate[url] = client
+            return self._weaviate[url]
+
+    def install_openai(self):
+        """Make the `openai` module (and so langchain's OpenAI LLM and embeddings) use the shared pools."""
+        import openai
+
+        if hasattr(openai, "requestssession"):
+            openai.requestssession = self.session("openai")
+        else:
+            # openai<0.27.7 builds one session per thread with this factory
+            from openai import api_requestor
+
+            def make_session() -> requests.Session:
+                # What openai's own factory applies besides its adapter: the proxy, and the
+                # warning that verify_ssl_certs=False is ignored (certificates are always verified)
+                if not openai.verify_ssl_certs:
+                    warnings.warn("verify_ssl_certs is ignored; openai always verifies.")
+                session = self.session()
+                proxies = api_requestor._requests_proxies_arg(openai.proxy)
+                if proxies:
+                    session.proxies = proxies
+                return session
+
+            api_requestor._make_session = make_session
+
+    def close(self):
+        self.adapter.close()
+
+
+_transport: Optional[Transport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """The process-wide transport, created with defaults on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = Transport()
+        return _transport
+
+
+def configure_transport(params: dict) -> Transport:
+    """Replace the process-wide transport with one built from params.yaml; call before creating clients."""
+    global _transport
+    with _transport_lock:
+        _transport = Transport.from_params(params)
+        return _transport
@@ -0,0 +1,91 @@
+"""Flask receiver for Account Activity webhooks.
+
+`GET /webhooks/twitter?crc_token=...` answers Twitter's CRC challenge;
+`POST /webhooks/twitter` checks the body's signature and hands the delivery
+to a `WebhookDispatcher`. Deliveries are acknowledged as soon as they are
+queued, since Twitter retries anything not answered within a few seconds.
+
+The agents' inboxes live in the engine process, so `WebhookServer` serves
+the app from a thread of that process rather than from separate Gunicorn
+workers. Twitter only delivers to HTTPS URLs; put a TLS-terminating proxy in
+front of it.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+from flask import Flask, abort, jsonify, request
+from werkzeug.serving import make_server
+
+from .events import WebhookDispatcher, crc_response, verify
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/webhooks/twitter"
+SIGNATURE_HEADER = "x-twitter-webhooks-signature"
+
+
+def create_app(consumer_secret: str, dispatcher: WebhookDispatcher, path: str = WEBHOOK_PATH) -> Flask:
+    app = Flask(__name__)
+
+    @app.get(path)
+    def crc():
+        token = request.args.get("crc_token")
+        if not token:
+            abort(400)
+        return jsonify(crc_response(consumer_secret, token))
+
+    @app.post(path)
+    def events():
+        body = request.get_data()
+        if not verify(consumer_secret, body, request.headers.get(SIGNATURE_HEADER)):
+            logger.warning("Webhook delivery with a bad signature from %s", request.remote_addr)
+            abort(401)
+        payload = request.get_json(force=True, silent=True)
+        if not isinstance(payload, dict):
+            abort(400)
+        return jsonify({"queued": dispatcher.dispatch(payload)})
+
+    return app
+
+
+class WebhookServer:
+    """Serves the receiver from a background thread until `close()`."""
+
+    def __init__(self, app: Flask, host: str = "0.0.0.0", port: int = 8000):
+        self.app = app
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_params(cls, app: Flask, params: dict, **kwargs):
+        config = params.get("webhook") or {}
+        kwargs.setdefault("host", config.get("host", "0.0.0.0"))
+        kwargs.setdefault("port", config.get("port", 8000))
+        return cls(app, **kwargs)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self._server.server_port if self._server else self.port}"
+
+    def start(self) -> "WebhookServer":
+        self._server = make_server(self.host, self.port, self.app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="webhook", daemon=True)
+        self._thread.start()
+        logger.info("Webhook receiver on %s%s", self.url, WEBHOOK_PATH)
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
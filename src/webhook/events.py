@@ -0,0 +1,283 @@
+"""Account Activity webhook events, turned into per-agent work items.
+
+Twitter signs every delivery with HMAC-SHA256 of the body under the app's
+consumer secret and checks ownership of the URL with a CRC challenge under
+the same key. A delivery carries `for_user_id` (the subscribed agent) and
+one or more event arrays; three of them become work items:
+
+- `tweet_create_events` from another user that reply to or @-mention the
+  agent become `Mention`s (retweets are skipped);
+- `follow_events` whose target is the agent become new followers, with the
+  follower's own follower count for the follow-back policy;
+- `favorite_events` on the agent's tweets are counted only.
+
+Work items land in the agent's `Inbox`, which wakes the agent's engine loop
+so it reacts within seconds rather than at its next hourly cycle. The inbox
+has the `poll()` of `MentionsPoller`, so it replaces the mentions poller in
+the collector; pushed mentions carry no thread context.
+
+Reacting at once lets two bots that mention each other ping-pong without
+end, so each poll hands out at most `max_per_poll` mentions, at most
+`max_per_hour` in any hour, and only one per author per `author_cooldown`
+seconds; mentions over the limits stay queued, while repeat mentions from an
+author still cooling down are dropped.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from collector.mentions import SOURCE as MENTIONS_SOURCE, Mention
+from collector.watermarks import WatermarkStore
+from utils.metrics import WEBHOOK_EVENTS
+
+logger = logging.getLogger(__name__)
+
+MENTION = "mention"
+FOLLOW = "follow"
+LIKE = "like"
+
+
+def _digest(secret: str, message: bytes) -> str:
+    mac = hmac.new(secret.encode(), message, hashlib.sha256).digest()
+    return "sha256=" + base64.b64encode(mac).decode()
+
+
+def crc_response(secret: str, crc_token: str) -> dict:
+    """Answer to Twitter's `GET ?crc_token=` challenge."""
+    return {"response_token": _digest(secret, crc_token.encode())}
+
+
+def sign(secret: str, body: bytes) -> str:
+    """The `x-twitter-webhooks-signature` header Twitter sends with `body`."""
+    return _digest(secret, body)
+
+
+def verify(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    return bool(signature) and hmac.compare_digest(sign(secret, body), signature)
+
+
+class WorkItem(NamedTuple):
+    kind: str
+    agent_id: str
+    # Mention for MENTION, (follower id, follower count) for FOLLOW, liked tweet id for LIKE
+    payload: object
+    received: float
+
+
+def _text(tweet: dict) -> str:
+    if tweet.get("truncated") and tweet.get("extended_tweet"):
+        return tweet["extended_tweet"]["full_text"]
+    return tweet.get("full_text") or tweet.get("text") or ""
+
+
+def _mentions_user(tweet: dict, user_id: str) -> bool:
+    if tweet.get("in_reply_to_user_id_str") == user_id:
+        return True
+    entities = (tweet.get("extended_tweet") or tweet).get("entities") or {}
+    return any(m.get("id_str") == user_id for m in entities.get("user_mentions") or ())
+
+
+def parse_events(payload: dict, received: float = None) -> List[WorkItem]:
+    """Work items in one webhook delivery, in delivery order."""
+    agent_id = str(payload.get("for_user_id") or "")
+    received = time.time() if received is None else received
+    items = []
+    for tweet in payload.get("tweet_create_events") or ():
+        author_id = str((tweet.get("user") or {}).get("id_str") or "")
+        if author_id == agent_id or "retweeted_status" in tweet or not _mentions_user(tweet, agent_id):
+            continue
+        tweet_id = int(tweet["id_str"])
+        conversation_id = int(tweet.get("in_reply_to_status_id_str") or tweet_id)
+        reply_to_own = tweet.get("in_reply_to_user_id_str") == agent_id
+        mention = Mention(tweet_id, _text(tweet), int(author_id or 0), conversation_id, reply_to_own)
+        items.append(WorkItem(MENTION, agent_id, mention, received))
+    for event in payload.get("follow_events") or ():
+        if event.get("type") != "follow" or str((event.get("target") or {}).get("id")) != agent_id:
+            continue
+        source = event.get("source") or {}
+        items.append(WorkItem(FOLLOW, agent_id, (int(source["id"]), int(source.get("followers_count") or 0)),
+                              received))
+    for event in payload.get("favorite_events") or ():
+        status = event.get("favorited_status") or {}
+        if str((status.get("user") or {}).get("id_str")) == agent_id:
+            items.append(WorkItem(LIKE, agent_id, int(status["id_str"]), received))
+    return items
+
+
+class Inbox:
+    """
+    One agent's pending webhook work, filled from the receiver's threads and drained by its engine loop.
+
+    Args:
+        watermarks: when given, the mentions watermark follows pushed mentions, so a later
+            switch back to polling does not answer them again
+        max_size: pending mentions kept; the oldest are dropped past it
+        max_per_poll: mentions handed out per `poll()`; the rest wait for the next one
+        max_per_hour: mentions handed out in any rolling hour; None for no cap
+        author_cooldown: seconds after a mention is handed out during which further
+            mentions from the same author are dropped
+    """
+
+    def __init__(self, agent_id, watermarks: WatermarkStore = None, max_size: int = 1000,
+                 max_per_poll: int = None, max_per_hour: int = None, author_cooldown: float = 0,
+                 clock: Callable[[], float] = time.time):
+        self.agent_id = str(agent_id)
+        self.watermarks = watermarks
+        self.max_per_poll = max_per_poll
+        self.max_per_hour = max_per_hour
+        self.author_cooldown = author_cooldown
+        self.clock = clock
+        self._mentions: Deque[WorkItem] = deque(maxlen=max_size)
+        self._follows: Deque[WorkItem] = deque(maxlen=max_size)
+        self._seen: Deque[int] = deque(maxlen=max_size)
+        self._handed_out: Deque[float] = deque()
+        self._authors: Dict[int, float] = {}
+        # Handled mentions newer than one still queued, held back from the watermark until it is handled too
+        self._handled: List[int] = []
+        self.likes = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def put(self, item: WorkItem):
+        with self._lock:
+            if item.kind == MENTION:
+                # Twitter redelivers events it did not see acknowledged in time
+                if item.payload.tweet_id in self._seen:
+                    return
+                self._seen.append(item.payload.tweet_id)
+                self._mentions.append(item)
+            elif item.kind == FOLLOW:
+                self._follows.append(item)
+            else:
+                self.likes += 1
+            WEBHOOK_EVENTS.labels(self.agent_id, item.kind).inc()
+            if item.kind != LIKE and self._loop is not None:
+                self._loop.call_soon_threadsafe(self._event.set)
+
+    def pending(self) -> bool:
+        with self._lock:
+            return bool(self._mentions or self._follows)
+
+    def _allowance(self, now: float) -> int:
+        while self._handed_out and self._handed_out[0] <= now - 3600:
+            self._handed_out.popleft()
+        allowance = len(self._mentions) if self.max_per_poll is None else self.max_per_poll
+        if self.max_per_hour is not None:
+            allowance = min(allowance, self.max_per_hour - len(self._handed_out))
+        return max(allowance, 0)
+
+    def poll(self) -> List[Mention]:
+        """
+        Pushed mentions to answer now, replies to the agent's own tweets first, each oldest first.
+
+        Mentions over `max_per_poll` or `max_per_hour` stay queued for a later call.
+        """
+        now = self.clock()
+        with self._lock:
+            allowance = self._allowance(now)
+            self._authors = {a: t for a, t in self._authors.items() if t > now - self.author_cooldown}
+            taken, dropped, kept = [], [], deque(maxlen=self._mentions.maxlen)
+            for item in sorted(self._mentions, key=lambda i: (not i.payload.reply_to_own, i.payload.tweet_id)):
+                mention = item.payload
+                if self.author_cooldown and mention.author_id in self._authors:
+                    dropped.append(mention)
+                elif len(taken) < allowance:
+                    taken.append(mention)
+                    self._handed_out.append(now)
+                    if self.author_cooldown:
+                        self._authors[mention.author_id] = now
+                else:
+                    kept.append(item)
+            # Back in arrival order, so max_size still drops the oldest
+            self._mentions = deque(sorted(kept, key=lambda i: i.payload.tweet_id), maxlen=self._mentions.maxlen)
+            self.dropped += len(dropped)
+            handled = self._handled + [m.tweet_id for m in taken + dropped]
+            # The watermark means everything up to it was handled, so it stops below the oldest still queued
+            oldest_kept = self._mentions[0].payload.tweet_id if self._mentions else None
+            self._handled = [tweet_id for tweet_id in handled if oldest_kept is not None and tweet_id > oldest_kept]
+            handled = [tweet_id for tweet_id in handled if oldest_kept is None or tweet_id < oldest_kept]
+        if dropped:
+            logger.info("Dropped %d mentions from authors answered in the last %ds", len(dropped),
+                        self.author_cooldown, extra={"agent": self.agent_id})
+        if handled and self.watermarks is not None:
+            self.watermarks.advance(self.agent_id, MENTIONS_SOURCE, max(handled))
+        return taken
+
+    def follows(self) -> List[Tuple[int, int]]:
+        """(follower id, follower count) of the follows pushed since the last call."""
+        with self._lock:
+            items, self._follows = list(self._follows), deque(maxlen=self._follows.maxlen)
+        return [item.payload for item in items]
+
+    def oldest(self) -> Optional[float]:
+        """When the oldest pending item arrived."""
+        with self._lock:
+            times = [q[0].received for q in (self._mentions, self._follows) if q]
+        return min(times) if times else None
+
+    def bind(self) -> asyncio.Event:
+        """The event set whenever work arrives, bound to the running loop on first use."""
+        with self._lock:
+            if self._event is None:
+                self._loop = asyncio.get_running_loop()
+                self._event = asyncio.Event()
+                if self._mentions or self._follows:
+                    self._event.set()
+            return self._event
+
+
+class WebhookDispatcher:
+    """
+    Routes deliveries to the inbox of the agent they are for; deliveries for unknown users are dropped.
+
+    Args:
+        limits: `Inbox` keyword arguments (max_per_poll, max_per_hour, author_cooldown) for every inbox
+    """
+
+    def __init__(self, watermarks: WatermarkStore = None, clock: Callable[[], float] = time.time, **limits):
+        self.watermarks = watermarks
+        self.clock = clock
+        self.limits = limits
+        self._inboxes: Dict[str, Inbox] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_params(cls, params: dict, watermarks: WatermarkStore = None, **kwargs):
+        config = params.get("webhook") or {}
+        kwargs.setdefault("max_per_poll", (params.get("mentions") or {}).get("max_replies_per_cycle", 10))
+        kwargs.setdefault("max_per_hour", config.get("max_replies_per_hour", 30))
+        kwargs.setdefault("author_cooldown", config.get("author_cooldown_seconds", 600))
+        return cls(watermarks, **kwargs)
+
+    def inbox(self, agent_id) -> Inbox:
+        with self._lock:
+            agent_id = str(agent_id)
+            if agent_id not in self._inboxes:
+                self._inboxes[agent_id] = Inbox(agent_id, self.watermarks, clock=self.clock, **self.limits)
+            return self._inboxes[agent_id]
+
+    def remove(self, agent_id):
+        with self._lock:
+            self._inboxes.pop(str(agent_id), None)
+
+    def dispatch(self, payload: dict) -> int:
+        """Queue the work items of one delivery; returns how many were queued."""
+        with self._lock:
+            inbox = self._inboxes.get(str(payload.get("for_user_id")))
+        if inbox is None:
+            return 0
+        items = parse_events(payload, self.clock())
+        for item in items:
+            inbox.put(item)
+        if items:
+            logger.info("Webhook: %d work items", len(items), extra={"agent": inbox.agent_id})
+        return len(items)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules under src/ are imported top-level, as the entry points do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+# main imports gif_reply, which builds an OpenAI LLM at import time and needs a key to be set
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
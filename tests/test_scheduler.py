@@ -0,0 +1,115 @@
+import asyncio
+
+from scheduler import RedisQuota, RedisScheduler, Worker
+from sim.fake_redis import FakeRedis
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _schedulers(n: int, clock: Clock, lease: float = 60):
+    redis = FakeRedis(clock)
+    return redis, [RedisScheduler(redis, f"worker-{i}", lease=lease, interval=3600, clock=clock) for i in range(n)]
+
+
+def test_claims_are_exclusive_between_workers():
+    clock = Clock()
+    _, (a, b) = _schedulers(2, clock)
+    a.register(range(6))
+
+    first, second = a.claim(3), b.claim(10)
+    assert len(first) == 3 and len(second) == 3
+    assert not set(first) & set(second)
+    assert a.claim(10) == [] and b.claim(10) == []
+    assert {a.owner(agent_id) for agent_id in first} == {"worker-0"}
+
+
+def test_leased_agents_leave_the_due_range():
+    clock = Clock()
+    _, schedulers = _schedulers(8, clock)
+    schedulers[0].register(range(40))
+
+    claimed = [agent_id for scheduler in schedulers for agent_id in scheduler.claim(5)]
+    # Every worker finds due agents, not just the first few reading the head of the set
+    assert len(claimed) == len(set(claimed)) == 40
+
+    schedulers[0].release(claimed[0])
+    assert schedulers[1].claim(5) == [claimed[0]]
+
+
+def test_takeover_after_the_lease_expires():
+    clock = Clock()
+    _, (a, b) = _schedulers(2, clock, lease=60)
+    a.register(["1"])
+    assert a.claim(1) == ["1"]
+
+    clock.now += 30
+    assert a.renew("1")
+    clock.now += 59
+    assert b.claim(1) == []
+
+    clock.now += 2
+    assert b.claim(1) == ["1"]
+    assert b.owner("1") == "worker-1"
+    assert not a.renew("1")
+
+
+def test_complete_refuses_to_reschedule_once_the_lease_is_lost():
+    clock = Clock()
+    redis, (a, b) = _schedulers(2, clock, lease=60)
+    a.register(["1"])
+    a.claim(1)
+    clock.now += 61
+    b.claim(1)
+
+    assert not a.complete("1", next_due=clock.now + 10)
+    assert b.owner("1") == "worker-1"
+    assert b.complete("1")
+    assert redis.zscore(b.schedule_key, "1") == clock.now + 3600
+    assert b.owner("1") is None
+
+
+def test_worker_runs_each_due_agent_once():
+    clock = Clock()
+    _, (a, b) = _schedulers(2, clock)
+    a.register(range(10))
+    runs = []
+
+    async def run_cycle(agent_id):
+        runs.append(agent_id)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        stop = asyncio.Event()
+        workers = [Worker(scheduler, run_cycle, concurrency=3, poll=0.01) for scheduler in (a, b)]
+        tasks = [asyncio.create_task(worker.run(stop)) for worker in workers]
+        while sum(worker.completed for worker in workers) < 10:
+            await asyncio.sleep(0.01)
+        stop.set()
+        await asyncio.gather(*tasks)
+        return workers
+
+    workers = asyncio.run(asyncio.wait_for(main(), 10))
+    assert sorted(runs, key=int) == [str(i) for i in range(10)]
+    assert all(worker.lost == 0 for worker in workers)
+
+
+def test_quota_is_shared_between_workers():
+    clock = Clock(0.0)
+    redis = FakeRedis()
+    first = RedisQuota(redis, "credential", refresh=1.0, clock=clock)
+    second = RedisQuota(redis, "credential", refresh=1.0, clock=clock)
+    assert second.get("/2/tweets/search/recent") is None
+
+    first["/2/tweets/search/recent"] = (0, 1700000900)
+    # Read from the local copy until it is refreshed
+    assert second.get("/2/tweets/search/recent") is None
+    clock.now += 1.0
+    assert second.get("/2/tweets/search/recent") == (0, 1700000900)
+    assert first.get("/2/tweets/search/recent") == (0, 1700000900)
+    assert RedisQuota(redis, "other").get("/2/tweets/search/recent") is None
@@ -0,0 +1,205 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from collector.stream import RULE_TAG_PREFIX, Backoff, FilteredStream, StreamCollector, rules_for_topics
+from sim.stream_server import StreamServer
+from store.writer import BatchWriter
+
+
+class RecordingBackoff(Backoff):
+    """Records the delays Twitter's schedule asks for, but only waits `wait` seconds."""
+
+    def __init__(self, wait: float = 0.01):
+        self.wait = wait
+        self.delays = []
+        super().__init__()
+
+    def network(self):
+        self.delays.append(("network", super().network()))
+        return self.wait
+
+    def http(self):
+        self.delays.append(("http", super().http()))
+        return self.wait
+
+    def rate_limited(self):
+        self.delays.append(("rate_limited", super().rate_limited()))
+        return self.wait
+
+
+class FakeWeaviate:
+    def __init__(self):
+        self.batches = []
+
+    @contextmanager
+    def batch(self, batch_size: int):
+        rows = []
+
+        class Batch:
+            def add_data_object(self, properties, class_name):
+                rows.append((class_name, properties))
+
+        yield Batch()
+        self.batches.append(rows)
+
+
+def _take(stream: FilteredStream, n: int, timeout: float = 5.0) -> list:
+    stop = threading.Event()
+    timer = threading.Timer(timeout, stop.set)
+    timer.start()
+    try:
+        payloads = []
+        for payload in stream.payloads(stop):
+            payloads.append(payload)
+            if len(payloads) == n:
+                break
+        return payloads
+    finally:
+        timer.cancel()
+        stop.set()
+
+
+def test_sync_rules_only_touches_tagged_rules():
+    with StreamServer(tweets_per_second=0) as server:
+        stream = FilteredStream("token", base_url=server.url)
+        stream.add_rules([{"value": "hand made", "tag": "manual"}] + rules_for_topics(["AI", "crypto"]))
+
+        assert stream.sync_rules(["AI", "web3"]) == {"added": 1, "removed": 1}
+
+        values = {rule["value"]: rule.get("tag") for rule in stream.get_rules()}
+        assert values == {
+            "hand made": "manual",
+            "AI -is:retweet lang:en": f"{RULE_TAG_PREFIX}AI",
+            "web3 -is:retweet lang:en": f"{RULE_TAG_PREFIX}web3",
+        }
+        assert stream.sync_rules(["AI", "web3"]) == {"added": 0, "removed": 0}
+
+
+def test_backoff_schedules():
+    backoff = Backoff()
+    assert [backoff.network() for _ in range(3)] == [0.25, 0.5, 0.75]
+    assert [backoff.http() for _ in range(3)] == [5.0, 10.0, 20.0]
+    assert [backoff.rate_limited() for _ in range(2)] == [60.0, 120.0]
+    assert max(backoff.network() for _ in range(100)) == 16.0
+    assert max(backoff.http() for _ in range(10)) == 320.0
+    backoff.reset()
+    assert backoff.network() == 0.25 and backoff.http() == 5.0 and backoff.rate_limited() == 60.0
+
+
+def test_backs_off_exponentially_on_429():
+    with StreamServer(tweets_per_second=200, refuse_first=2, refuse_status=429) as server:
+        backoff = RecordingBackoff()
+        stream = FilteredStream("token", base_url=server.url, backoff=backoff)
+        stream.add_rules(rules_for_topics(["AI"]))
+
+        assert len(_take(stream, 3)) == 3
+        assert backoff.delays == [("rate_limited", 60.0), ("rate_limited", 120.0)]
+        assert stream.connections == 3
+
+
+def test_backs_off_exponentially_on_http_errors():
+    with StreamServer(tweets_per_second=200, refuse_first=2, refuse_status=503) as server:
+        backoff = RecordingBackoff()
+        stream = FilteredStream("token", base_url=server.url, backoff=backoff)
+        stream.add_rules(rules_for_topics(["AI"]))
+
+        assert len(_take(stream, 3)) == 3
+        assert backoff.delays == [("http", 5.0), ("http", 10.0)]
+
+
+def test_reconnects_linearly_after_disconnects_and_network_errors():
+    with StreamServer(tweets_per_second=200, drop_after=2) as server:
+        backoff = RecordingBackoff()
+        stream = FilteredStream("token", base_url=server.url, backoff=backoff)
+        stream.add_rules(rules_for_topics(["AI"]))
+
+        assert len(_take(stream, 5)) == 5
+        # Every received line resets the schedule, so each drop starts it over
+        assert backoff.delays == [("network", 0.25), ("network", 0.25)]
+
+    # Nothing listens on the port any more: connection refused
+    backoff = RecordingBackoff(wait=0.0)
+    stream = FilteredStream("token", base_url=server.url, backoff=backoff, connect_timeout=1)
+    stop = threading.Event()
+    threading.Timer(0.3, stop.set).start()
+    assert list(stream.payloads(stop)) == []
+    kinds = [kind for kind, _ in backoff.delays]
+    assert kinds and set(kinds) == {"network"}
+    assert [delay for _, delay in backoff.delays[:3]] == [0.25, 0.5, 0.75]
+
+
+def test_rule_sync_retries_with_backoff():
+    with StreamServer(tweets_per_second=200, refuse_rules_first=2, refuse_status=429) as server:
+        backoff = RecordingBackoff()
+        stream = FilteredStream("token", base_url=server.url, backoff=backoff)
+
+        assert stream.sync_rules_retrying(["AI"], threading.Event())
+        assert backoff.delays == [("rate_limited", 60.0), ("rate_limited", 120.0)]
+        assert [rule["tag"] for rule in stream.get_rules()] == [f"{RULE_TAG_PREFIX}AI"]
+
+    stop = threading.Event()
+    stop.set()
+    assert not FilteredStream("token", base_url=server.url).sync_rules_retrying(["AI"], stop)
+
+
+def test_skips_malformed_lines_without_reconnecting():
+    with StreamServer(tweets_per_second=200, truncate_every=2) as server:
+        stream = FilteredStream("token", base_url=server.url, backoff=RecordingBackoff())
+        stream.add_rules(rules_for_topics(["AI"]))
+
+        payloads = _take(stream, 3)
+        assert len(payloads) == 3 and all("data" in payload for payload in payloads)
+        assert stream.connections == 1
+
+
+def test_batch_writer_flushes_by_size():
+    client = FakeWeaviate()
+    writer = BatchWriter(client, batch_size=3, max_delay=3600)
+    for i in range(7):
+        writer.add({"tweet_id": str(i)})
+
+    assert [len(batch) for batch in client.batches] == [3, 3]
+    writer.flush()
+    assert [len(batch) for batch in client.batches] == [3, 3, 1]
+    assert writer.written == 7 and writer.failed == 0
+
+
+def test_batch_writer_flushes_by_max_delay():
+    now = [0.0]
+    client = FakeWeaviate()
+    writer = BatchWriter(client, batch_size=100, max_delay=2.0, clock=lambda: now[0])
+    writer.add({"tweet_id": "1"})
+    assert not writer._due()
+    now[0] = 2.5
+    assert writer._due()
+
+    writer = BatchWriter(FakeWeaviate(), batch_size=100, max_delay=0.05).start()
+    writer.add({"tweet_id": "1"})
+    deadline = time.monotonic() + 3
+    while writer.written == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    assert writer.written == 1
+
+
+def test_stream_collector_writes_matches():
+    with StreamServer(tweets_per_second=200) as server:
+        client = FakeWeaviate()
+        seen = []
+        collector = StreamCollector(FilteredStream("token", base_url=server.url),
+                                    BatchWriter(client, batch_size=5, max_delay=0.05), ["AI"],
+                                    listeners=[seen.append])
+        stop = threading.Event()
+        thread = threading.Thread(target=collector.run, args=(stop,))
+        thread.start()
+        deadline = time.monotonic() + 5
+        while collector.received < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop.set()
+        thread.join(5)
+
+    rows = [properties for batch in client.batches for _, properties in batch]
+    assert collector.received >= 10 and len(seen) == collector.received
+    assert len(rows) == collector.writer.written == collector.received
+    assert all("#AI" in row["tweet"] and row["tweet_id"] for row in rows)
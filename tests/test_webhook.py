@@ -0,0 +1,186 @@
+import asyncio
+
+import main
+from collector.mentions import SOURCE as MENTIONS_SOURCE
+from collector.watermarks import WatermarkStore
+from sim.webhook_replay import EventReplayer
+from webhook.app import create_app
+from webhook.events import WebhookDispatcher
+
+SECRET = "consumer-secret"
+AGENT_ID = 1000
+
+
+class Clock:
+    def __init__(self, now: float = 1700000000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _receiver(**limits):
+    dispatcher = WebhookDispatcher(**limits)
+    inbox = dispatcher.inbox(AGENT_ID)
+    return EventReplayer(SECRET, create_app(SECRET, dispatcher)), inbox
+
+
+def test_answers_the_crc_challenge():
+    replayer, _ = _receiver()
+    assert replayer.crc("challenge")
+    assert replayer._client.get(replayer.path).status_code == 400
+
+
+def test_rejects_bad_signatures():
+    replayer, inbox = _receiver()
+    assert replayer.send(replayer.mention(AGENT_ID), signature="sha256=forged") == -1
+    assert replayer.send(replayer.follow(AGENT_ID), signature="sha256=") == -1
+    assert not inbox.pending()
+
+
+def test_redelivered_mentions_are_queued_once():
+    replayer, inbox = _receiver()
+    payload = replayer.mention(AGENT_ID, "@agent gm")
+    assert replayer.send(payload) == 1
+    assert replayer.send(payload) == 1
+
+    mentions = inbox.poll()
+    assert [m.text for m in mentions] == ["@agent gm"]
+    assert inbox.poll() == []
+
+
+def test_deliveries_for_other_users_are_dropped():
+    replayer, inbox = _receiver()
+    assert replayer.send(replayer.mention(AGENT_ID + 1)) == 0
+    assert replayer.send(replayer.like(AGENT_ID, 42)) == 1
+    assert not inbox.pending() and inbox.likes == 1
+
+
+def test_poll_keeps_mentions_over_the_limit(tmp_path):
+    watermarks = WatermarkStore(str(tmp_path / "watermarks.json"))
+    replayer, inbox = _receiver(max_per_poll=2, watermarks=watermarks)
+    sent = [replayer.mention(AGENT_ID) for _ in range(5)]
+    for payload in sent:
+        replayer.send(payload)
+    ids = sorted(int(p["tweet_create_events"][0]["id_str"]) for p in sent)
+
+    assert [m.tweet_id for m in inbox.poll()] == ids[:2]
+    assert watermarks.since_id(AGENT_ID, MENTIONS_SOURCE) == str(ids[1])
+    assert [m.tweet_id for m in inbox.poll()] == ids[2:4]
+    assert [m.tweet_id for m in inbox.poll()] == ids[4:]
+    assert watermarks.since_id(AGENT_ID, MENTIONS_SOURCE) == str(ids[4])
+    assert not inbox.pending()
+
+
+def test_watermark_stops_below_mentions_still_queued(tmp_path):
+    watermarks = WatermarkStore(str(tmp_path / "watermarks.json"))
+    replayer, inbox = _receiver(max_per_poll=1, watermarks=watermarks)
+    replayer.send(replayer.mention(AGENT_ID))
+    # Replies to the agent's own tweets go first, though newer
+    reply = replayer.mention(AGENT_ID, in_reply_to=7)
+    replayer.send(reply)
+
+    assert [m.tweet_id for m in inbox.poll()] == [int(reply["tweet_create_events"][0]["id_str"])]
+    assert watermarks.since_id(AGENT_ID, MENTIONS_SOURCE) is None
+    assert len(inbox.poll()) == 1
+    assert watermarks.since_id(AGENT_ID, MENTIONS_SOURCE) == reply["tweet_create_events"][0]["id_str"]
+
+
+def test_author_cooldown_stops_ping_pong():
+    clock = Clock()
+    replayer, inbox = _receiver(author_cooldown=600, clock=clock)
+    bot, human = 555, 777
+    replayer.send(replayer.mention(AGENT_ID, author_id=bot))
+    replayer.send(replayer.mention(AGENT_ID, author_id=bot))
+    replayer.send(replayer.mention(AGENT_ID, author_id=human))
+    assert sorted(m.author_id for m in inbox.poll()) == [bot, human]
+    assert inbox.dropped == 1
+
+    clock.now += 60
+    replayer.send(replayer.mention(AGENT_ID, author_id=bot))
+    assert inbox.poll() == [] and inbox.dropped == 2
+
+    clock.now += 600
+    replayer.send(replayer.mention(AGENT_ID, author_id=bot))
+    assert [m.author_id for m in inbox.poll()] == [bot]
+
+
+def test_hourly_cap_keeps_the_rest_queued():
+    clock = Clock()
+    replayer, inbox = _receiver(max_per_hour=3, clock=clock)
+    for _ in range(5):
+        replayer.send(replayer.mention(AGENT_ID))
+
+    assert len(inbox.poll()) == 3
+    assert inbox.poll() == [] and inbox.pending()
+    clock.now += 3600
+    assert len(inbox.poll()) == 2
+
+
+class FakeFollowerSync:
+    def __init__(self):
+        self.follows = []
+
+    def add_followers(self, follows):
+        self.follows.extend(follows)
+
+
+class FakeCollector:
+    def __init__(self, inbox):
+        self.inbox = inbox
+        self.follower_sync = FakeFollowerSync()
+
+    def retrieve_mentions(self):
+        return self.inbox.poll()
+
+
+class FakeStrategy:
+    def __init__(self):
+        self.mentions = []
+
+    def run(self, tweets, mentions=()):
+        self.mentions.extend(mentions)
+        return [f"reply to {m.tweet_id}" for m in mentions]
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.actions = []
+
+    def execute_actions(self, tweet_actions):
+        self.actions.extend(tweet_actions)
+
+
+def test_pushed_work_wakes_the_engine_loop(monkeypatch):
+    cycles = []
+
+    async def run_cycle(*args):
+        cycles.append(args[4])
+        return []
+
+    monkeypatch.setattr(main, "run_cycle", run_cycle)
+    replayer, inbox = _receiver()
+    collector, strategy, executor = FakeCollector(inbox), FakeStrategy(), FakeExecutor()
+
+    async def scenario():
+        stop = asyncio.Event()
+        engine = asyncio.create_task(main.run(collector, strategy, executor, "agent", AGENT_ID, False,
+                                              stop=stop, inbox=inbox))
+        while not cycles:
+            await asyncio.sleep(0.01)
+
+        # Deliveries arrive on the receiver's threads
+        await asyncio.to_thread(replayer.send, replayer.follow(AGENT_ID, follower_id=4242))
+        await asyncio.to_thread(replayer.send, replayer.mention(AGENT_ID, "@agent wake up"))
+        while not strategy.mentions or not collector.follower_sync.follows:
+            await asyncio.sleep(0.01)
+
+        stop.set()
+        await engine
+
+    asyncio.run(asyncio.wait_for(scenario(), 10))
+    # Reacted between cycles: the hourly cycle ran once
+    assert cycles == [AGENT_ID]
+    assert [m.text for m in strategy.mentions] == ["@agent wake up"]
+    assert [follower_id for follower_id, _ in collector.follower_sync.follows] == [4242]
+    assert executor.actions == [f"reply to {strategy.mentions[0].tweet_id}"]